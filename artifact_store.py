@@ -0,0 +1,219 @@
+"""
+Managed output directory: atomic writes and a disk budget with LRU eviction.
+
+Everything the pipeline derives from an episode (.txt transcript, .ass
+subtitles, .mp4 video) lives under one root. Files are written to a hidden
+temporary name next to their final path and renamed into place only once
+complete, so a crash or a full disk never leaves a half-written MP4 that
+looks finished.
+
+With a budget set, collect() deletes whole artifact groups (every file
+sharing a stem, e.g. ep_1712345678.{txt,ass,mp4}), least recently used
+first, until usage is back under the low-water mark. A group is pinned while
+any task in the job database still needs it: pending, processing, or
+completed and not yet uploaded. Source audio and images are never touched;
+only files under the store's root are considered, and task records (upload
+ids included) stay in the database.
+
+Budget: ArtifactStore(budget_bytes=...) or STREAMFLUENT_ARTIFACT_BUDGET_GB.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BUDGET_ENV = "STREAMFLUENT_ARTIFACT_BUDGET_GB"
+# Collection frees space down to this share of the budget, so it does not run on every write
+LOW_WATER = 0.9
+_TEMP_MARK = ".partial-"
+# Groups used this recently are never evicted (covers a finished task not yet marked completed)
+MIN_IDLE_SECONDS = 60
+# Temporaries older than this are leftovers of a crashed writer
+STALE_TEMP_SECONDS = 6 * 3600
+# mkstemp creates files 0600; finished artifacts get the permissions a plain open() would give
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def budget_from_env() -> Optional[int]:
+    value = os.environ.get(BUDGET_ENV)
+    return int(float(value) * 1024 ** 3) if value else None
+
+
+def temp_path_for(path: str) -> str:
+    """A hidden sibling of `path` that keeps its extension (FFmpeg picks the muxer from it)."""
+    directory, name = os.path.split(path)
+    stem, ext = os.path.splitext(name)
+    fd, tmp = tempfile.mkstemp(prefix=f".{stem}{_TEMP_MARK}", suffix=ext, dir=directory or ".")
+    try:
+        os.fchmod(fd, 0o666 & ~_UMASK)
+    finally:
+        os.close(fd)
+    return tmp
+
+
+@contextmanager
+def atomic_path(path: str):
+    """Yields a temporary path to write `path` through; renamed into place only if the block succeeds."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = temp_path_for(path)
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def write_text(path: str, text: str):
+    with atomic_path(path) as tmp:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def _group_key(path: str) -> str:
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, os.path.splitext(name)[0])
+
+
+def touch(path: str):
+    """Marks the artifact group of `path` as used now (eviction goes by modification time).
+
+    Called wherever a finished artifact is reused (e.g. JobManager.find_output), so
+    collect() evicts the least recently used groups rather than the oldest written.
+    """
+    now = time.time()
+    directory, key = os.path.dirname(os.path.abspath(path)), _group_key(path)
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return
+    for name in names:
+        member = os.path.join(directory, name)
+        if _TEMP_MARK not in name and _group_key(member) == key:
+            try:
+                os.utime(member, (now, now))
+            except FileNotFoundError:
+                pass  # evicted or cleaned up meanwhile
+
+
+class ArtifactStore:
+    def __init__(self, root: str = "output", budget_bytes: Optional[int] = None, job_manager=None,
+                 low_water: float = LOW_WATER):
+        self.root = root
+        self.budget_bytes = budget_bytes if budget_bytes is not None else budget_from_env()
+        self.job_manager = job_manager
+        self.low_water = low_water
+        self.evicted_bytes = 0
+        self.evicted_groups = 0
+        self._lock = threading.Lock()
+        # Groups being produced right now; their task rows do not point at them yet
+        self._held: Dict[str, int] = {}
+
+    def path(self, name: str) -> str:
+        os.makedirs(self.root, exist_ok=True)
+        return os.path.join(self.root, name)
+
+    def touch(self, path: str):
+        touch(path)
+
+    def _groups(self) -> Dict[str, Tuple[List[str], int, float]]:
+        """group key -> (files, total bytes, last use)."""
+        groups: Dict[str, Tuple[List[str], int, float]] = {}
+        if not os.path.isdir(self.root):
+            return groups
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if _TEMP_MARK in name:
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files, size, used = groups.get(_group_key(path), ([], 0, 0.0))
+                groups[_group_key(path)] = (files + [path], size + st.st_size, max(used, st.st_mtime))
+        return groups
+
+    def usage(self) -> int:
+        return sum(size for _, size, _ in self._groups().values())
+
+    @contextmanager
+    def hold(self, path: str):
+        """Pins the group of `path` while its files are being written."""
+        key = _group_key(path)
+        with self._lock:
+            self._held[key] = self._held.get(key, 0) + 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._held[key] -= 1
+                if not self._held[key]:
+                    del self._held[key]
+
+    def pinned(self) -> Dict[str, int]:
+        """Reference counts per group: tasks in the job database that still need it, plus holds."""
+        refs = dict(self._held)
+        if self.job_manager is not None:
+            for path, count in self.job_manager.artifact_refs().items():
+                refs[_group_key(path)] = refs.get(_group_key(path), 0) + count
+        return refs
+
+    def sweep_temporaries(self, older_than: float = STALE_TEMP_SECONDS) -> int:
+        """Deletes temp files abandoned by writers that crashed; returns how many."""
+        removed = 0
+        cutoff = time.time() - older_than
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if _TEMP_MARK in name and os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+        return removed
+
+    def collect(self, incoming_bytes: int = 0) -> List[str]:
+        """Evicts unpinned groups, oldest first, until usage + incoming_bytes fits the budget.
+
+        Does nothing without a budget or while usage is within it. Returns the deleted files.
+        """
+        if not self.budget_bytes:
+            return []
+        with self._lock:
+            groups = self._groups()
+            usage = sum(size for _, size, _ in groups.values())
+            if usage + incoming_bytes <= self.budget_bytes:
+                return []
+
+            target = self.budget_bytes * self.low_water - incoming_bytes
+            pinned = self.pinned()
+            recent = time.time() - MIN_IDLE_SECONDS
+            deleted = []
+            for key, (files, size, used) in sorted(groups.items(), key=lambda item: item[1][2]):
+                if usage <= target or used > recent:
+                    break
+                if pinned.get(key):
+                    continue
+                for path in files:
+                    try:
+                        os.remove(path)
+                        deleted.append(path)
+                    except FileNotFoundError:
+                        pass
+                usage -= size
+                self.evicted_bytes += size
+                self.evicted_groups += 1
+
+            if deleted:
+                logger.info(f"Artifact store: evicted {len(deleted)} file(s), "
+                            f"{usage / 1024 ** 2:.0f} MB of {self.budget_bytes / 1024 ** 2:.0f} MB in use")
+            if usage + incoming_bytes > self.budget_bytes:
+                logger.warning(f"Artifact store over budget ({usage / 1024 ** 2:.0f} MB): "
+                               f"everything left is still needed by a task")
+            return deleted
@@ -0,0 +1,246 @@
+"""
+Host autotuner for faster-whisper: finds the fastest compute_type / cpu_threads /
+num_workers / beam_size combination on this machine and saves it as the host's
+profile, which karaoke_gen.Transcriber loads automatically.
+
+The best combination is saved per num_workers: a single job and several
+concurrent ones want different cpu_threads, so Transcriber looks up the entry
+for the number of workers it actually serves.
+
+Each combination transcribes a short calibration clip in its own subprocess, so
+peak memory (max RSS) is measured per combination. num_workers > 1 is measured
+the way it is used: that many transcriptions running at once, RTF taken over
+the total audio. Accuracy is guarded by word agreement with the most accurate
+combination (float32, largest beam); faster profiles that drift further than
+--min-agreement are rejected. If that reference trial fails, the tune aborts.
+
+Usage:
+  python autotune.py calibration.mp3
+  python autotune.py calibration.mp3 --model medium --seconds 90 --max-memory-mb 6000
+  python autotune.py --show
+"""
+
+import argparse
+import difflib
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from itertools import product
+from typing import Any, Dict, List, Optional
+
+PROFILE_PATH = os.environ.get("STREAMFLUENT_WHISPER_PROFILES",
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), "whisper_profiles.json"))
+
+COMPUTE_TYPES = ("int8", "int8_float32", "float32")
+BEAM_SIZES = (1, 5)
+PROFILE_KEYS = ("compute_type", "cpu_threads", "num_workers", "beam_size")
+
+
+def host_key() -> str:
+    return socket.gethostname()
+
+
+def _read_profiles(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_profile(model_size: str, num_workers: int = 1, path: str = None, host: str = None) -> Dict[str, Any]:
+    """Saved settings for model_size serving num_workers concurrent jobs on this host ({} if never tuned)."""
+    try:
+        profiles = _read_profiles(path or PROFILE_PATH)
+    except (OSError, ValueError):
+        return {}
+    entry = profiles.get(host or host_key(), {}).get(model_size, {})
+    if "workers" in entry:
+        entry = entry["workers"].get(str(num_workers), {})
+    elif entry.get("num_workers", 1) != num_workers:
+        # Single profile from an older tune, measured at another concurrency
+        return {}
+    return {k: entry[k] for k in PROFILE_KEYS if k in entry}
+
+
+def save_profile(model_size: str, profile: Dict[str, Any], path: str = None, host: str = None):
+    """Stores profile as model_size's entry for profile["num_workers"], keeping the other worker counts."""
+    path = path or PROFILE_PATH
+    profiles = _read_profiles(path)
+    entry = profiles.setdefault(host or host_key(), {}).setdefault(model_size, {})
+    if "workers" not in entry:
+        entry.clear()
+        entry["workers"] = {}
+    entry["workers"][str(profile["num_workers"])] = profile
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profiles, f, indent=2)
+    os.replace(tmp, path)
+
+
+def candidate_grid(cpu_count: int, compute_types=COMPUTE_TYPES, beam_sizes=BEAM_SIZES) -> List[Dict[str, Any]]:
+    """Combinations worth timing: thread counts in powers of two, workers that fit the cores."""
+    threads = sorted({t for t in (1, 2, 4, 8, 16, 32, 64) if t <= cpu_count} | {cpu_count})
+    grid = []
+    for compute_type, cpu_threads, beam_size in product(compute_types, threads, beam_sizes):
+        for num_workers in (1, 2, 4):
+            if num_workers * cpu_threads <= cpu_count:
+                grid.append({"compute_type": compute_type, "cpu_threads": cpu_threads,
+                             "num_workers": num_workers, "beam_size": beam_size})
+    return grid
+
+
+def word_agreement(text: str, reference: str) -> float:
+    """Share of matching words between two transcripts (1.0 = identical)."""
+    a, b = text.lower().split(), reference.lower().split()
+    if not a and not b:
+        return 1.0
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def pick_best(results: List[Dict[str, Any]], max_memory_mb: Optional[float] = None,
+              min_agreement: float = 0.95) -> Optional[Dict[str, Any]]:
+    """Lowest effective RTF among the results within the memory budget and accuracy floor.
+
+    A result without an agreement score (no reference to compare with) never qualifies.
+    """
+    ok = [r for r in results
+          if not r.get("error")
+          and (max_memory_mb is None or r["peak_memory_mb"] <= max_memory_mb)
+          and r.get("agreement") is not None and r["agreement"] >= min_agreement]
+    return min(ok, key=lambda r: r["rtf"]) if ok else None
+
+
+def pick_best_per_workers(results: List[Dict[str, Any]], max_memory_mb: Optional[float] = None,
+                          min_agreement: float = 0.95) -> Dict[int, Dict[str, Any]]:
+    """pick_best() for each num_workers level that has a qualifying result."""
+    best = {}
+    for num_workers in sorted({r["num_workers"] for r in results}):
+        pick = pick_best([r for r in results if r["num_workers"] == num_workers], max_memory_mb, min_agreement)
+        if pick is not None:
+            best[num_workers] = pick
+    return best
+
+
+# --- Trial (runs in a child process) ---
+
+def _max_rss_mb() -> float:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def run_trial(model_size: str, clip: str, seconds: float, config: Dict[str, Any]) -> Dict[str, Any]:
+    from concurrent.futures import ThreadPoolExecutor
+    from faster_whisper import WhisperModel
+
+    model = WhisperModel(model_size, device="cpu", compute_type=config["compute_type"],
+                         cpu_threads=config["cpu_threads"], num_workers=config["num_workers"])
+
+    def transcribe_clip():
+        segments, info = model.transcribe(clip, beam_size=config["beam_size"], word_timestamps=True,
+                                          clip_timestamps=[0, seconds])
+        text = "".join(s.text for s in segments)
+        return text, min(seconds, info.duration)
+
+    transcribe_clip()  # warm-up: first call pays one-off allocation costs
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=config["num_workers"]) as pool:
+        outputs = list(pool.map(lambda _: transcribe_clip(), range(config["num_workers"])))
+    elapsed = time.perf_counter() - started
+
+    audio_seconds = sum(duration for _, duration in outputs)
+    return dict(config, rtf=round(elapsed / audio_seconds, 4) if audio_seconds else None,
+                peak_memory_mb=round(_max_rss_mb(), 1), text=outputs[0][0])
+
+
+def _trial_in_subprocess(model_size, clip, seconds, config, timeout) -> Dict[str, Any]:
+    cmd = [sys.executable, os.path.abspath(__file__), "--trial", json.dumps(config),
+           "--model", model_size, "--seconds", str(seconds), clip]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return dict(config, error="timeout")
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        return dict(config, error=lines[-1] if lines else f"exit {result.returncode}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune faster-whisper settings for this host")
+    parser.add_argument("clip", nargs="?", help="Calibration audio (speech representative of the podcasts)")
+    parser.add_argument("--model", default="base", help="Whisper model size to tune (default: base)")
+    parser.add_argument("--seconds", type=float, default=60, help="Seconds of the clip to transcribe per trial")
+    parser.add_argument("--compute-types", nargs="+", default=list(COMPUTE_TYPES))
+    parser.add_argument("--beam-sizes", nargs="+", type=int, default=list(BEAM_SIZES))
+    parser.add_argument("--max-memory-mb", type=float, help="Reject combinations whose peak RSS exceeds this")
+    parser.add_argument("--min-agreement", type=float, default=0.95,
+                        help="Minimum word agreement with the most accurate combination")
+    parser.add_argument("--timeout", type=float, default=900, help="Seconds allowed per trial")
+    parser.add_argument("--profiles", default=PROFILE_PATH, help="Profile file to update")
+    parser.add_argument("--dry-run", action="store_true", help="Measure and report, but do not save")
+    parser.add_argument("--show", action="store_true", help="Print the saved profiles and exit")
+    parser.add_argument("--trial", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.trial:
+        print(json.dumps(run_trial(args.model, args.clip, args.seconds, json.loads(args.trial))))
+        return
+    if args.show:
+        print(json.dumps(_read_profiles(args.profiles), indent=2))
+        return
+    if not args.clip or not os.path.exists(args.clip):
+        parser.error("a calibration clip is required")
+
+    cpu_count = os.cpu_count() or 1
+    grid = candidate_grid(cpu_count, args.compute_types, args.beam_sizes)
+    print(f"Tuning '{args.model}' on {host_key()} ({platform.processor() or platform.machine()}, "
+          f"{cpu_count} cores): {len(grid)} combinations x {args.seconds:.0f}s of audio")
+
+    # Reference transcript: the most accurate combination (float32 where offered, largest beam, one worker)
+    ref_config = max(grid, key=lambda c: (c["compute_type"] == "float32", c["beam_size"], -c["num_workers"],
+                                          c["cpu_threads"]))
+    results = []
+    reference = None
+    for i, config in enumerate([ref_config] + [c for c in grid if c != ref_config]):
+        result = _trial_in_subprocess(args.model, args.clip, args.seconds, config, args.timeout)
+        if i == 0 and result.get("error"):
+            # Without the reference transcript accuracy cannot be checked; scoring each trial against
+            # itself would pass anything
+            print(f"Reference combination {config} failed ({result['error']}); aborting.")
+            sys.exit(1)
+        if not result.get("error"):
+            if i == 0:
+                reference = result["text"]
+            result["agreement"] = round(word_agreement(result["text"], reference), 4)
+            print(f"  [{i + 1}/{len(grid)}] {config['compute_type']:<13} threads={config['cpu_threads']:<3} "
+                  f"workers={config['num_workers']} beam={config['beam_size']}: RTF {result['rtf']:.3f}, "
+                  f"{result['peak_memory_mb']:.0f} MB, agreement {result['agreement']:.3f}")
+        else:
+            print(f"  [{i + 1}/{len(grid)}] {config}: failed ({result['error']})")
+        results.append(result)
+
+    best = pick_best_per_workers(results, args.max_memory_mb, args.min_agreement)
+    if not best:
+        print("No combination met the memory budget and accuracy floor; nothing saved.")
+        sys.exit(1)
+
+    tuned_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+    for num_workers, result in best.items():
+        profile = {k: result[k] for k in PROFILE_KEYS}
+        profile.update(rtf=result["rtf"], peak_memory_mb=result["peak_memory_mb"], agreement=result["agreement"],
+                       cpu_count=cpu_count, tuned_at=tuned_at)
+        print(f"Best for {num_workers} worker(s): {json.dumps(profile)}")
+        if not args.dry_run:
+            save_profile(args.model, profile, args.profiles)
+    if not args.dry_run:
+        print(f"Saved to {args.profiles} under host '{host_key()}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,14 @@
 import os
 import sys
+import argparse
 
 # Ensure current directory is in sys.path to allow importing karaoke_gen
 current_dir = os.path.dirname(os.path.abspath(__file__))
 if current_dir not in sys.path:
     sys.path.append(current_dir)
 
-from karaoke_gen import KaraokeGenerator
+from manifest import default_manifest_path, iter_manifest
+from scan_tasks import task_metadata
 
 # Default hardcoded tasks (fallback)
 default_tasks = [
@@ -17,53 +19,96 @@ default_tasks = [
     # ... (You can keep your old test data here if you want)
 ]
 
-import json
 
-def load_tasks_from_json(json_path="tasks.json"):
-    if os.path.exists(json_path):
-        print(f"Loading tasks from {json_path}...")
-        try:
-            with open(json_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error reading {json_path}: {e}")
-            return []
-    return []
-
-# Priority: tasks.json > hardcoded default_tasks
-tasks = load_tasks_from_json()
-if not tasks:
-    print("No tasks.json found (or empty), using default hardcoded list.")
-    tasks = default_tasks
+def iter_tasks(manifest_path, follow=False):
+    # Priority: manifest > hardcoded default_tasks
+    if follow or os.path.exists(manifest_path):
+        print(f"Streaming tasks from {manifest_path}...")
+        yield from iter_manifest(manifest_path, follow=follow)
+    else:
+        print(f"No {manifest_path} found, using default hardcoded list.")
+        yield from default_tasks
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Batch karaoke generation from a task manifest")
+    parser.add_argument("manifest", nargs="?", default=default_manifest_path(),
+                        help="Task manifest written by scan_tasks.py (.jsonl or legacy .json)")
+    parser.add_argument("--follow", action="store_true",
+                        help="Start on the first records while the scanner is still writing the manifest")
+    parser.add_argument("--profile", default="default", choices=["default", "upload"],
+                        help="Render profile; 'upload' caps the bitrate to a per-minute byte budget")
+    parser.add_argument("--canvas", default="fit", choices=["fit", "fill"],
+                        help="Fit backgrounds to 1920x1080 by letterboxing (fit) or by cropping (fill)")
+    parser.add_argument("--model", default="base", help="Whisper model that transcribes every episode")
+    parser.add_argument("--cascade", metavar="MODEL",
+                        help="Larger Whisper model (e.g. medium) re-transcribing only low-confidence segments")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Episodes processed at once; admission control keeps them within the host's cores and RAM")
+    parser.add_argument("--disk-budget-gb", type=float,
+                        help="Cap output/ at this size, evicting least recently used files no pending upload needs")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Serve Prometheus /metrics and JSON /status on this port while running")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Write a Chrome/Perfetto trace of every task and stage to this .json file or directory")
+    args = parser.parse_args()
+
+    if args.trace:
+        import tracing
+        print(f"Tracing to {tracing.enable(args.trace)}")
+
+    # Loaded after argument parsing so --help does not wait for the transcription stack
+    from karaoke_gen import KaraokeGenerator
+
     print(f"Initializing Batch Processor using KaraokeGenerator...")
-    gen = KaraokeGenerator()
-    
-    print(f"Adding {len(tasks)} tasks to the queue...")
-    for i, task in enumerate(tasks):
+    gen = KaraokeGenerator(render_profile=args.profile, model_size=args.model, cascade_model=args.cascade,
+                           workers=args.workers, canvas=args.canvas)
+    if args.disk_budget_gb:
+        gen.artifacts.budget_bytes = int(args.disk_budget_gb * 1024 ** 3)
+    if args.metrics_port:
+        import metrics
+        metrics.serve(args.metrics_port, job_manager=gen.job_manager)
+
+    # Scans run with --defer-images leave backgrounds to be generated here
+    from generate_images import ImagePool, ensure_task_images
+    pool = ImagePool()
+
+    added = 0
+    for i, task in enumerate(iter_tasks(args.manifest, follow=args.follow)):
         audio = task.get("audio_path")
         image = task.get("image_path")
-        
-        if not os.path.exists(audio):
+
+        if not audio or not os.path.exists(audio):
             print(f"Warning: Audio file not found: {audio}, skipping add.")
             continue
-            
-        # We don't strictly check image existence here as karaoke_gen might handle it differently,
-        # but good practice to check if possible.
-        
-        task_id = gen.add_task(audio, image)
-        print(f"  [{i+1}/{len(tasks)}] Used Add Task -> ID: {task_id}")
-
-    print("\nStarting Serial Execution...")
-    print("Why Serial? \n1. Avoiding SQLite database lock contentions.\n2. Preventing Mac CPU/Memory thermal throttling from running multiple AI models simultaneously.\n")
-    
+
+        if args.follow:
+            ensure_task_images([task])
+        elif image and not os.path.exists(image):
+            pool.submit(task.get("image_title") or task.get("title", ""), image)
+
+        task_id = gen.add_task(audio, image, **task_metadata(task))
+        added += 1
+        print(f"  [{i+1}] Used Add Task -> ID: {task_id}")
+
+        if args.follow:
+            # Render this episode now instead of waiting for the whole manifest
+            gen.process_pending_tasks()
+
+    pool.wait()
+    pool.shutdown()
+
+    if args.workers > 1:
+        print(f"\nQueued {added} tasks. Starting Execution with {args.workers} workers (admission-controlled)...")
+    else:
+        print(f"\nQueued {added} tasks. Starting Serial Execution...")
+        print("Why Serial? \n1. Avoiding SQLite database lock contentions.\n2. Preventing Mac CPU/Memory thermal throttling from running multiple AI models simultaneously.\n")
+
     # process_pending_tasks() in karaoke_gen automatically loops through ALL pending tasks
     # sequentially. This is exactly what we want for stability.
     gen.process_pending_tasks()
-    
+
     print("\nBatch processing complete.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,60 @@
+"""
+Compares render profiles on one episode: output size, bytes per minute,
+encode time and SSIM/PSNR of each profile against the default render.
+
+Usage:
+  python benchmarks/bench_encode.py episode.mp3 background.jpg episode.ass
+  python benchmarks/bench_encode.py episode.mp3 background.jpg episode.ass --budget-mb 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from karaoke_gen import RENDER_PROFILES, VideoRenderer, measure_quality  # noqa: E402
+from media_probe import probe_audio  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare render profiles by size and SSIM/PSNR")
+    parser.add_argument("audio")
+    parser.add_argument("image")
+    parser.add_argument("ass")
+    parser.add_argument("--budget-mb", type=float, help="Per-minute byte budget for the upload profile (MiB)")
+    parser.add_argument("--keep", help="Directory to keep the rendered files in")
+    args = parser.parse_args()
+
+    duration = probe_audio(args.audio)["duration"] or 0
+    out_dir = args.keep or tempfile.mkdtemp(prefix="bench_encode_")
+    os.makedirs(out_dir, exist_ok=True)
+
+    outputs = {}
+    for profile in RENDER_PROFILES:
+        budget = int(args.budget_mb * 1024 * 1024) if args.budget_mb and profile == "upload" else None
+        renderer = VideoRenderer(profile=profile, bytes_per_minute=budget)
+        output = os.path.join(out_dir, f"{profile}.mp4")
+        t0 = time.perf_counter()
+        renderer.render(args.audio, args.image, args.ass, output)
+        outputs[profile] = (output, time.perf_counter() - t0)
+
+    reference = outputs["default"][0]
+    reference_size = os.path.getsize(reference)
+    print(f"{'profile':<10}{'size':>12}{'MB/min':>9}{'ratio':>8}{'encode s':>10}{'SSIM':>8}{'PSNR':>8}")
+    for profile, (output, seconds) in outputs.items():
+        size = os.path.getsize(output)
+        per_min = size / 1024 / 1024 / (duration / 60) if duration else float("nan")
+        quality = measure_quality(reference, output) if profile != "default" else {"ssim": 1.0, "psnr": None}
+        psnr = f"{quality['psnr']:.2f}" if quality["psnr"] is not None else "-"
+        ssim = f"{quality['ssim']:.4f}" if quality["ssim"] is not None else "-"
+        print(f"{profile:<10}{size:>12,}{per_min:>9.2f}{reference_size / size:>8.2f}{seconds:>10.1f}{ssim:>8}{psnr:>8}")
+    print(f"\nRenders in {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Import-time budget for every entry point.
+
+Imports each module in a fresh interpreter under `python -X importtime`,
+reports its cumulative import time and which heavyweight dependencies it
+pulled in, and exits non-zero if any module is over budget or loads a
+dependency it should only load lazily.
+
+Usage:
+  python benchmarks/bench_import.py
+  python benchmarks/bench_import.py --scale 2     # slower machine: double every budget
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use only; none of these may appear at import time unless allowed below
+HEAVY_MODULES = ("faster_whisper", "ctranslate2", "torch", "crewai", "litellm",
+                 "bilibili_api", "sqlalchemy", "PIL", "tqdm")
+
+# module -> (budget in seconds, heavy modules it is allowed to import)
+ENTRY_POINTS = {
+    "main": (0.3, ()),
+    "pipeline": (0.3, ()),
+    "scan_tasks": (0.3, ()),
+    "watch_tasks": (0.3, ()),
+    "batch_run_kgen": (0.3, ()),
+    "bili_upload": (0.3, ()),
+    "worker": (0.3, ()),
+    "job_store": (0.8, ("sqlalchemy",)),
+    "karaoke_gen": (0.8, ("sqlalchemy",)),
+    "generate_images": (0.5, ("PIL",)),
+}
+
+_PROBE = (
+    "import sys, {module}; "
+    "print(','.join(m for m in {heavy!r} if m in sys.modules))"
+)
+
+
+def measure(module):
+    """Returns (cumulative import seconds, heavy modules loaded, error or None)."""
+    cmd = [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module, heavy=HEAVY_MODULES)]
+    result = subprocess.run(cmd, cwd=_PROJECT_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        error = [line for line in result.stderr.splitlines() if line.strip()]
+        return None, [], error[-1] if error else f"exit {result.returncode}"
+
+    cumulative = None
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"; top-level imports are not indented
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) == 3 and parts[2].rstrip() == f" {module}":
+            cumulative = int(parts[1]) / 1e6
+    loaded = [m for m in result.stdout.strip().split(",") if m]
+    return cumulative, loaded, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check entry-point import times against their budgets")
+    parser.add_argument("modules", nargs="*", help="Entry points to check (default: all)")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every budget (slow machines, CI)")
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'module':<16} {'import':>8} {'budget':>8}  heavy dependencies loaded")
+    for module in args.modules or ENTRY_POINTS:
+        budget, allowed = ENTRY_POINTS.get(module, (0.3, ()))
+        budget *= args.scale
+        seconds, loaded, error = measure(module)
+        if error:
+            if "ModuleNotFoundError" in error:
+                # A dependency is not installed here; nothing to measure
+                print(f"{module:<16} {'n/a':>8} {budget:>7.2f}s  ({error})")
+            else:
+                failures += 1
+                print(f"{module:<16} {'FAIL':>8} {budget:>7.2f}s  {error}")
+            continue
+
+        unexpected = [m for m in loaded if m not in allowed]
+        over = seconds is not None and seconds > budget
+        failures += bool(unexpected or over)
+        status = "  OVER BUDGET" if over else ""
+        heavy = ", ".join(loaded) or "-"
+        if unexpected:
+            heavy += f"  (not allowed: {', '.join(unexpected)})"
+        print(f"{module:<16} {seconds or 0:>7.3f}s {budget:>7.2f}s  {heavy}{status}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark for scan_tasks.scan_directory on a synthetic podcast tree.
+
+Builds <files> empty files spread over show directories (audio + background +
+cover per episode, so nothing needs generating) and times a full scan.
+
+Usage:
+  python benchmarks/bench_scan.py
+  python benchmarks/bench_scan.py --files 50000 --episodes-per-dir 100
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from scan_tasks import scan_directory  # noqa: E402
+
+
+def build_tree(root, total_files, episodes_per_dir):
+    """Creates show directories with Ep{n}.mp3, Ep{n}.jpg and cover_Ep{n}.jpeg files."""
+    episodes = total_files // 3
+    created = 0
+    for ep in range(episodes):
+        show_dir = os.path.join(root, f"Show {ep // episodes_per_dir:04d}")
+        if ep % episodes_per_dir == 0:
+            os.makedirs(show_dir, exist_ok=True)
+        num = ep % episodes_per_dir + 1
+        # Background name differs from the audio stem to exercise number matching
+        for name in (f"[Show] {num}. Episode title Ep. {num}.mp3",
+                     f"background Ep{num}.jpg",
+                     f"cover_Ep{num}.jpeg"):
+            open(os.path.join(show_dir, name), "w").close()
+            created += 1
+    return created
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scan_directory on a synthetic tree")
+    parser.add_argument("--files", type=int, default=50000, help="Total number of files to create")
+    parser.add_argument("--episodes-per-dir", type=int, default=100, help="Episodes per show directory")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed scans")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_scan_") as root:
+        t0 = time.perf_counter()
+        created = build_tree(root, args.files, args.episodes_per_dir)
+        print(f"Built {created} files in {time.perf_counter() - t0:.2f}s")
+
+        timings = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                # The files are empty placeholders: time the walk and matching, not ffprobe or PIL
+                tasks = scan_directory(root, probe=False, defer_images=True)
+            timings.append(time.perf_counter() - t0)
+
+        missing = sum(1 for t in tasks if not os.path.exists(t["bili_cover_path"]))
+        print(f"Scanned {len(tasks)} episodes ({missing} without cover)")
+        print(f"Best: {min(timings):.3f}s  Mean: {sum(timings) / len(timings):.3f}s  "
+              f"({len(tasks) / min(timings):,.0f} episodes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+Offline end-to-end benchmark suite.
+
+Builds synthetic fixtures (fixtures.py) in a throwaway directory and times
+each engine stage, then the whole scan -> transcribe -> ASS -> render chain
+with FakeTranscriber standing in for Whisper, so no model is downloaded.
+Pass --transcriber whisper --model base to time the real model instead.
+
+Benchmarks whose dependencies are missing (PIL, SQLAlchemy, numpy, ffmpeg) are
+reported as skipped. Every run is appended to a JSON Lines history file
+together with the git commit, and compared with the previous run of the
+same size on the same host; a metric that got worse by more than
+--threshold is flagged as a regression.
+
+Usage:
+  python benchmarks/bench_suite.py
+  python benchmarks/bench_suite.py --size medium --only scan ass jobs
+  python benchmarks/bench_suite.py --size large --transcriber whisper --model base --fail-on-regression
+"""
+
+import argparse
+import contextlib
+import datetime
+import importlib.util
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+_BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_BENCH_DIR)
+for _path in (_PROJECT_ROOT, _BENCH_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from fixtures import FakeTranscriber, build_library, fake_segments, write_wav  # noqa: E402
+
+HISTORY_PATH = os.path.join(_BENCH_DIR, "history.jsonl")
+
+# shows x episodes per show, seconds of audio per episode, repeat counts
+SIZES = {
+    "small": {"shows": 2, "episodes": 5, "seconds": 5, "scan_files": 3000, "images": 10, "jobs": 200,
+              "ass_minutes": 30},
+    "medium": {"shows": 4, "episodes": 10, "seconds": 20, "scan_files": 30000, "images": 50, "jobs": 2000,
+               "ass_minutes": 120},
+    "large": {"shows": 10, "episodes": 20, "seconds": 60, "scan_files": 150000, "images": 200, "jobs": 10000,
+              "ass_minutes": 600},
+}
+
+# Metrics where a larger value is better; everything else (seconds) is better smaller
+HIGHER_IS_BETTER = ("per_s", "speed", "per_min")
+
+
+class Skip(Exception):
+    pass
+
+
+def _require(module=None, binary=None):
+    if module and importlib.util.find_spec(module) is None:
+        raise Skip(f"{module} not installed")
+    if binary and shutil.which(binary) is None:
+        raise Skip(f"{binary} not on PATH")
+
+
+def _best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+# --- Benchmarks: each returns {metric: value} ---
+
+def bench_scan(work, size, args):
+    from bench_scan import build_tree
+    from scan_tasks import scan_directory
+
+    root = os.path.join(work, "scan_tree")
+    build_tree(root, size["scan_files"], episodes_per_dir=100)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tasks = []
+        seconds = _best_of(lambda: tasks.append(len(scan_directory(root, probe=False))), args.repeat)
+    episodes = tasks[-1]
+    return {"episodes": episodes, "seconds": seconds, "episodes_per_s": episodes / seconds}
+
+
+def bench_ass(work, size, args):
+    _require("sqlalchemy")  # karaoke_gen imports the job store
+    from karaoke_gen import SubtitleGenerator
+
+    segments = fake_segments(size["ass_minutes"] * 60)
+    path = os.path.join(work, "bench.ass")
+    generator = SubtitleGenerator()
+    with _quiet_logs():
+        seconds = _best_of(lambda: generator.generate_ass(segments, path), args.repeat)
+    return {"segments": len(segments), "seconds": seconds, "segments_per_s": len(segments) / seconds}
+
+
+def bench_image(work, size, args):
+    _require("PIL")
+    from generate_images import ImageGenerator
+
+    generator = ImageGenerator(background_base=os.path.join(_PROJECT_ROOT, "background_base.png"),
+                               cover_base=os.path.join(_PROJECT_ROOT, "cover_base.png"))
+    count = size["images"]
+
+    def run():
+        for i in range(count):
+            generator.generate(f"Episode {i}: a fairly long benchmark title to wrap", os.path.join(work, f"{i}.jpg"),
+                               is_cover=bool(i % 2))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        seconds = _best_of(run, args.repeat)
+    return {"images": count, "seconds": seconds, "images_per_s": count / seconds}
+
+
+def bench_render(work, size, args):
+    _require("sqlalchemy", "ffmpeg")
+    from karaoke_gen import SubtitleGenerator, VideoRenderer
+
+    audio = write_wav(os.path.join(work, "render.wav"), size["seconds"])
+    ass = os.path.join(work, "render.ass")
+    with _quiet_logs():
+        SubtitleGenerator().generate_ass(fake_segments(size["seconds"]), ass)
+        results = {}
+        for profile in ("default", "upload"):
+            out = os.path.join(work, f"render_{profile}.mp4")
+            renderer = VideoRenderer(profile=profile)
+            seconds = _best_of(lambda: renderer.render(audio, os.path.join(_PROJECT_ROOT, "background_base.png"),
+                                                       ass, out), args.repeat)
+            results[f"{profile}_seconds"] = seconds
+            results[f"{profile}_speed"] = size["seconds"] / seconds
+            results[f"{profile}_bytes"] = os.path.getsize(out)
+    return results
+
+
+def bench_decode(work, size, args):
+    _require("numpy", "ffmpeg")
+    from pcm_cache import PCMCache
+
+    wav = write_wav(os.path.join(work, "decode.wav"), size["seconds"])
+    mp3 = os.path.join(work, "decode.mp3")
+    subprocess.run(["ffmpeg", "-v", "error", "-y", "-i", wav, mp3], check=True)
+    cache = PCMCache(root=os.path.join(work, "pcm"))
+
+    def decode(path):
+        with cache.open(path) as pcm:
+            float(pcm.sum())  # read every sample, as feature extraction does
+
+    results = {}
+    for name, path in (("wav", wav), ("mp3", mp3)):
+        seconds = _best_of(lambda: decode(path), args.repeat)
+        results[f"{name}_seconds"] = seconds
+        results[f"{name}_speed"] = size["seconds"] / seconds
+    return results
+
+
+def bench_jobs(work, size, args):
+    _require("sqlalchemy")
+    from job_store import JobManager
+
+    count = size["jobs"]
+    jobs = JobManager(f"sqlite:///{os.path.join(work, 'jobs.db')}")
+    paths = [os.path.join(work, "missing", f"{i}.mp3") for i in range(count)]  # not on disk: no fingerprinting
+    with _quiet_logs():
+        t0 = time.perf_counter()
+        ids = [jobs.add_task(p, "bg.png", duration=60 + i % 600) for i, p in enumerate(paths)]
+        add = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        pending = jobs.get_pending_tasks()
+        scan = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        claimed = 0
+        while claimed < min(count, 200) and jobs.claim_task("bench", lease_seconds=60):
+            claimed += 1
+        claim = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for task_id in ids:
+            jobs.update_status(task_id, "completed", output_path="out.mp4")
+        update = time.perf_counter() - t0
+    return {"tasks": len(pending), "add_per_s": count / add, "pending_query_seconds": scan,
+            "claim_per_s": claimed / claim if claim else 0.0, "update_per_s": count / update}
+
+
+def bench_pipeline(work, size, args):
+    _require("sqlalchemy", "ffmpeg")
+    from karaoke_gen import KaraokeGenerator
+    from job_store import JobManager
+    from scan_tasks import scan_directory
+
+    root = os.path.join(work, "library")
+    build_library(root, size["shows"], size["episodes"], size["seconds"])
+    # The whisper backend is built by KaraokeGenerator itself, as in production (PCM cache,
+    # per-worker model settings); only the fake one is injected
+    transcriber = FakeTranscriber(rtf=args.fake_rtf) if args.transcriber == "fake" else None
+
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        tasks = scan_directory(root)
+    scan_seconds = time.perf_counter() - t0
+
+    output_dir = os.path.join(work, "output")
+    cwd = os.getcwd()
+    os.chdir(work)  # run_stages writes to ./output
+    try:
+        with _quiet_logs():
+            gen = KaraokeGenerator(render_profile=args.profile, model_size=args.model, transcriber=transcriber,
+                                   workers=args.workers,
+                                   job_manager=JobManager(f"sqlite:///{os.path.join(work, 'pipeline.db')}"))
+            for task in tasks:
+                gen.add_task(task["audio_path"], task["image_path"], duration=task.get("duration"))
+            t0 = time.perf_counter()
+            gen.process_pending_tasks()
+            produce_seconds = time.perf_counter() - t0
+    finally:
+        os.chdir(cwd)
+
+    videos = len([f for f in os.listdir(output_dir) if f.endswith(".mp4")]) if os.path.isdir(output_dir) else 0
+    if videos != len(tasks):
+        raise RuntimeError(f"only {videos}/{len(tasks)} episodes rendered")
+    audio_seconds = len(tasks) * size["seconds"]
+    total = scan_seconds + produce_seconds
+    return {"episodes": len(tasks), "scan_seconds": scan_seconds, "produce_seconds": produce_seconds,
+            "episodes_per_min": 60 * len(tasks) / total, "audio_speed": audio_seconds / total}
+
+
+BENCHMARKS = {"scan": bench_scan, "ass": bench_ass, "image": bench_image, "render": bench_render,
+              "decode": bench_decode, "jobs": bench_jobs, "pipeline": bench_pipeline}
+
+
+@contextlib.contextmanager
+def _quiet_logs():
+    previous = logging.root.manager.disable
+    logging.disable(logging.INFO)
+    try:
+        yield
+    finally:
+        logging.disable(previous)
+
+
+# --- History ---
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=_PROJECT_ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=_PROJECT_ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return out + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_run(history, record):
+    """Latest earlier run on the same host with the same size and transcriber."""
+    keys = ("host", "size", "transcriber")
+    for old in reversed(history):
+        if all(old.get(k) == record.get(k) for k in keys):
+            return old
+    return None
+
+
+def compare(previous, current, threshold):
+    """Returns (benchmark, metric, old, new, change) for metrics that got worse by more than threshold."""
+    regressions = []
+    for name, metrics in current.items():
+        old_metrics = (previous or {}).get(name) or {}
+        for metric, new in metrics.items():
+            old = old_metrics.get(metric)
+            if not isinstance(new, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            if not (metric.endswith("seconds") or any(tag in metric for tag in HIGHER_IS_BETTER)):
+                continue  # counts and sizes are not performance
+            change = (new - old) / old
+            worse = -change if any(tag in metric for tag in HIGHER_IS_BETTER) else change
+            if worse > threshold:
+                regressions.append((name, metric, old, new, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmarks with JSON history")
+    parser.add_argument("--size", choices=SIZES, default="small")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="Run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per stage benchmark (best kept)")
+    parser.add_argument("--transcriber", choices=("fake", "whisper"), default="fake")
+    parser.add_argument("--model", default="base", help="Whisper model for --transcriber whisper")
+    parser.add_argument("--fake-rtf", type=float, default=0.0,
+                        help="Seconds FakeTranscriber sleeps per audio second (models transcription cost)")
+    parser.add_argument("--profile", default="upload", help="Render profile for the pipeline benchmark")
+    parser.add_argument("--workers", type=int, default=1, help="KaraokeGenerator workers for the pipeline")
+    parser.add_argument("--history", default=HISTORY_PATH, help="JSON Lines file results are appended to")
+    parser.add_argument("--no-save", action="store_true", help="Compare against history but do not append")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Relative slowdown reported as a regression (default: 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    size = SIZES[args.size]
+    record = {"timestamp": datetime.datetime.now().isoformat(timespec="seconds"), "commit": git_commit(),
+              "host": socket.gethostname(), "platform": platform.platform(), "python": platform.python_version(),
+              "cpus": os.cpu_count(), "size": args.size, "transcriber": args.transcriber, "results": {},
+              "skipped": {}}
+
+    for name in args.only or BENCHMARKS:
+        with tempfile.TemporaryDirectory(prefix=f"bench_{name}_") as work:
+            try:
+                t0 = time.perf_counter()
+                record["results"][name] = BENCHMARKS[name](work, size, args)
+                print(f"{name:<9} {time.perf_counter() - t0:7.2f}s  "
+                      + "  ".join(f"{k}={v:.4g}" if isinstance(v, float) else f"{k}={v}"
+                                  for k, v in record["results"][name].items()))
+            except Skip as e:
+                record["skipped"][name] = str(e)
+                print(f"{name:<9} skipped ({e})")
+
+    history = load_history(args.history)
+    previous = previous_run(history, record)
+    regressions = compare(previous and previous["results"], record["results"], args.threshold)
+    if previous:
+        print(f"\nCompared with {previous.get('commit')} ({previous['timestamp']}):")
+        for name, metric, old, new, change in regressions:
+            print(f"  REGRESSION {name}.{metric}: {old:.4g} -> {new:.4g} ({change:+.0%})")
+        if not regressions:
+            print(f"  no metric worse by more than {args.threshold:.0%}")
+
+    if not args.no_save:
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"Results appended to {args.history}")
+
+    sys.exit(1 if regressions and args.fail_on_regression else 0)
+
+
+if __name__ == "__main__":
+    main()
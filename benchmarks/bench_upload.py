@@ -0,0 +1,246 @@
+"""
+Offline upload benchmark: runs bili_upload.batch_upload and a resumed
+bili_upload.upload against the local mock server (mock_bili_server.py).
+
+Reports batch throughput (bytes/s and videos/min, for each concurrency level)
+and, for the resume scenario, how many bytes the second attempt re-sent after
+an upload was interrupted part-way through.
+
+Everything runs in a throwaway directory (job DB, credential file, manifest,
+synthetic videos), so a real bili_sess.json is never read or needed.
+
+Usage:
+  python benchmarks/bench_upload.py
+  python benchmarks/bench_upload.py --videos 8 --size-mb 24 --bandwidth-mbps 80 --latency-ms 30 --concurrency 1 2 4
+  python benchmarks/bench_upload.py --fail-rate 0.05 --throttle-per-min 6
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+_BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+_PROJECT_ROOT = os.path.dirname(_BENCH_DIR)
+for _path in (_PROJECT_ROOT, _BENCH_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+from mock_bili_server import MockState, start_server  # noqa: E402
+
+
+def point_uploader_at(base_url):
+    """Redirects bilibili_api's upload endpoints to the mock server.
+
+    Rewrites the host of every video_uploader API entry, builds upos URLs from
+    the mock's address (the library hard-codes https: for them) and skips the
+    upload line probe, which pings the real CDNs.
+
+    These are private bilibili_api internals, checked against
+    bilibili-api-python 17.4.2: the module-level _API dict and
+    _choose_line(line) -> LINES_INFO entry, and the static
+    VideoUploader._get_upload_url(preupload), plus utils.network.get_buvid().
+    Raises if a release moved them.
+    """
+    from urllib.parse import urlparse, urlunparse
+    from bilibili_api import video_uploader
+    from bilibili_api.utils import network
+
+    uploader_cls = video_uploader.VideoUploader
+    missing = [name for name, owner in (("_API", video_uploader), ("_choose_line", video_uploader),
+                                         ("LINES_INFO", video_uploader), ("_get_upload_url", uploader_cls),
+                                         ("get_buvid", network))
+               if not hasattr(owner, name)]
+    if missing:
+        raise RuntimeError(f"bilibili_api.video_uploader no longer has {', '.join(missing)}; "
+                           f"update point_uploader_at() for this version")
+
+    mock = urlparse(base_url)
+    for entry in video_uploader._API.values():
+        if isinstance(entry, dict) and "url" in entry:
+            entry["url"] = urlunparse(urlparse(entry["url"])._replace(scheme=mock.scheme, netloc=mock.netloc))
+
+    uploader_cls._get_upload_url = staticmethod(
+        lambda preupload: f"{base_url}/{preupload['upos_uri'].replace('upos://', '', 1)}")
+
+    # The line dict still feeds the preupload query (os, upcdn, probe_version); just never probe
+    lines_info = video_uploader.LINES_INFO
+
+    async def _fixed_line(line):
+        return lines_info.get(getattr(line, "value", None)) or next(iter(lines_info.values()))
+    video_uploader._choose_line = _fixed_line
+
+    # Preupload asks Credential.get_buvid_cookies() for buvid4, which the saved session
+    # lacks; it would fetch one from api.bilibili.com
+    async def _mock_buvid():
+        return "mock", "mock"
+    network.get_buvid = _mock_buvid
+
+
+def make_workspace(root, videos, size_bytes):
+    """Writes synthetic videos, their DB rows (status completed), a manifest and a dummy credential."""
+    from job_store import JobManager
+    from manifest import ManifestWriter
+
+    with open("bili_sess.json", "w") as f:
+        json.dump({"sessdata": "mock", "bili_jct": "mock", "buvid3": "mock", "dedeuserid": "1"}, f)
+
+    manager = JobManager()
+    cover = os.path.join(_PROJECT_ROOT, "cover_base.png")
+    block = os.urandom(1024 * 1024)
+    with ManifestWriter("tasks.jsonl") as writer:
+        for i in range(videos):
+            audio = os.path.join(root, f"episode_{i:03}.mp3")
+            video = os.path.join(root, f"episode_{i:03}.mp4")
+            with open(audio, "wb") as f:
+                f.write(os.urandom(4096))
+            with open(video, "wb") as f:
+                remaining = size_bytes
+                while remaining > 0:
+                    f.write(block[:remaining])
+                    remaining -= len(block)
+            # The background is never read by an upload, but tasks.image_path is NOT NULL
+            task_id = manager.add_task(audio, cover)
+            manager.update_status(task_id, "completed", output_path=video)
+            writer.write({"title": f"Benchmark episode {i}", "audio_path": audio,
+                          "bili_cover_path": cover, "tags": "Karaoke"})
+    return manager
+
+
+def reset_uploads(manager):
+    """Puts every task back to completed so the next run uploads them again."""
+    from job_store import Task
+    session = manager.Session()
+    for task in session.query(Task).all():
+        task.status = "completed"
+        task.remote_id = None
+        task.upload_state = None
+    session.commit()
+    session.close()
+
+
+async def bench_batch(state, manager, concurrency, total_bytes, videos):
+    from bili_upload import batch_upload
+
+    reset_uploads(manager)
+    state.reset_counters()
+    started = time.perf_counter()
+    results = await batch_upload("tasks.jsonl", concurrency=concurrency, rate_per_min=6000)
+    elapsed = time.perf_counter() - started
+    stats = state.stats()
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 3),
+        "uploaded": results["uploaded"] if results else 0,
+        "failed": results["failed"] if results else videos,
+        "bytes_per_s": round(total_bytes / elapsed, 1),
+        "videos_per_min": round(videos * 60 / elapsed, 2),
+        "server": stats,
+    }
+
+
+async def bench_resume(state, manager, interrupt_after):
+    """Interrupts one upload after `interrupt_after` chunks, then resumes it from the ledger."""
+    from bili_upload import UploadLedger, load_credential, upload
+    from job_store import Task
+
+    reset_uploads(manager)
+    session = manager.Session()
+    task = session.query(Task).order_by(Task.id).first()
+    task_id, video = task.id, task.output_path
+    session.close()
+    size = os.path.getsize(video)
+    credential = load_credential()
+    kwargs = dict(video_path=video, title="Resume benchmark", desc="", tags="Karaoke",
+                  cover_path=os.path.join(_PROJECT_ROOT, "cover_base.png"), credential=credential)
+
+    loop = asyncio.get_running_loop()
+    first = asyncio.create_task(upload(ledger=UploadLedger(manager, task_id, video), **kwargs))
+    seen = []
+
+    def on_chunk(upload_id, part):
+        seen.append(part)
+        if len(seen) == interrupt_after:
+            loop.call_soon_threadsafe(first.cancel)
+
+    state.reset_counters()
+    state.on_chunk = on_chunk
+    try:
+        await first
+    except asyncio.CancelledError:
+        pass
+    state.on_chunk = None
+    sent_before = state.stats()["bytes_received"]
+
+    state.reset_counters()
+    started = time.perf_counter()
+    result = await upload(ledger=UploadLedger(manager, task_id, video), **kwargs)
+    elapsed = time.perf_counter() - started
+    resent = state.stats()["bytes_received"]
+    return {
+        "file_bytes": size,
+        "sent_before_interrupt": sent_before,
+        "sent_on_resume": resent,
+        "wasted_bytes": max(0, sent_before + resent - size),
+        "resume_seconds": round(elapsed, 3),
+        "ok": result is not None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline batch upload / resume benchmark against a mock server")
+    parser.add_argument("--videos", type=int, default=6)
+    parser.add_argument("--size-mb", type=float, default=16, help="Size of each synthetic video")
+    parser.add_argument("--chunk-mb", type=float, default=4)
+    parser.add_argument("--bandwidth-mbps", type=float, default=100, help="Shared mock link speed (0 = unlimited)")
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--fail-rate", type=float, default=0)
+    parser.add_argument("--throttle-per-min", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--interrupt-after", type=int, default=2, help="Chunks to let through before interrupting")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    state = MockState(bandwidth_bps=args.bandwidth_mbps * 1e6 / 8, latency=args.latency_ms / 1000,
+                      chunk_size=int(args.chunk_mb * 1024 * 1024), chunk_fail_rate=args.fail_rate,
+                      throttle_per_min=args.throttle_per_min)
+    server, base_url = start_server(state)
+    point_uploader_at(base_url)
+
+    root = tempfile.mkdtemp(prefix="bench_upload_")
+    cwd = os.getcwd()
+    os.chdir(root)
+    try:
+        size = int(args.size_mb * 1024 * 1024)
+        manager = make_workspace(root, args.videos, size)
+        report = {"mock": base_url, "videos": args.videos, "video_bytes": size, "batch": []}
+
+        for concurrency in args.concurrency:
+            row = asyncio.run(bench_batch(state, manager, concurrency, size * args.videos, args.videos))
+            report["batch"].append(row)
+        report["resume"] = asyncio.run(bench_resume(state, manager, args.interrupt_after))
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+        shutil.rmtree(root, ignore_errors=True)
+
+    print("\nconcurrency  seconds  uploaded  MB/s    videos/min  chunk retries")
+    for row in report["batch"]:
+        print(f"{row['concurrency']:>11}  {row['seconds']:>7.2f}  {row['uploaded']:>8}  "
+              f"{row['bytes_per_s'] / 1e6:>6.2f}  {row['videos_per_min']:>10.1f}  {row['server']['chunks_failed']:>13}")
+    resume = report["resume"]
+    print(f"\nresume: {resume['sent_before_interrupt']} B sent before interrupt, "
+          f"{resume['sent_on_resume']} B on resume of a {resume['file_bytes']} B file "
+          f"({resume['wasted_bytes']} B re-sent), ok={resume['ok']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
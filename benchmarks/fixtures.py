@@ -0,0 +1,145 @@
+"""
+Synthetic inputs for the benchmarks: speech-like WAV files, podcast
+directory trees of any size, and FakeTranscriber, a drop-in for the Whisper
+transcriber that returns deterministic word timings without loading a model.
+
+Standard library only, so fixtures can be built on any machine.
+"""
+
+import math
+import os
+import random
+import shutil
+import struct
+import time
+import wave
+from collections import namedtuple
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_RATE = 16000
+# Same fields faster_whisper's Word / Segment expose to SubtitleGenerator and cascade.py
+Word = namedtuple("Word", "start end word probability")
+Segment = namedtuple("Segment", "start end text words avg_logprob no_speech_prob")
+
+_VOCABULARY = ("the", "podcast", "today", "we", "talk", "about", "learning", "english", "with", "stories",
+               "every", "episode", "and", "some", "new", "words", "for", "you", "to", "practice")
+
+
+def write_wav(path, seconds, sample_rate=SAMPLE_RATE, seed=0):
+    """Writes a mono 16-bit WAV of `seconds` that alternates voiced bursts and pauses.
+
+    Bursts are a few harmonics with a syllable-rate envelope, so encoders and
+    VAD see something closer to speech than a constant tone does.
+    """
+    rng = random.Random(seed)
+    frames = bytearray()
+    total = int(seconds * sample_rate)
+    t = 0
+    while t < total:
+        burst = int(rng.uniform(0.2, 0.6) * sample_rate)
+        pause = int(rng.uniform(0.05, 0.3) * sample_rate)
+        pitch = rng.uniform(110, 220)
+        for i in range(min(burst, total - t)):
+            x = i / sample_rate
+            envelope = math.sin(math.pi * i / burst)
+            sample = envelope * (0.5 * math.sin(2 * math.pi * pitch * x) + 0.25 * math.sin(4 * math.pi * pitch * x))
+            frames += struct.pack("<h", int(sample * 12000))
+        t += burst
+        silence = min(pause, max(0, total - t))
+        frames += b"\x00\x00" * silence
+        t += silence
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(bytes(frames))
+    return path
+
+
+def wav_duration(path):
+    with wave.open(path, "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+
+def build_library(root, shows=2, episodes_per_show=3, seconds=5.0):
+    """Creates show folders of "[Show S] Episode N.wav", its background (same name, .png) and "cover_EpN.png".
+
+    The audio is synthesised once and stamped with the episode's index in its
+    first samples, so building large trees is cheap while every file stays
+    distinct (the job store would otherwise file identical audio as
+    duplicates). Returns the list of audio paths.
+    """
+    os.makedirs(root, exist_ok=True)
+    template = os.path.join(root, f"_fixture_{seconds:g}s.wav")
+    write_wav(template, seconds)
+    with wave.open(template, "rb") as f:
+        params, frames = f.getparams(), bytearray(f.readframes(f.getnframes()))
+    os.remove(template)
+    background = os.path.join(_PROJECT_ROOT, "background_base.png")
+    cover = os.path.join(_PROJECT_ROOT, "cover_base.png")
+
+    audio_paths = []
+    for show in range(shows):
+        show_dir = os.path.join(root, f"Show {show + 1:03d}")
+        os.makedirs(show_dir, exist_ok=True)
+        for ep in range(1, episodes_per_show + 1):
+            # Show prefix keeps basenames (and so output names) unique across shows
+            stem = f"[Show {show + 1:03d}] Episode {ep}"
+            audio = os.path.join(show_dir, f"{stem}.wav")
+            frames[:4] = struct.pack("<I", len(audio_paths))
+            with wave.open(audio, "wb") as f:
+                f.setparams(params)
+                f.writeframes(bytes(frames))
+            shutil.copyfile(background, os.path.join(show_dir, f"{stem}.png"))
+            shutil.copyfile(cover, os.path.join(show_dir, f"cover_Ep{ep}.png"))
+            audio_paths.append(audio)
+    return audio_paths
+
+
+def fake_segments(duration, seed=0, words_per_segment=8, word_seconds=0.35, gap_seconds=0.05):
+    """Deterministic transcript covering `duration` seconds."""
+    rng = random.Random(seed)
+    segments, words, t = [], [], 0.0
+    while t + word_seconds <= duration:
+        words.append(Word(round(t, 2), round(t + word_seconds, 2), " " + rng.choice(_VOCABULARY), 0.9))
+        t += word_seconds + gap_seconds
+        if len(words) == words_per_segment:
+            segments.append(Segment(words[0].start, words[-1].end, "".join(w.word for w in words), words,
+                                    -0.3, 0.01))
+            words = []
+    if words:
+        segments.append(Segment(words[0].start, words[-1].end, "".join(w.word for w in words), words, -0.3, 0.01))
+    return segments
+
+
+class FakeTranscriber:
+    """Stands in for karaoke_gen.Transcriber: KaraokeGenerator(transcriber=FakeTranscriber()).
+
+    Word timings depend only on the audio's duration (WAV header, else
+    `default_duration`), so runs are repeatable. rtf > 0 sleeps that many
+    seconds per audio second to model transcription cost.
+    """
+
+    model_size = "fake"
+    compute_type = "int8"
+
+    def __init__(self, rtf=0.0, default_duration=60.0, cpu_threads=1):
+        self.rtf = rtf
+        self.default_duration = default_duration
+        self.cpu_threads = cpu_threads
+
+    def duration(self, audio_path):
+        try:
+            return wav_duration(audio_path)
+        except (wave.Error, EOFError, OSError):
+            return self.default_duration
+
+    def transcribe(self, audio_path, audio=None):
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+        # audio: decoded 16 kHz samples (KaraokeGenerator(pcm=...)), as the Whisper transcriber takes
+        duration = len(audio) / SAMPLE_RATE if audio is not None else self.duration(audio_path)
+        if self.rtf:
+            time.sleep(duration * self.rtf)
+        return fake_segments(duration, seed=len(os.path.basename(audio_path)))
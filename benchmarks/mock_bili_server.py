@@ -0,0 +1,274 @@
+"""
+Local stand-in for the Bilibili upload endpoints used by bili_upload.upload().
+
+Implements the preupload, multipart chunk upload (upos), complete, cover
+upload and submit endpoints with configurable bandwidth, latency, throttling
+and failure injection, and keeps counters the benchmark harness reads.
+
+Endpoints:
+  GET  /preupload                      — upload session (auth, chunk_size, upos_uri, endpoint)
+  POST /ugcfr/<key>?uploads            — start multipart upload, returns upload_id
+  PUT  /ugcfr/<key>?partNumber=..      — one chunk, returns MULTIPART_PUT_SUCCESS
+  POST /ugcfr/<key>?uploadId=..        — complete multipart upload
+  POST /x/vu/web/cover/up              — cover image, returns a URL
+  POST /x/vu/web/add/v3                — submit, returns aid/bvid
+
+Usage:
+  python benchmarks/mock_bili_server.py --port 8765 --bandwidth-mbps 20 --latency-ms 40
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class Bandwidth:
+    """Shared link: all concurrent transfers split `bytes_per_s` between them."""
+
+    def __init__(self, bytes_per_s):
+        self.bytes_per_s = bytes_per_s
+        self._lock = threading.Lock()
+        self._free_at = time.monotonic()
+
+    def transfer(self, nbytes):
+        if not self.bytes_per_s:
+            return
+        with self._lock:
+            start = max(time.monotonic(), self._free_at)
+            self._free_at = start + nbytes / self.bytes_per_s
+            done_at = self._free_at
+        time.sleep(max(0.0, done_at - time.monotonic()))
+
+
+class MockState:
+    def __init__(self, bandwidth_bps=0, latency=0.0, chunk_size=4 * 1024 * 1024, threads=3,
+                 chunk_fail_rate=0.0, throttle_per_min=0, seed=0):
+        self.bandwidth = Bandwidth(bandwidth_bps)
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.threads = threads
+        self.chunk_fail_rate = chunk_fail_rate
+        self.throttle_per_min = throttle_per_min
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.uploads = {}        # upload_id -> {"key", "parts": {part: size}, "total", "completed"}
+        self.bytes_received = 0
+        self.chunks_received = 0
+        self.chunks_failed = 0
+        self.throttled = 0
+        self.submits = []
+        self._session_starts = []
+        self.on_chunk = None     # optional callback(upload_id, part_number), e.g. to interrupt a client
+
+    def reset_counters(self):
+        with self.lock:
+            self.bytes_received = 0
+            self.chunks_received = 0
+            self.chunks_failed = 0
+            self.throttled = 0
+
+    # Every random draw comes from the seeded generator, so a run with the same seed replays exactly
+
+    def randint(self, low, high):
+        with self.lock:
+            return self.random.randint(low, high)
+
+    def token(self):
+        with self.lock:
+            return f"{self.random.getrandbits(128):032x}"
+
+    def chance(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def should_throttle(self):
+        """Sliding one-minute window over upload session starts."""
+        if not self.throttle_per_min:
+            return False
+        now = time.monotonic()
+        with self.lock:
+            self._session_starts = [t for t in self._session_starts if now - t < 60]
+            if len(self._session_starts) >= self.throttle_per_min:
+                self.throttled += 1
+                return True
+            self._session_starts.append(now)
+        return False
+
+    def stats(self):
+        with self.lock:
+            return {
+                "bytes_received": self.bytes_received,
+                "chunks_received": self.chunks_received,
+                "chunks_failed": self.chunks_failed,
+                "throttled": self.throttled,
+                "submits": len(self.submits),
+            }
+
+
+class MockBiliHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: MockState = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- helpers ---
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = b""
+        while len(body) < length:
+            piece = self.rfile.read(min(1024 * 1024, length - len(body)))
+            if not piece:
+                break
+            body += piece
+        return body
+
+    def _send(self, status, payload, content_type="application/json"):
+        data = payload if isinstance(payload, bytes) else (
+            json.dumps(payload).encode() if not isinstance(payload, str) else payload.encode())
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _route(self):
+        parsed = urlparse(self.path)
+        return parsed.path, {k: v[-1] for k, v in parse_qs(parsed.query, keep_blank_values=True).items()}
+
+    # --- endpoints ---
+
+    def do_GET(self):
+        state = self.state
+        time.sleep(state.latency)
+        path, params = self._route()
+        if path == "/preupload":
+            if state.should_throttle():
+                return self._send(406, {"OK": 0, "message": "请求过于频繁"})
+            key = f"mock/{state.token()}.mp4"
+            return self._send(200, {
+                "OK": 1,
+                "auth": "mock-auth",
+                "biz_id": state.randint(10 ** 8, 10 ** 9),
+                "chunk_size": state.chunk_size,
+                "threads": state.threads,
+                "endpoint": f"//{self.headers.get('Host')}",
+                "upos_uri": f"upos://ugcfr/{key}",
+            })
+        self._send(404, {"code": -404, "message": "not found"})
+
+    def do_POST(self):
+        state = self.state
+        time.sleep(state.latency)
+        path, params = self._route()
+        body = self._read_body()
+
+        if path.startswith("/ugcfr/") and "uploads" in params:
+            upload_id = state.token()
+            with state.lock:
+                state.uploads[upload_id] = {"key": path, "parts": {}, "total": None, "completed": False}
+            return self._send(200, {"OK": 1, "upload_id": upload_id, "bucket": "ugcfr", "key": path})
+
+        if path.startswith("/ugcfr/") and "uploadId" in params:
+            with state.lock:
+                upload = state.uploads.get(params["uploadId"])
+                if upload is None:
+                    return self._send(404, {"OK": 0, "message": "upload expired"})
+                # Like upos, refuse to assemble a file with missing chunks: a resume that skipped
+                # chunks it never sent has to fail here, not at review time
+                try:
+                    count = len(json.loads(body or b"{}").get("parts") or [])
+                except ValueError:
+                    count = 0
+                missing = [n for n in range(1, count + 1) if n not in upload["parts"]]
+                size = sum(upload["parts"].get(n, 0) for n in range(1, count + 1))
+                if not count or missing or size != upload["total"]:
+                    return self._send(400, {"OK": 0, "message": f"incomplete upload: {count} part(s) listed, "
+                                                                f"missing {missing}, {size}/{upload['total']} bytes"})
+                upload["completed"] = True
+            return self._send(200, {"OK": 1, "location": path, "key": path})
+
+        if path == "/x/vu/web/cover/up":
+            return self._send(200, {"code": 0, "message": "0", "data": {"url": "http://mock.local/cover.jpg"}})
+
+        if path == "/x/vu/web/add/v3":
+            if state.should_throttle():
+                return self._send(200, {"code": 21540, "message": "请求过于频繁，请稍后再试"})
+            aid = state.randint(10 ** 8, 10 ** 9)
+            with state.lock:
+                state.submits.append(body)
+            return self._send(200, {"code": 0, "message": "0", "data": {"aid": aid, "bvid": f"BVmock{aid}"}})
+
+        self._send(404, {"code": -404, "message": "not found"})
+
+    def do_PUT(self):
+        state = self.state
+        time.sleep(state.latency)
+        path, params = self._route()
+        length = int(self.headers.get("Content-Length") or 0)
+        # The client is held back at the simulated link speed while "sending" the chunk
+        state.bandwidth.transfer(length)
+        body = self._read_body()
+
+        upload_id = params.get("uploadId")
+        with state.lock:
+            upload = state.uploads.get(upload_id)
+        if upload is None:
+            return self._send(404, "upload expired", "text/plain")
+        if state.chunk_fail_rate and state.chance(state.chunk_fail_rate):
+            with state.lock:
+                state.chunks_failed += 1
+            return self._send(500, "injected failure", "text/plain")
+
+        part = int(params.get("partNumber", 0))
+        with state.lock:
+            upload["parts"][part] = len(body)
+            upload["total"] = int(params.get("total", 0))
+            state.bytes_received += len(body)
+            state.chunks_received += 1
+        if state.on_chunk:
+            state.on_chunk(upload_id, part)
+        self._send(200, "MULTIPART_PUT_SUCCESS", "text/plain")
+
+
+def start_server(state, host="127.0.0.1", port=0):
+    """Starts the mock in a daemon thread. Returns (server, base_url)."""
+    handler = type("Handler", (MockBiliHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Bilibili upload stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bandwidth-mbps", type=float, default=0, help="Shared link speed (0 = unlimited)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added latency per request")
+    parser.add_argument("--chunk-mb", type=float, default=4, help="chunk_size handed out by preupload")
+    parser.add_argument("--fail-rate", type=float, default=0, help="Probability a chunk PUT returns 500")
+    parser.add_argument("--throttle-per-min", type=int, default=0,
+                        help="Upload sessions/submits allowed per minute before throttling (0 = never)")
+    args = parser.parse_args()
+
+    state = MockState(bandwidth_bps=args.bandwidth_mbps * 1e6 / 8, latency=args.latency_ms / 1000,
+                      chunk_size=int(args.chunk_mb * 1024 * 1024), chunk_fail_rate=args.fail_rate,
+                      throttle_per_min=args.throttle_per_min)
+    server, url = start_server(state, args.host, args.port)
+    print(f"Mock Bilibili upload server on {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(5)
+            print(json.dumps(state.stats()))
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Resumable Bilibili uploads on top of bilibili_api's VideoUploader.
+
+Separate from bili_upload so that importing bili_upload does not load
+bilibili_api; upload() imports this module when it actually uploads.
+"""
+
+from bilibili_api.video_uploader import VideoUploader
+
+
+class ResumableVideoUploader(VideoUploader):
+    """VideoUploader that reuses a saved preupload session and skips acknowledged chunks.
+
+    Hooks bilibili_api's private _preupload/_upload_chunk steps; if a library
+    version lacks them, uploads still work but restart from the beginning.
+    """
+
+    def __init__(self, *args, ledger=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ledger = ledger
+
+    async def _preupload(self, page):
+        if self.ledger.preupload is not None:
+            print(f"Resuming upload: {len(self.ledger.acked)} chunk(s) already confirmed")
+            return self.ledger.preupload
+        preupload = await super()._preupload(page)
+        self.ledger.save_preupload(preupload)
+        return preupload
+
+    async def _upload_chunk(self, page, offset, chunk_number, total_chunk, preupload):
+        if offset in self.ledger.acked:
+            return {"ok": True, "chunk_number": chunk_number, "offset": offset}
+        return await super()._upload_chunk(page, offset, chunk_number, total_chunk, preupload)
+
+
+# Whether this bilibili_api version has the hooks ResumableVideoUploader overrides
+RESUMABLE = hasattr(VideoUploader, "_preupload") and hasattr(VideoUploader, "_upload_chunk")
@@ -6,13 +6,17 @@ import sys
 # Add current directory just in case
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from bilibili_api.login_v2 import QrCodeLogin
-from bilibili_api.video_uploader import VideoUploader, VideoUploaderPage, VideoMeta
-from bilibili_api import Credential
+# bilibili_api (and its HTTP stack) is imported inside the functions that use it,
+# so --help and manifest/DB checks start without it
+import metrics
+import tracing
+from upload_metrics import UploadMeter, format_bytes
 
 CREDENTIAL_FILE = "bili_sess.json"
 
 async def login():
+    from bilibili_api.login_v2 import QrCodeLogin
+
     print("Initializing QR Code Login...")
     qr_login = QrCodeLogin()
     
@@ -73,20 +77,97 @@ async def login():
     except Exception as e:
         print(f"\nLogin failed: {e}")
 
-async def upload(video_path, title, desc, tags, copyright=1, source="", cover_path=None, tid=181):
+class UploadLedger:
+    """Per-task upload progress stored in the job database (tasks.upload_state).
+
+    Holds the preupload session (upload id, endpoint, chunk size) and the
+    offsets of chunks the server has acknowledged, keyed to the video's size
+    and mtime so a re-rendered file never resumes a stale session.
+    """
+
+    def __init__(self, manager, task_id, video_path):
+        self.manager = manager
+        self.task_id = task_id
+        self.video_path = video_path
+        st = os.stat(video_path)
+        self.signature = [st.st_size, st.st_mtime_ns]
+        state = manager.get_upload_state(task_id)
+        if state.get("video") != video_path or state.get("signature") != self.signature:
+            state = {}
+        self.preupload = state.get("preupload")
+        self.acked = set(state.get("acked", []))
+
+    @property
+    def resuming(self):
+        return self.preupload is not None
+
+    def _save(self):
+        self.manager.set_upload_state(self.task_id, {
+            "video": self.video_path,
+            "signature": self.signature,
+            "preupload": self.preupload,
+            "acked": sorted(self.acked),
+        })
+
+    def save_preupload(self, preupload):
+        self.preupload = preupload
+        self._save()
+
+    def ack(self, offset):
+        self.acked.add(offset)
+        self._save()
+
+    def reset(self):
+        self.preupload = None
+        self.acked = set()
+        self.manager.set_upload_state(self.task_id, None)
+
+def remote_id_of(result):
+    if isinstance(result, dict):
+        return str(result.get("bvid") or result.get("aid") or "")
+    return ""
+
+def load_credential():
+    """Reads bili_sess.json once; returns a Credential, or None if not logged in."""
     if not os.path.exists(CREDENTIAL_FILE):
-        print(f"Error: {CREDENTIAL_FILE} not found. Please run with --login first.")
-        return
+        return None
+
+    from bilibili_api import Credential
 
     with open(CREDENTIAL_FILE, "r") as f:
         cookies = json.load(f)
     
-    cred = Credential(
+    return Credential(
         sessdata=cookies.get("sessdata"),
         bili_jct=cookies.get("bili_jct"),
         buvid3=cookies.get("buvid3"),
         dedeuserid=cookies.get("dedeuserid")
     )
+
+# Response codes / HTTP statuses Bilibili uses for "too many requests"
+THROTTLE_CODES = {-412, -509, 406, 412, 429, 601, 21540}
+
+def is_throttled(exc):
+    code = getattr(exc, "code", None)
+    status = getattr(exc, "status", None)
+    return code in THROTTLE_CODES or status in THROTTLE_CODES or "频繁" in str(exc)
+
+async def upload(video_path, title, desc, tags, copyright=1, source="", cover_path=None, tid=181,
+                 credential=None, raise_errors=False, ledger=None):
+    """Uploads one video. Returns the submit result (bvid/aid) or None on failure.
+
+    Pass a shared `credential` to avoid re-reading bili_sess.json per video;
+    with raise_errors=True failures propagate so callers can react to throttling.
+    With an UploadLedger, acknowledged chunks are recorded as they land and an
+    interrupted upload resumes from the last confirmed chunk.
+    """
+    cred = credential or load_credential()
+    if cred is None:
+        print(f"Error: {CREDENTIAL_FILE} not found. Please run with --login first.")
+        return None
+
+    from bilibili_api.video_uploader import VideoUploader, VideoUploaderPage, VideoMeta, VideoUploaderEvents
+    from bili_resumable import RESUMABLE, ResumableVideoUploader
     
     print(f"Prepare uploading {video_path}...")
     
@@ -116,106 +197,250 @@ async def upload(video_path, title, desc, tags, copyright=1, source="", cover_pa
         source=source_url
     )
     
-    uploader = VideoUploader(pages=[page], meta=meta, credential=cred)
+    resumed = ledger is not None and ledger.resuming and RESUMABLE
+    meter = UploadMeter(title, os.path.getsize(video_path))
+    if resumed:
+        chunk_size = ledger.preupload.get("chunk_size", 0)
+        meter.skip(sum(min(chunk_size, meter.total_bytes - o) for o in ledger.acked))
+
+    def make_uploader():
+        if ledger is None or not RESUMABLE:
+            uploader = VideoUploader(pages=[page], meta=meta, credential=cred)
+        else:
+            uploader = ResumableVideoUploader(pages=[page], meta=meta, credential=cred, ledger=ledger)
+
+        @uploader.on(VideoUploaderEvents.PRE_CHUNK.value)
+        async def on_pre_chunk(data):
+            meter.on_pre_chunk(data)
+
+        @uploader.on(VideoUploaderEvents.AFTER_CHUNK.value)
+        async def on_upload_chunk(data):
+            meter.on_after_chunk(data)
+            # The server acknowledged this chunk; remember it so a retry can skip it
+            if ledger is not None and isinstance(data, dict) and "offset" in data:
+                ledger.ack(data["offset"])
+
+        @uploader.on(VideoUploaderEvents.CHUNK_FAILED.value)
+        async def on_chunk_failed(data):
+            meter.on_chunk_failed(data)
+
+        return uploader
+
+    def record_metrics(outcome):
+        summary = dict(meter.summary(), outcome=outcome)
+        metrics.observe_upload(summary["bytes"] - summary["resumed_bytes"], summary["bytes_per_s"])
+        print(f"[upload] {title[:30]}: {outcome}, {format_bytes(summary['bytes_per_s'])}/s average, "
+              f"{summary['chunks']} chunks, {summary['retries']} retries")
+        if ledger is not None:
+            ledger.manager.record_stage_metrics(ledger.task_id, "upload", summary)
+
+    with metrics.track("upload"), tracing.span("bili.upload", title=title, bytes=meter.total_bytes):
+        try:
+            print("Starting upload...")
+            try:
+                result = await make_uploader().start()
+            except Exception as e:
+                if not resumed or is_throttled(e):
+                    raise
+                # The saved upload session may have expired server-side; start over once
+                print(f"\nResume failed for '{title}' ({e}); restarting from the first chunk.")
+                ledger.reset()
+                meter = UploadMeter(title, meter.total_bytes)
+                result = await make_uploader().start()
+            print(f"\nUpload successful for '{title}'!")
+            record_metrics("ok")
+            if ledger is not None:
+                ledger.manager.mark_uploaded(ledger.task_id, remote_id_of(result))
+            return result
+        except Exception as e:
+            print(f"\nUpload failed for '{title}': {e}")
+            record_metrics("throttled" if is_throttled(e) else "failed")
+            if raise_errors:
+                raise
+            # Not re-raised, so track() does not see it
+            metrics.STAGE_FAILURES.inc(stage="upload")
+            return None
+
+def cleanup_files(manager, task, video_path):
+    title = task.get("title")
+    audio_path = task.get("audio_path")
+    print(f"Cleaning up files for '{title}'...")
+    # Only derived files: source audio and images stay so later runs can reuse them
+    files_to_delete = []
+    # Duplicate audio shares one video; keep it for the other copies
+    if not manager.shares_output(audio_path):
+        stem = os.path.splitext(video_path)[0]
+        files_to_delete += [video_path, stem + ".ass", stem + ".txt"]
+    for f_path in files_to_delete:
+        if f_path and os.path.exists(f_path):
+            try:
+                os.remove(f_path)
+                print(f"  Deleted: {os.path.basename(f_path)}")
+            except Exception as e:
+                print(f"  Failed to delete {f_path}: {e}")
+
+async def upload_with_retry(limiter, max_retries=3, **kwargs):
+    """Waits for a limiter token, uploads, and backs off and retries when throttled."""
+    ledger = kwargs.get("ledger")
+    # Concurrent uploads share the event loop's thread; give each its own trace lane
+    with tracing.task(ledger.task_id if ledger is not None else None,
+                      label=f"upload {(kwargs.get('title') or '')[:30]}"):
+        for attempt in range(max_retries + 1):
+            with tracing.span("upload.wait_token", cat="wait", attempt=attempt):
+                await limiter.acquire()
+            try:
+                result = await upload(raise_errors=True, **kwargs)
+                limiter.on_success()
+                return result
+            except Exception as e:
+                if not is_throttled(e) or attempt == max_retries:
+                    return None
+                limiter.on_throttle()
+                print(f"[THROTTLED] '{kwargs.get('title')}' — slowing to {limiter.rate * 60:.1f} uploads/min, "
+                      f"retry {attempt + 1}/{max_retries}")
+    return None
+
+def prepare_upload(manager, task, label=None, in_flight=None, image_pool=None):
+    """Builds upload() kwargs for one manifest task, or prints why it is skipped and returns None.
+
+    Skips tasks without a title, tasks already uploaded and tasks without a
+    rendered video; generates the Bilibili cover if the scanner deferred it.
+    Duplicate audio is judged by its canonical task, so an episode mirrored in
+    several directories is uploaded once; in_flight holds the ids of canonical
+    tasks whose upload has already started. image_pool: an ImagePool to render
+    the cover in. Does blocking database and image work; async callers run it
+    in a thread.
+    """
+    from generate_images import ensure_task_images
+
+    title = task.get("title")
+    audio_path = task.get("audio_path")
+
+    if not title:
+        print(f"Skipping {label or audio_path}: No title")
+        return None
+
+    if len(title) > 80:
+        print(f"[WARN] Title too long ({len(title)} chars). Truncating.")
+        title = title[:80]
+
+    # Re-runs skip anything the ledger says is already on Bilibili
+    db_task = manager.get_canonical_task(audio_path)
+    if db_task and db_task.status == "uploaded":
+        print(f"Skipping '{title}': already uploaded ({db_task.remote_id}).")
+        return None
+    if db_task and in_flight is not None and db_task.id in in_flight:
+        print(f"Skipping '{title}': the same audio is already being uploaded.")
+        return None
+
+    # 1. Get Video Path from DB (duplicate audio resolves to its canonical task's video)
+    video_path = manager.find_output(audio_path)
+    
+    if not video_path:
+        print(f"Skipping '{title}': No completed video found in DB.")
+        return None
+        
+    if not os.path.exists(video_path):
+        print(f"Skipping '{title}': Video file missing at {video_path}")
+        return None
+        
+    # 2. Get Cover Image from JSON (bili_cover_path is the Bilibili cover;
+    #    image_path is the video background — they are different files)
+    # Covers are only needed now; generate it if the scanner deferred it
+    ensure_task_images([task], covers=True, pool=image_pool)
+    cover_path = task.get("bili_cover_path") or task.get("image_path")
     
-    @uploader.on("upload_chunk")
-    async def on_upload_chunk(data):
-        # Progress log
-        pass 
+    print(f"Found video: {video_path}")
+    
+    return dict(
+        video_path=video_path,
+        title=title,
+        desc=task.get("desc", ""),
+        tags=task.get("tags", ""),
+        copyright=task.get("copyright", 1),
+        source=task.get("source", ""),
+        cover_path=cover_path,
+        tid=task.get("tid", 181),
+        ledger=UploadLedger(manager, db_task.id, video_path)
+    )
 
-    try:
-        print("Starting upload...")
-        await uploader.start()
-        print(f"\nUpload successful for '{title}'!")
-    except Exception as e:
-        print(f"\nUpload failed for '{title}': {e}")
+async def batch_upload(json_path, cleanup=False, follow=False, concurrency=2, rate_per_min=12):
+    """Uploads every completed video in a manifest, `concurrency` at a time.
 
-async def batch_upload(json_path, cleanup=False):
-    if not os.path.exists(CREDENTIAL_FILE):
+    All uploads share one event loop and one Credential (bilibili_api keeps a
+    single HTTP client per event loop). Pacing comes from an AdaptiveTokenBucket
+    that starts at `rate_per_min` upload starts per minute and backs off when
+    Bilibili throttles.
+    """
+    credential = load_credential()
+    if credential is None:
         print("Please login first using --login")
         return
 
     # Import DB models
     try:
-        from karaoke_gen import JobManager, Task
+        from job_store import JobManager
     except ImportError:
-        print("Error: Could not import karaoke_gen. Make sure you are in the project root.")
+        print("Error: Could not import job_store. Make sure you are in the project root.")
         return
 
     manager = JobManager()
-    session = manager.Session()
-    
-    with open(json_path, 'r', encoding='utf-8') as f:
-        tasks = json.load(f)
-        
-    print(f"Loaded {len(tasks)} tasks from {json_path}")
     
-    for i, task in enumerate(tasks):
-        title = task.get("title")
-        audio_path = task.get("audio_path")
-        
-        if not title:
-            print(f"Skipping task {i}: No title")
-            continue
+    from generate_images import ImagePool
+    from manifest import iter_manifest
+    from rate_limit import AdaptiveTokenBucket
+
+    limiter = AdaptiveTokenBucket(rate=rate_per_min / 60, capacity=concurrency)
+    slots = asyncio.Semaphore(concurrency)
+    running = set()
+    # Canonical task ids being uploaded, so a mirrored copy of the same audio is not started twice
+    in_flight = set()
+    results = {"uploaded": 0, "failed": 0, "skipped": 0}
+
+    async def run_one(task, video_path, kwargs):
+        try:
+            result = await upload_with_retry(limiter, credential=credential, **kwargs)
+            if result is None:
+                results["failed"] += 1
+                return
+            results["uploaded"] += 1
+            # 3. Cleanup after success (optional but requested)
+            if cleanup:
+                cleanup_files(manager, task, video_path)
+        finally:
+            in_flight.discard(kwargs["ledger"].task_id)
+            slots.release()
+
+    print(f"Streaming tasks from {json_path}")
+    records = iter_manifest(json_path, follow=follow)
+    i = 0
+    # One set of worker processes for every cover the scanner deferred
+    with ImagePool() as image_pool:
+        while True:
+            # Reading (and following) the manifest must not block uploads in flight,
+            # and neither may the DB lookups and cover rendering in prepare_upload
+            task = await asyncio.to_thread(next, records, None)
+            if task is None:
+                break
+            i += 1
+            kwargs = await asyncio.to_thread(prepare_upload, manager, task, label=f"task {i}",
+                                             in_flight=in_flight, image_pool=image_pool)
+            if kwargs is None:
+                results["skipped"] += 1
+                continue
+            in_flight.add(kwargs["ledger"].task_id)
+            video_path = kwargs["video_path"]
+            await slots.acquire()
+            job = asyncio.create_task(run_one(task, video_path, kwargs))
+            running.add(job)
+            job.add_done_callback(running.discard)
+
+        if running:
+            await asyncio.gather(*running)
+    print(f"\nBatch upload done. Uploaded: {results['uploaded']}, "
+          f"Failed: {results['failed']}, Skipped: {results['skipped']}")
+    return results
 
-        if len(title) > 80:
-             print(f"[WARN] Title too long ({len(title)} chars). Truncating.")
-             title = title[:80]
-            
-        # 1. Get Video Path from DB
-        db_task = session.query(Task).filter(
-            Task.audio_path == audio_path, 
-            Task.status == 'completed'
-        ).order_by(Task.updated_at.desc()).first()
-        
-        if not db_task:
-            print(f"Skipping '{title}': No completed video found in DB.")
-            continue
-            
-        video_path = db_task.output_path
-        if not video_path or not os.path.exists(video_path):
-            print(f"Skipping '{title}': Video file missing at {video_path}")
-            continue
-            
-        # 2. Get Cover Image from JSON (bili_cover_path is the Bilibili cover;
-        #    image_path is the video background — they are different files)
-        cover_path = task.get("bili_cover_path") or task.get("image_path")
-        
-        print(f"Found video: {video_path}")
-        
-        await upload(
-            video_path=video_path,
-            title=title,
-            desc=task.get("desc", ""),
-            tags=task.get("tags", ""),
-            copyright=task.get("copyright", 1),
-            source=task.get("source", ""),
-            cover_path=cover_path,
-            tid=task.get("tid", 181)
-        )
-        
-        # 3. Cleanup after success (optional but requested)
-        if cleanup:
-            print(f"Cleaning up files for '{title}'...")
-            files_to_delete = [
-                video_path,
-                video_path.replace(".mp4", ".ass"),
-                audio_path,
-                task.get("image_path"),
-                task.get("bili_cover_path")
-            ]
-            for f_path in files_to_delete:
-                if f_path and os.path.exists(f_path):
-                    try:
-                        os.remove(f_path)
-                        print(f"  Deleted: {os.path.basename(f_path)}")
-                    except Exception as e:
-                        print(f"  Failed to delete {f_path}: {e}")
-
-        print("Waiting 5s before next upload...")
-        await asyncio.sleep(5)
-        
-    session.close()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Bilibili Uploader (v2 API)")
@@ -227,8 +452,12 @@ if __name__ == "__main__":
     parser.add_argument("--tags", default="Karaoke", help="Comma separated tags")
     parser.add_argument("--tid", type=int, default=181, help="Bilibili partition TID (default 181 - Knowledge)")
     parser.add_argument("--cover", help="Path to cover image (required for single upload)")
-    parser.add_argument("--batch", help="Path to tasks.json for batch upload")
-    parser.add_argument("--cleanup", action="store_true", help="Delete source and generated files after successful upload")
+    parser.add_argument("--batch", help="Path to the task manifest (tasks.jsonl or legacy tasks.json) for batch upload")
+    parser.add_argument("--follow", action="store_true", help="Keep reading the manifest while it is still being written")
+    parser.add_argument("--cleanup", action="store_true", help="Delete the uploaded video and its subtitles/transcript (source files are kept)")
+    parser.add_argument("--concurrency", type=int, default=2, help="Videos uploaded at the same time in --batch mode")
+    parser.add_argument("--rate", type=float, default=12,
+                        help="Initial upload starts per minute; lowered automatically when throttled")
 
     args = parser.parse_args()
 
@@ -236,7 +465,8 @@ if __name__ == "__main__":
     if args.login:
         asyncio.run(login())
     elif args.batch:
-        asyncio.run(batch_upload(args.batch, cleanup=args.cleanup))
+        asyncio.run(batch_upload(args.batch, cleanup=args.cleanup, follow=args.follow,
+                                 concurrency=args.concurrency, rate_per_min=args.rate))
     elif args.upload:
         if not args.title:
             print("Error: --title is required for upload.")
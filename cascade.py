@@ -0,0 +1,106 @@
+"""
+Model cascade helpers: find low-confidence stretches of a fast transcript and
+splice a larger model's transcript of just those stretches back in.
+
+Pure functions over Whisper segments (anything with start/end/text/words,
+avg_logprob and no_speech_prob), so they work with faster_whisper's Segment
+type and are testable without it. karaoke_gen.CascadeTranscriber drives them.
+"""
+
+from collections import namedtuple
+from typing import Any, List, Sequence, Tuple
+
+# Same defaults faster_whisper uses to decide a decode failed / a window is silence
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+# Output segments that had to be rebuilt; SubtitleGenerator only reads start/end/text/words
+TranscriptSegment = namedtuple("TranscriptSegment", "start end text words avg_logprob no_speech_prob")
+
+Range = Tuple[float, float]
+
+
+def is_low_confidence(segment, logprob_threshold=LOGPROB_THRESHOLD, no_speech_threshold=NO_SPEECH_THRESHOLD):
+    if segment.avg_logprob < logprob_threshold:
+        return True
+    # Text over what the model thinks is silence is usually a hallucination
+    return segment.no_speech_prob > no_speech_threshold and bool(segment.text.strip())
+
+
+def flag_segments(segments: Sequence[Any], logprob_threshold=LOGPROB_THRESHOLD,
+                  no_speech_threshold=NO_SPEECH_THRESHOLD) -> List[Range]:
+    """Time ranges of the segments that should be re-transcribed."""
+    return [(s.start, s.end) for s in segments
+            if is_low_confidence(s, logprob_threshold, no_speech_threshold)]
+
+
+def merge_ranges(ranges: Sequence[Range], gap: float = 1.0) -> List[Range]:
+    """Sorts ranges and merges those that overlap or are less than `gap` seconds apart."""
+    merged: List[List[float]] = []
+    for start, end in sorted(ranges):
+        if merged and start - merged[-1][1] < gap:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def pad_ranges(ranges: Sequence[Range], padding: float, duration: float = None) -> List[Range]:
+    """Widens each range by `padding` seconds (clamped to the audio) to give the model context."""
+    padded = [(max(0.0, start - padding), end + padding if duration is None else min(duration, end + padding))
+              for start, end in ranges]
+    return merge_ranges(padded, gap=0.0)
+
+
+def clip_timestamps(ranges: Sequence[Range]) -> List[float]:
+    """faster_whisper's clip_timestamps format: [start1, end1, start2, end2, ...]."""
+    return [round(t, 3) for r in ranges for t in r]
+
+
+def _midpoint(item) -> float:
+    return (item.start + item.end) / 2
+
+
+def _inside(t: float, ranges: Sequence[Range]) -> bool:
+    return any(start <= t <= end for start, end in ranges)
+
+
+def _trim(segment, core: Sequence[Range]):
+    """The part of a replacement segment whose words fall inside the core ranges, or None."""
+    words = list(segment.words or [])
+    if not words:
+        return segment if _inside(_midpoint(segment), core) else None
+    kept = [w for w in words if _inside(_midpoint(w), core)]
+    if not kept:
+        return None
+    if len(kept) == len(words):
+        return segment
+    return TranscriptSegment(kept[0].start, kept[-1].end, "".join(w.word for w in kept), kept,
+                             segment.avg_logprob, segment.no_speech_prob)
+
+
+def splice(base: Sequence[Any], flagged: Sequence[Range], replacement: Sequence[Any]) -> List[Any]:
+    """Replaces the flagged stretches of `base` with the matching words of `replacement`.
+
+    Base segments whose midpoint lies in a flagged range are dropped. The
+    replacement was transcribed from padded ranges, so only its words whose
+    midpoint falls inside the span of the dropped segments are kept; the
+    padding gives the large model context without duplicating the words of
+    neighbouring, confidently transcribed segments.
+    """
+    flagged = merge_ranges(flagged, gap=0.0)
+    kept, core = [], []
+    for segment in base:
+        if _inside(_midpoint(segment), flagged):
+            if core and segment.start <= core[-1][1]:
+                core[-1] = (core[-1][0], max(core[-1][1], segment.end))
+            else:
+                core.append((segment.start, segment.end))
+        else:
+            kept.append(segment)
+
+    for segment in replacement:
+        trimmed = _trim(segment, core)
+        if trimmed is not None:
+            kept.append(trimmed)
+    return sorted(kept, key=lambda s: s.start)
@@ -0,0 +1,183 @@
+"""
+Coordinator: serves the job database to render nodes over HTTP.
+
+Workers (worker.py) claim a task and get a lease on it, download its audio
+and background if they do not share the coordinator's disk, keep the lease
+alive with heartbeats while they transcribe and render, upload the finished
+artifacts and then complete the task. A task whose worker stops
+heartbeating is put back to pending and handed to the next worker that
+asks, so a node that dies mid-episode costs only that episode's progress.
+
+Endpoints:
+  POST /claim                               {"worker_id"} -> task, or 204 when the queue is empty
+  POST /tasks/{id}/heartbeat                {"worker_id"} -> 409 if the lease was lost
+  GET  /tasks/{id}/audio, /tasks/{id}/image  input files
+  PUT  /tasks/{id}/artifacts/{name}?worker_id=...   raw file body
+  POST /tasks/{id}/complete                 {"worker_id", "status", "output", "error", "metrics"}
+  GET  /status                              task counts by status
+  GET  /metrics                             queue depth per status in the Prometheus text format
+
+Usage:
+  python coordinator.py --host 0.0.0.0 --port 8700
+"""
+
+import argparse
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import FileResponse, PlainTextResponse
+from pydantic import BaseModel
+
+import artifact_store
+import metrics
+from job_store import JobManager
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 120
+ARTIFACT_DIR = "output"
+
+
+class WorkerRequest(BaseModel):
+    worker_id: str
+
+
+class CompleteRequest(BaseModel):
+    worker_id: str
+    status: str = "completed"
+    output: Optional[str] = None
+    error: Optional[str] = None
+    metrics: Dict[str, Any] = {}
+
+
+def _artifact_path(artifact_dir: str, task_id: int, name: str) -> str:
+    # Names come from the worker; never let one escape the task's folder
+    safe = os.path.basename(name)
+    if not safe or safe in (".", ".."):
+        raise HTTPException(status_code=400, detail=f"Invalid artifact name '{name}'")
+    return os.path.join(artifact_dir, str(task_id), safe)
+
+
+def create_app(job_manager: JobManager = None, artifact_dir: str = ARTIFACT_DIR,
+               lease_seconds: float = LEASE_SECONDS, policy: str = "lpt",
+               budget_bytes: Optional[int] = None) -> FastAPI:
+    jobs = job_manager or JobManager()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # Queue depth of this app's database only while it is serving
+        metrics.watch_queue(jobs)
+        try:
+            yield
+        finally:
+            metrics.unwatch_queue(jobs)
+
+    app = FastAPI(title="StreamFluent coordinator", lifespan=lifespan)
+    # Disk budget defaults to STREAMFLUENT_ARTIFACT_BUDGET_GB; videos awaiting upload are never evicted
+    store = artifact_store.ArtifactStore(artifact_dir, budget_bytes=budget_bytes, job_manager=jobs)
+    store.sweep_temporaries()
+
+    def leased(task_id: int, worker_id: str):
+        if not jobs.holds_lease(task_id, worker_id):
+            raise HTTPException(status_code=409, detail=f"Task {task_id} is not leased to {worker_id}")
+
+    @app.post("/claim")
+    def claim(req: WorkerRequest):
+        task = jobs.claim_task(req.worker_id, lease_seconds, policy)
+        if task is None:
+            return Response(status_code=204)
+        return {"id": task.id, "audio_path": task.audio_path, "image_path": task.image_path,
+                "duration": task.duration, "codec": task.codec, "bitrate": task.bitrate, "attempts": task.attempts, "lease_seconds": lease_seconds}
+
+    @app.post("/tasks/{task_id}/heartbeat")
+    def heartbeat(task_id: int, req: WorkerRequest):
+        if not jobs.heartbeat(task_id, req.worker_id, lease_seconds):
+            raise HTTPException(status_code=409, detail=f"Task {task_id} is not leased to {req.worker_id}")
+        return {"lease_seconds": lease_seconds}
+
+    def _input(task_id: int, attr: str):
+        task = jobs.get_task_by_id(task_id)
+        path = getattr(task, attr, None) if task else None
+        if not path or not os.path.exists(path):
+            raise HTTPException(status_code=404, detail=f"No {attr} for task {task_id}")
+        return FileResponse(path, filename=os.path.basename(path))
+
+    @app.get("/tasks/{task_id}/audio")
+    def audio(task_id: int):
+        return _input(task_id, "audio_path")
+
+    @app.get("/tasks/{task_id}/image")
+    def image(task_id: int):
+        return _input(task_id, "image_path")
+
+    @app.put("/tasks/{task_id}/artifacts/{name}")
+    async def upload_artifact(task_id: int, name: str, worker_id: str, request: Request):
+        leased(task_id, worker_id)
+        path = _artifact_path(artifact_dir, task_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Stream to a temp file and rename, so a dropped upload never leaves a truncated artifact
+        size = 0
+        with artifact_store.atomic_path(path) as tmp:
+            with open(tmp, "wb") as f:
+                async for chunk in request.stream():
+                    f.write(chunk)
+                    size += len(chunk)
+        return {"path": path, "bytes": size}
+
+    @app.post("/tasks/{task_id}/complete")
+    def complete(task_id: int, req: CompleteRequest):
+        if req.status not in ("completed", "failed"):
+            raise HTTPException(status_code=400, detail=f"Unknown status '{req.status}'")
+        output_path = None
+        if req.status == "completed":
+            if not req.output:
+                raise HTTPException(status_code=400, detail="A completed task needs its output artifact")
+            output_path = _artifact_path(artifact_dir, task_id, req.output)
+            if not os.path.exists(output_path):
+                raise HTTPException(status_code=400, detail=f"Artifact '{req.output}' was not uploaded")
+        for stage, stage_metrics in req.metrics.items():
+            jobs.record_stage_metrics(task_id, stage, stage_metrics)
+        if not jobs.finish_task(task_id, req.worker_id, req.status, output_path=output_path, error_msg=req.error):
+            raise HTTPException(status_code=409, detail=f"Task {task_id} is not leased to {req.worker_id}")
+        store.collect()
+        return {"status": req.status, "output_path": output_path}
+
+    @app.get("/status")
+    def status():
+        jobs.requeue_expired()
+        return jobs.status_counts()
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def prometheus():
+        jobs.requeue_expired()
+        return PlainTextResponse(metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the karaoke job queue to render workers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS,
+                        help="Seconds a worker may go without a heartbeat before its task is re-queued")
+    parser.add_argument("--artifact-dir", default=ARTIFACT_DIR, help="Where uploaded videos and subtitles are stored")
+    parser.add_argument("--disk-budget-gb", type=float,
+                        help="Cap the artifact directory at this size, evicting uploaded tasks' files first")
+    parser.add_argument("--policy", default="lpt", help="Order tasks are handed out in (see scheduler.py)")
+    args = parser.parse_args()
+
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    budget = int(args.disk_budget_gb * 1024 ** 3) if args.disk_budget_gb else None
+    app = create_app(artifact_dir=args.artifact_dir, lease_seconds=args.lease, policy=args.policy,
+                     budget_bytes=budget)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
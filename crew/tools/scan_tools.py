@@ -1,4 +1,3 @@
-import json
 import os
 import sys
 from typing import Type
@@ -11,7 +10,7 @@ _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
-from scan_tasks import scan_directory  # noqa: E402
+import pipeline  # noqa: E402
 
 
 class ScanDirectoryInput(BaseModel):
@@ -20,8 +19,15 @@ class ScanDirectoryInput(BaseModel):
         description="Absolute or relative path to the directory containing audio and image files",
     )
     output_json: str = Field(
-        default="tasks.json",
-        description="File path where the discovered tasks will be written as JSON",
+        default="tasks.jsonl",
+        description="File path where the discovered tasks will be written (JSON Lines, one task per line)",
+    )
+    defer_images: bool = Field(
+        default=False,
+        description=(
+            "If True, skip generating missing background/cover images during the scan; "
+            "the karaoke and upload tools generate them when they are needed"
+        ),
     )
 
 
@@ -31,25 +37,11 @@ class ScanDirectoryTool(BaseTool):
         "Scans a directory recursively for audio files (mp3, wav, m4a, flac). "
         "For each audio file it finds or generates a matching background image and "
         "Bilibili cover image. Writes all task metadata (audio path, image paths, "
-        "title, tags, etc.) to a tasks.json file. "
+        "title, tags, etc.) to a tasks.jsonl manifest, one task per line. "
         "Use this to prepare a batch of podcast episodes for karaoke processing."
     )
     args_schema: Type[BaseModel] = ScanDirectoryInput
 
-    def _run(self, base_dir: str, output_json: str = "tasks.json") -> str:
-        try:
-            tasks = scan_directory(base_dir)
-            if not tasks:
-                return f"No audio tasks found in '{base_dir}'."
-
-            with open(output_json, "w", encoding="utf-8") as f:
-                json.dump(tasks, f, indent=4, ensure_ascii=False)
-
-            preview = tasks[0].get("audio_path", "N/A")
-            return (
-                f"Scan complete. Found {len(tasks)} audio task(s). "
-                f"Written to '{output_json}'. "
-                f"First entry: {preview}"
-            )
-        except Exception as e:
-            return f"ERROR: Directory scan failed — {e}"
+    def _run(self, base_dir: str, output_json: str = "tasks.jsonl", defer_images: bool = False) -> str:
+        result = pipeline.scan(base_dir, output_json, defer_images=defer_images)
+        return result.message if result.ok else f"ERROR: {result.message}"
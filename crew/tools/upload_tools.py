@@ -1,7 +1,5 @@
-import asyncio
 import os
 import sys
-import threading
 from typing import Type
 
 from crewai.tools import BaseTool
@@ -11,70 +9,38 @@ _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
-CREDENTIAL_FILE = os.path.join(_PROJECT_ROOT, "bili_sess.json")
-
-
-def _run_async(coro):
-    """Run an async coroutine safely regardless of whether an event loop is running.
-
-    CrewAI runs its own async event loop, so asyncio.run() would raise
-    'This event loop is already running'. Running in a fresh thread avoids that.
-    """
-    exc: list = [None]
-
-    def target():
-        try:
-            asyncio.run(coro)
-        except Exception as e:
-            exc[0] = e
+import pipeline  # noqa: E402
 
-    t = threading.Thread(target=target, daemon=True)
-    t.start()
-    t.join()
-    if exc[0]:
-        raise exc[0]
+CREDENTIAL_FILE = os.path.join(_PROJECT_ROOT, "bili_sess.json")
 
 
 class BilibiliUploadInput(BaseModel):
     tasks_json: str = Field(
-        default="tasks.json",
+        default="tasks.jsonl",
         description=(
-            "Path to the tasks JSON file. Each entry must have 'audio_path', 'title', "
+            "Path to the task manifest (.jsonl, or legacy .json). Each entry must have 'audio_path', 'title', "
             "'desc', 'tags', 'tid', 'copyright', 'source', and 'bili_cover_path'."
         ),
     )
     cleanup: bool = Field(
         default=False,
-        description="If True, delete source audio, generated video, and image files after a successful upload",
+        description=(
+            "If True, delete the uploaded video and its .ass subtitles and .txt transcript after a successful "
+            "upload. Source audio and image files are always kept"
+        ),
     )
 
 
 class BilibiliUploadTool(BaseTool):
     name: str = "Bilibili Batch Uploader"
     description: str = (
-        "Reads tasks from tasks.json, looks up each completed karaoke video in the database, "
+        "Reads tasks from the tasks.jsonl manifest, looks up each completed karaoke video in the database, "
         "and uploads it to Bilibili with title, description, tags, and cover image. "
         "Requires a valid 'bili_sess.json' credential file (run: python bili_upload.py --login). "
         "Returns a summary of upload results."
     )
     args_schema: Type[BaseModel] = BilibiliUploadInput
 
-    def _run(self, tasks_json: str = "tasks.json", cleanup: bool = False) -> str:
-        try:
-            if not os.path.exists(CREDENTIAL_FILE):
-                return (
-                    "ERROR: bili_sess.json not found. "
-                    "Please authenticate first: python bili_upload.py --login"
-                )
-            if not os.path.exists(tasks_json):
-                return f"ERROR: Tasks file not found: '{tasks_json}'"
-
-            from bili_upload import batch_upload  # noqa: E402
-
-            _run_async(batch_upload(tasks_json, cleanup=cleanup))
-            return (
-                f"Bilibili batch upload completed from '{tasks_json}'. "
-                "Check console output above for per-video status."
-            )
-        except Exception as e:
-            return f"ERROR: Upload failed — {e}"
+    def _run(self, tasks_json: str = "tasks.jsonl", cleanup: bool = False) -> str:
+        result = pipeline.publish(tasks_json, cleanup=cleanup, credential_file=CREDENTIAL_FILE)
+        return result.message if result.ok else f"ERROR: {result.message}"
@@ -0,0 +1,33 @@
+import hashlib
+import os
+
+# Sampled fingerprint: file size plus a handful of fixed-size chunks spread over the file
+SAMPLE_COUNT = 8
+SAMPLE_SIZE = 64 * 1024
+
+
+def quick_fingerprint(path):
+    """Cheap content fingerprint: reads at most SAMPLE_COUNT * SAMPLE_SIZE bytes.
+
+    Identical files always share a fingerprint; different files almost never
+    do, and full_hash() settles the rare collision.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, "rb") as f:
+        if size <= SAMPLE_COUNT * SAMPLE_SIZE:
+            digest.update(f.read())
+        else:
+            step = (size - SAMPLE_SIZE) // (SAMPLE_COUNT - 1)
+            for i in range(SAMPLE_COUNT):
+                f.seek(i * step)
+                digest.update(f.read(SAMPLE_SIZE))
+    return f"{size}-{digest.hexdigest()}"
+
+
+def full_hash(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -1,50 +1,145 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+import hashlib
 import os
+import tempfile
 import textwrap
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import artifact_store
+import metrics
+import tracing
+
+# Common macOS fonts
+FONT_FALLBACKS = [
+    "/System/Library/Fonts/Supplemental/Arial.ttf",
+    "/System/Library/Fonts/STHeiti Light.ttc",
+    "/System/Library/Fonts/Helvetica.ttc"
+]
+# Bold fonts match the reference artwork better
+BOLD_FONT_FALLBACKS = [
+    "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
+    "/System/Library/Fonts/Helvetica-Bold.ttc",
+    "/System/Library/Fonts/STHeiti Medium.ttc"
+]
+
+@lru_cache(maxsize=16)
+def load_font(font_path, font_size):
+    """Loads (and caches) a font; font_path=None gives PIL's built-in font."""
+    if font_path:
+        return ImageFont.truetype(font_path, font_size)
+    return ImageFont.load_default()
+
+@lru_cache(maxsize=4096)
+def _line_height(font_path, font_size, line):
+    bbox = load_font(font_path, font_size).getbbox(line)
+    return bbox[3] - bbox[1]
+
+# --- Background normalization ---
+
+# Render canvas; matches PlayResX/PlayResY of the ASS subtitles
+CANVAS = (1920, 1080)
+CANVAS_DIR_ENV = "STREAMFLUENT_CANVAS_DIR"
+# "fit" letterboxes the whole artwork onto the canvas, "fill" scales it to cover and crops
+CANVAS_MODES = ("fit", "fill")
+
+def canvas_cache_dir():
+    return os.environ.get(CANVAS_DIR_ENV) or os.path.join(tempfile.gettempdir(), "streamfluent-canvas")
+
+def _file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+@lru_cache(maxsize=256)
+def _normalized(image_path, size, mtime_ns, canvas, mode, cache_dir):
+    # size and mtime_ns are only part of the key: an edited image is looked at again
+    with Image.open(image_path) as src:
+        if src.size == canvas and src.mode == "RGB" and src.format in ("JPEG", "PNG"):
+            return image_path
+        out_path = os.path.join(cache_dir, f"{_file_hash(image_path)[:24]}_{canvas[0]}x{canvas[1]}_{mode}.png")
+        if os.path.exists(out_path):
+            return out_path
+        with tracing.span("image.normalize", source=f"{src.size[0]}x{src.size[1]}", mode=mode):
+            img = ImageOps.exif_transpose(src).convert("RGB")
+            if mode == "fill":
+                img = ImageOps.fit(img, canvas, Image.LANCZOS)
+            else:
+                img = ImageOps.pad(img, canvas, Image.LANCZOS, color=(0, 0, 0))
+            os.makedirs(cache_dir, exist_ok=True)
+            with artifact_store.atomic_path(out_path) as tmp:
+                # Lossless, and cheap to decode: FFmpeg decodes the still again for every frame
+                img.save(tmp, "PNG", compress_level=1)
+    return out_path
+
+def normalize_background(image_path, canvas=CANVAS, mode="fit", cache_dir=None):
+    """Returns a path to image_path sized exactly to the canvas (RGB, even dimensions).
+
+    Images already matching the canvas come back unchanged; anything else is
+    letterboxed ("fit") or cropped ("fill") once and cached by content hash,
+    so the encoder's work no longer depends on the artwork's resolution.
+    """
+    if mode not in CANVAS_MODES:
+        raise ValueError(f"Unknown canvas mode '{mode}' (choose from {', '.join(CANVAS_MODES)})")
+    if canvas[0] % 2 or canvas[1] % 2:
+        raise ValueError(f"Canvas {canvas[0]}x{canvas[1]} must have even dimensions for yuv420p")
+    st = os.stat(image_path)
+    key = (os.path.abspath(image_path), st.st_size, st.st_mtime_ns, tuple(canvas), mode,
+           cache_dir or canvas_cache_dir())
+    path = _normalized(*key)
+    if not os.path.exists(path):
+        # The cached copy was cleaned up (temp directory) since it was made
+        _normalized.cache_clear()
+        path = _normalized(*key)
+    return path
+
+metrics.register_cache("font", load_font)
+metrics.register_cache("line_height", _line_height)
+metrics.register_cache("canvas", _normalized)
 
 class ImageGenerator:
-    def __init__(self, background_base="background_base.png", cover_base="cover_base.png", font_path=None):
+    def __init__(self, background_base="background_base.png", cover_base="cover_base.png", font_path=None,
+                 fast_jpeg=False):
         self.background_base = background_base
         self.cover_base = cover_base
+        # fast_jpeg trades a little quality for quicker encodes on large batches
+        self.jpeg_options = {"quality": 85, "subsampling": 2, "optimize": False} if fast_jpeg else {"quality": 95}
+        self._templates = {}
         
         # Try to find a nice font
         if font_path and os.path.exists(font_path):
             self.font_path = font_path
         else:
-            # Common macOS fonts
-            fallbacks = [
-                "/System/Library/Fonts/Supplemental/Arial.ttf",
-                "/System/Library/Fonts/STHeiti Light.ttc",
-                "/System/Library/Fonts/Helvetica.ttc"
-            ]
-            self.font_path = next((f for f in fallbacks if os.path.exists(f)), None)
+            self.font_path = next((f for f in FONT_FALLBACKS if os.path.exists(f)), None)
+        self.bold_font_path = next((f for f in BOLD_FONT_FALLBACKS if os.path.exists(f)), self.font_path)
 
+    def _template(self, base_path):
+        """Returns the decoded base image; each path is only opened once per generator."""
+        template = self._templates.get(base_path)
+        if template is None:
+            with Image.open(base_path) as src:
+                template = src.convert("RGB")
+            self._templates[base_path] = template
+        return template
+
+    @tracing.traced("image.generate")
     def generate(self, title, output_path, is_cover=False):
         base_path = self.cover_base if is_cover else self.background_base
         
-        if not os.path.exists(base_path):
+        if base_path not in self._templates and not os.path.exists(base_path):
             print(f"Error: Base image {base_path} not found.")
             return False
             
-        img = Image.open(base_path).convert("RGB")
+        img = self._template(base_path).copy()
         draw = ImageDraw.Draw(img)
         w, h = img.size
         
         # Font settings
         font_size = 80 if is_cover else 90
-        
-        # Try to find a bold font for better match
-        bold_fallbacks = [
-            "/System/Library/Fonts/Supplemental/Arial Bold.ttf",
-            "/System/Library/Fonts/Helvetica-Bold.ttc",
-            "/System/Library/Fonts/STHeiti Medium.ttc"
-        ]
-        actual_font_path = next((f for f in bold_fallbacks if os.path.exists(f)), self.font_path)
-
-        if actual_font_path:
-            font = ImageFont.truetype(actual_font_path, font_size)
-        else:
-            font = ImageFont.load_default()
+        font = load_font(self.bold_font_path, font_size)
             
         # Wrap text - We want it on the right half
         # Logic: x_start = w * 0.45 (approx center-right)
@@ -55,7 +150,7 @@ class ImageGenerator:
         
         # Calculate vertical positioning
         # line_spacing = 1.2
-        line_heights = [draw.textbbox((0,0), line, font=font)[3] - draw.textbbox((0,0), line, font=font)[1] for line in lines]
+        line_heights = [_line_height(self.bold_font_path, font_size, line) for line in lines]
         spacing = 15
         total_text_height = sum(line_heights) + (len(lines) - 1) * spacing
         
@@ -73,17 +168,142 @@ class ImageGenerator:
         x_start = int(w * 0.45)
         text_color = (30, 30, 30) # Darker grey
         
-        for line in lines:
+        for line, line_h in zip(lines, line_heights):
             # Left aligned within the right section
             draw.text((x_start, current_y), line, font=font, fill=text_color)
+            current_y += line_h + spacing
             
-            bbox = draw.textbbox((0, 0), line, font=font)
-            current_y += (bbox[3] - bbox[1]) + spacing
-            
-        img.save(output_path, "JPEG", quality=95)
+        img.save(output_path, "JPEG", **self.jpeg_options)
         print(f"Generated {'Cover' if is_cover else 'Background'}: {output_path}")
         return True
 
+    def generate_many(self, jobs):
+        """Renders a batch of (title, output_path, is_cover) jobs.
+
+        Templates, fonts and line measurements are shared across the batch, so
+        the per-image cost is essentially drawing plus JPEG encoding.
+        Returns a list of booleans, one per job.
+        """
+        results = []
+        for title, output_path, is_cover in jobs:
+            try:
+                results.append(self.generate(title, output_path, is_cover=is_cover))
+            except Exception as e:
+                print(f"Error generating {output_path}: {e}")
+                results.append(False)
+        return results
+
+# --- Process-pool generation ---
+
+# One generator per worker process, created on the first job it runs
+_worker_generator = None
+
+def _generate_in_worker(title, output_path, is_cover, fast_jpeg=False):
+    global _worker_generator
+    if _worker_generator is None:
+        _worker_generator = ImageGenerator(fast_jpeg=fast_jpeg)
+    # The worker's generator keeps its templates across jobs, so each job is one more item of its batch
+    return _worker_generator.generate_many([(title, output_path, is_cover)])[0]
+
+class ImagePool:
+    """Renders backgrounds and covers in worker processes.
+
+    submit() returns immediately, so callers such as scan_directory can keep
+    going while PIL renders and JPEG encodes run on other cores. Jobs are
+    de-duplicated by output path (several episodes may share one cover).
+    Safe to share between threads, e.g. the pipeline's render and upload stages.
+    """
+
+    def __init__(self, max_workers=None, fast_jpeg=False):
+        self.max_workers = max_workers
+        self.fast_jpeg = fast_jpeg
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, title, output_path, is_cover=False):
+        with self._lock:
+            if output_path in self._futures:
+                return self._futures[output_path]
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            future = self._executor.submit(_generate_in_worker, title, output_path, is_cover, self.fast_jpeg)
+            self._futures[output_path] = future
+            return future
+
+    def collect(self, output_paths):
+        """Blocks until the jobs for output_paths are done. Returns the number of failures among them.
+
+        Collected jobs are forgotten, so a long-lived pool does not hold on to every
+        future it ever ran.
+        """
+        failed = 0
+        for output_path in output_paths:
+            with self._lock:
+                future = self._futures.get(output_path)
+            if future is None:
+                continue
+            try:
+                if not future.result():
+                    failed += 1
+            except Exception as e:
+                print(f"Error generating {output_path}: {e}")
+                failed += 1
+            with self._lock:
+                if self._futures.get(output_path) is future:
+                    del self._futures[output_path]
+        return failed
+
+    def wait(self):
+        """collect() for every job submitted so far; a later wait() only reports newer jobs."""
+        with self._lock:
+            output_paths = list(self._futures)
+        return self.collect(output_paths)
+
+    def shutdown(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+def ensure_task_images(tasks, covers=False, max_workers=None, pool=None):
+    """Generates any missing backgrounds (or Bilibili covers) for scanned tasks.
+
+    Used by the render and upload stages when the scan ran with image
+    generation deferred. Pass the caller's long-lived ImagePool as `pool` to
+    reuse its worker processes; otherwise a single missing image is rendered
+    in-process and larger batches go through a temporary ImagePool.
+    Returns the number that failed.
+    """
+    key = "bili_cover_path" if covers else "image_path"
+    jobs = {}
+    for task in tasks:
+        output_path = task.get(key)
+        if output_path and output_path not in jobs and not os.path.exists(output_path):
+            jobs[output_path] = task.get("image_title") or task.get("title", "")
+    if not jobs:
+        return 0
+
+    for output_path in jobs:
+        print(f"{'Cover' if covers else 'Background'} missing, generating -> {os.path.basename(output_path)}")
+    if pool is not None:
+        for output_path, title in jobs.items():
+            pool.submit(title, output_path, is_cover=covers)
+        return pool.collect(jobs)
+    if len(jobs) == 1:
+        (output_path, title), = jobs.items()
+        return 0 if ImageGenerator().generate_many([(title, output_path, covers)])[0] else 1
+
+    with ImagePool(max_workers=max_workers) as pool:
+        for output_path, title in jobs.items():
+            pool.submit(title, output_path, is_cover=covers)
+        return pool.wait()
+
 if __name__ == "__main__":
     # Test
     gen = ImageGenerator()
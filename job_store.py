@@ -0,0 +1,375 @@
+"""
+Job database: the tasks table and JobManager.
+
+Kept apart from karaoke_gen so that commands that only read or update task
+state (uploads, status queries, the watcher) load SQLAlchemy but not the
+transcription stack.
+"""
+
+import datetime
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, func, inspect, text, Column, Integer, Float, String, DateTime, Text
+from sqlalchemy.orm import declarative_base, sessionmaker
+
+import artifact_store
+import scheduler
+from fingerprint import quick_fingerprint, full_hash
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = "karaoke_tasks.db"
+
+# --- Database Model ---
+Base = declarative_base()
+
+class Task(Base):
+    __tablename__ = 'tasks'
+    
+    id = Column(Integer, primary_key=True)
+    audio_path = Column(String, nullable=False)
+    image_path = Column(String, nullable=False)
+    output_path = Column(String, nullable=True)
+    status = Column(String, default="pending") 
+    error_msg = Column(Text, nullable=True)
+    # Audio metadata probed at scan time (used for scheduling)
+    duration = Column(Float, nullable=True)
+    codec = Column(String, nullable=True)
+    bitrate = Column(Integer, nullable=True)
+    priority = Column(Integer, default=0)
+    deadline = Column(DateTime, nullable=True)
+    # Content identity: sampled fingerprint, full SHA-256 (computed only on fingerprint collisions)
+    content_hash = Column(String, nullable=True, index=True)
+    full_hash = Column(String, nullable=True)
+    # Set on "duplicate" tasks: the task whose artifacts this audio shares
+    canonical_id = Column(Integer, nullable=True)
+    # Upload ledger: Bilibili id once submitted, and resumable state while uploading
+    remote_id = Column(String, nullable=True)
+    upload_state = Column(Text, nullable=True)
+    uploaded_at = Column(DateTime, nullable=True)
+    # Per-stage telemetry as JSON: {"upload": {"bytes_per_s": ..., ...}, ...}
+    stage_metrics = Column(Text, nullable=True)
+    # Lease held by a remote worker while it processes the task (coordinator.py)
+    worker_id = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+# --- Job Manager ---
+
+class JobManager:
+    def __init__(self, db_url=f"sqlite:///{DB_PATH}"):
+        self.engine = create_engine(db_url)
+        Base.metadata.create_all(self.engine)
+        self._migrate()
+        self.Session = sessionmaker(bind=self.engine)
+
+    def _migrate(self):
+        # create_all() never alters an existing table, so add columns introduced since it was created
+        existing = {c["name"] for c in inspect(self.engine).get_columns(Task.__tablename__)}
+        with self.engine.begin() as conn:
+            for column in Task.__table__.columns:
+                if column.name not in existing:
+                    col_type = column.type.compile(dialect=self.engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {Task.__tablename__} ADD COLUMN {column.name} {col_type}"))
+            for index in Task.__table__.indexes:
+                index.create(conn, checkfirst=True)
+
+    def _find_canonical(self, session, audio_path: str, fingerprint: str):
+        """Returns an existing task with byte-identical audio, confirming fingerprint matches with a full hash."""
+        candidates = session.query(Task).filter(
+            Task.content_hash == fingerprint,
+            Task.canonical_id.is_(None),
+            Task.audio_path != audio_path,
+        ).order_by(Task.id).all()
+        if not candidates:
+            return None, None
+
+        own_hash = full_hash(audio_path)
+        for candidate in candidates:
+            if not candidate.full_hash:
+                if not os.path.exists(candidate.audio_path):
+                    continue
+                candidate.full_hash = full_hash(candidate.audio_path)
+            if candidate.full_hash == own_hash:
+                return candidate, own_hash
+        return None, own_hash
+
+    @staticmethod
+    def _retry_failed(session, task):
+        """Re-queues a failed canonical task when one of its duplicates is added again."""
+        if task is not None and task.status == "failed":
+            task.status = "pending"
+            session.commit()
+            logger.info(f"Task {task.id} reset from 'failed' -> 'pending'")
+
+    def add_task(self, audio_path: str, image_path: str, **metadata) -> int:
+        """Adds (or re-queues) a task. metadata may set duration, codec, bitrate, priority, deadline."""
+        metadata = {k: v for k, v in metadata.items() if v is not None}
+        if isinstance(metadata.get("deadline"), str):
+            metadata["deadline"] = datetime.datetime.fromisoformat(metadata["deadline"])
+
+        session = self.Session()
+        # Check if task already exists for this audio file
+        existing_task = session.query(Task).filter_by(audio_path=audio_path).first()
+        
+        if existing_task:
+            task_id = existing_task.id
+            for key, value in metadata.items():
+                setattr(existing_task, key, value)
+            session.commit()
+            if existing_task.status == "uploaded":
+                logger.info(f"Task {task_id} already uploaded as {existing_task.remote_id}: {audio_path}")
+            elif existing_task.status == "duplicate":
+                logger.info(f"Task {task_id} is a duplicate of Task {existing_task.canonical_id}: {audio_path}")
+                task_id = existing_task.canonical_id
+                self._retry_failed(session, session.get(Task, task_id))
+            elif existing_task.status == "completed":
+                logger.info(f"Task {task_id} already completed for: {audio_path}")
+            elif existing_task.status in ["processing", "failed"]:
+                # Recover from crash or retry failed task
+                old_status = existing_task.status
+                existing_task.status = "pending"
+                session.commit()
+                logger.info(f"Task {task_id} reset from '{old_status}' -> 'pending'")
+            else:
+                logger.info(f"Task {task_id} exists with status: {existing_task.status}")
+            session.close()
+            return task_id
+
+        # Same audio already queued under another path (e.g. a mirrored show folder)?
+        fingerprint = quick_fingerprint(audio_path) if os.path.exists(audio_path) else None
+        canonical, own_hash = (None, None)
+        if fingerprint:
+            canonical, own_hash = self._find_canonical(session, audio_path, fingerprint)
+
+        if canonical:
+            # Record the alias so lookups by this path resolve to the canonical job's artifacts
+            task = Task(audio_path=audio_path, image_path=image_path, status="duplicate",
+                        content_hash=fingerprint, full_hash=own_hash, canonical_id=canonical.id, **metadata)
+            session.add(task)
+            session.commit()
+            task_id = canonical.id
+            logger.info(f"Duplicate audio: {audio_path} shares Task {task_id} (alias ID {task.id})")
+            self._retry_failed(session, canonical)
+            session.close()
+            return task_id
+
+        # Create new task if not found
+        task = Task(audio_path=audio_path, image_path=image_path, status="pending",
+                    content_hash=fingerprint, full_hash=own_hash, **metadata)
+        session.add(task)
+        session.commit()
+        task_id = task.id
+        session.close()
+        logger.info(f"New task added: ID {task_id}")
+        return task_id
+
+    def find_output(self, audio_path: str) -> Optional[str]:
+        """Returns the completed video for audio_path, following duplicates to their canonical task."""
+        session = self.Session()
+        task = session.query(Task).filter_by(audio_path=audio_path).order_by(Task.updated_at.desc()).first()
+        if task and task.canonical_id:
+            task = session.get(Task, task.canonical_id)
+        output_path = task.output_path if task and task.status in ("completed", "uploaded") else None
+        session.close()
+        if output_path:
+            # Reused (duplicate audio, re-run, upload): keep it off the front of the eviction order
+            artifact_store.touch(output_path)
+        return output_path
+
+    def get_task(self, audio_path: str) -> Optional[Task]:
+        session = self.Session()
+        task = session.query(Task).filter_by(audio_path=audio_path).order_by(Task.updated_at.desc()).first()
+        session.expunge_all()
+        session.close()
+        return task
+
+    def get_canonical_task(self, audio_path: str) -> Optional[Task]:
+        """The task that owns audio_path's video and upload: itself, or the canonical task of a duplicate."""
+        session = self.Session()
+        task = session.query(Task).filter_by(audio_path=audio_path).order_by(Task.updated_at.desc()).first()
+        if task and task.canonical_id:
+            task = session.get(Task, task.canonical_id)
+        session.expunge_all()
+        session.close()
+        return task
+
+    def get_task_by_id(self, task_id: int) -> Optional[Task]:
+        session = self.Session()
+        task = session.get(Task, task_id)
+        session.expunge_all()
+        session.close()
+        return task
+
+    # --- Upload ledger ---
+
+    def get_upload_state(self, task_id: int) -> Dict[str, Any]:
+        session = self.Session()
+        task = session.get(Task, task_id)
+        state = json.loads(task.upload_state) if task and task.upload_state else {}
+        session.close()
+        return state
+
+    def set_upload_state(self, task_id: int, state: Optional[Dict[str, Any]]):
+        session = self.Session()
+        task = session.get(Task, task_id)
+        if task:
+            task.upload_state = json.dumps(state) if state else None
+            session.commit()
+        session.close()
+
+    def mark_uploaded(self, task_id: int, remote_id: str):
+        session = self.Session()
+        task = session.get(Task, task_id)
+        if task:
+            task.status = "uploaded"
+            task.remote_id = remote_id
+            task.upload_state = None
+            task.uploaded_at = datetime.datetime.utcnow()
+            session.commit()
+            logger.info(f"Task {task_id} uploaded as {remote_id}")
+        session.close()
+
+    def record_stage_metrics(self, task_id: int, stage: str, metrics: Dict[str, Any]):
+        session = self.Session()
+        task = session.get(Task, task_id)
+        if task:
+            all_metrics = json.loads(task.stage_metrics) if task.stage_metrics else {}
+            all_metrics[stage] = metrics
+            task.stage_metrics = json.dumps(all_metrics)
+            session.commit()
+        session.close()
+
+    def shares_output(self, audio_path: str) -> bool:
+        """True if audio_path's video is shared with duplicate copies of the same audio."""
+        session = self.Session()
+        task = session.query(Task).filter_by(audio_path=audio_path).first()
+        shared = False
+        if task:
+            canonical_id = task.canonical_id or task.id
+            shared = session.query(Task).filter(
+                (Task.canonical_id == canonical_id) | (Task.id == canonical_id)
+            ).count() > 1
+        session.close()
+        return shared
+
+    def update_status(self, task_id: int, status: str, output_path: str = None, error_msg: str = None):
+        session = self.Session()
+        task = session.get(Task, task_id)
+        if task:
+            task.status = status
+            if output_path:
+                task.output_path = output_path
+            if error_msg:
+                task.error_msg = error_msg
+            session.commit()
+            logger.info(f"Task {task_id} updated to {status}")
+        session.close()
+
+    def get_pending_tasks(self) -> List[Task]:
+        session = self.Session()
+        tasks = session.query(Task).filter_by(status="pending").all()
+        session.expunge_all()
+        session.close()
+        return tasks
+
+    def artifact_refs(self) -> Dict[str, int]:
+        """Output path -> number of tasks that still need it (not yet uploaded)."""
+        session = self.Session()
+        rows = session.query(Task.output_path, func.count(Task.id)).filter(
+            Task.output_path.isnot(None),
+            Task.status.in_(("pending", "processing", "completed")),
+        ).group_by(Task.output_path).all()
+        session.close()
+        return {path: count for path, count in rows}
+
+    # --- Worker leases (coordinator.py) ---
+
+    def requeue_expired(self, now: datetime.datetime = None) -> int:
+        """Puts tasks whose worker stopped heartbeating back to pending; returns how many."""
+        now = now or datetime.datetime.utcnow()
+        session = self.Session()
+        expired = session.query(Task).filter(
+            Task.status == "processing",
+            Task.lease_expires_at.isnot(None),
+            Task.lease_expires_at < now,
+        ).all()
+        for task in expired:
+            logger.warning(f"Task {task.id} lease held by {task.worker_id} expired; re-queued")
+            task.status = "pending"
+            task.worker_id = None
+            task.lease_expires_at = None
+        session.commit()
+        session.close()
+        return len(expired)
+
+    def claim_task(self, worker_id: str, lease_seconds: float, policy: str = "lpt") -> Optional[Task]:
+        """Leases the next pending task to worker_id, or returns None if there is none.
+
+        The pending -> processing transition is a conditional UPDATE, so two
+        workers racing for the same task cannot both win it.
+        """
+        self.requeue_expired()
+        session = self.Session()
+        try:
+            pending = session.query(Task).filter_by(status="pending").all()
+            for candidate in scheduler.order_tasks(pending, policy):
+                expires = datetime.datetime.utcnow() + datetime.timedelta(seconds=lease_seconds)
+                won = session.query(Task).filter_by(id=candidate.id, status="pending").update(
+                    {"status": "processing", "worker_id": worker_id, "lease_expires_at": expires,
+                     "attempts": (candidate.attempts or 0) + 1},
+                    synchronize_session=False)
+                session.commit()
+                if won:
+                    task = session.get(Task, candidate.id)
+                    session.refresh(task)
+                    session.expunge(task)
+                    logger.info(f"Task {task.id} leased to {worker_id} until {expires:%H:%M:%S}")
+                    return task
+            return None
+        finally:
+            session.close()
+
+    def heartbeat(self, task_id: int, worker_id: str, lease_seconds: float) -> bool:
+        """Extends worker_id's lease; False if the task is no longer leased to it."""
+        session = self.Session()
+        expires = datetime.datetime.utcnow() + datetime.timedelta(seconds=lease_seconds)
+        renewed = session.query(Task).filter_by(id=task_id, status="processing", worker_id=worker_id).update(
+            {"lease_expires_at": expires}, synchronize_session=False)
+        session.commit()
+        session.close()
+        return bool(renewed)
+
+    def holds_lease(self, task_id: int, worker_id: str) -> bool:
+        session = self.Session()
+        held = session.query(Task).filter_by(id=task_id, status="processing", worker_id=worker_id).count() > 0
+        session.close()
+        return held
+
+    def finish_task(self, task_id: int, worker_id: str, status: str,
+                    output_path: str = None, error_msg: str = None) -> bool:
+        """Completes (or fails) a leased task; False if worker_id lost the lease meanwhile."""
+        session = self.Session()
+        values = {"status": status, "lease_expires_at": None}
+        if output_path:
+            values["output_path"] = output_path
+        if error_msg:
+            values["error_msg"] = error_msg
+        done = session.query(Task).filter_by(id=task_id, status="processing", worker_id=worker_id).update(
+            values, synchronize_session=False)
+        session.commit()
+        session.close()
+        if done:
+            logger.info(f"Task {task_id} updated to {status} by {worker_id}")
+        return bool(done)
+
+    def status_counts(self) -> Dict[str, int]:
+        session = self.Session()
+        counts = dict(session.query(Task.status, func.count(Task.id)).group_by(Task.status).all())
+        session.close()
+        return counts
@@ -1,8 +1,13 @@
 import os
+import re
 import json
 import subprocess
 import datetime
-from typing import List, Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import List, Dict, Any, Optional
 import logging
 
 # Fix for OMP: Error #15: Initializing libomp.dylib, but found libomp.dylib already initialized.
@@ -12,108 +17,159 @@ os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 if "/opt/anaconda3/bin" not in os.environ["PATH"]:
     os.environ["PATH"] = "/opt/anaconda3/bin:" + os.environ["PATH"]
 
-from sqlalchemy import create_engine, Column, Integer, String, Enum, DateTime, Text
-from sqlalchemy.orm import declarative_base, sessionmaker
-from faster_whisper import WhisperModel
-from tqdm import tqdm
+import artifact_store
+import autotune
+import cascade
+import metrics
+import pcm_cache
+import resources
+import scheduler
+import tracing
+# The job database lives in job_store; re-exported here for existing imports
+from job_store import DB_PATH, Base, JobManager, Task  # noqa: F401
 
 # --- Configuration & Logging ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-DB_PATH = "karaoke_tasks.db"
 OUTPUT_DIR = "output"
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# --- Database Model ---
-Base = declarative_base()
-
-class Task(Base):
-    __tablename__ = 'tasks'
-    
-    id = Column(Integer, primary_key=True)
-    audio_path = Column(String, nullable=False)
-    image_path = Column(String, nullable=False)
-    output_path = Column(String, nullable=True)
-    status = Column(String, default="pending") 
-    error_msg = Column(Text, nullable=True)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
 # --- Components ---
 
-class JobManager:
-    def __init__(self, db_url=f"sqlite:///{DB_PATH}"):
-        self.engine = create_engine(db_url)
-        Base.metadata.create_all(self.engine)
-        self.Session = sessionmaker(bind=self.engine)
-
-    def add_task(self, audio_path: str, image_path: str) -> int:
-        session = self.Session()
-        # Check if task already exists for this audio file
-        existing_task = session.query(Task).filter_by(audio_path=audio_path).first()
-        
-        if existing_task:
-            task_id = existing_task.id
-            if existing_task.status == "completed":
-                logger.info(f"Task {task_id} already completed for: {audio_path}")
-            elif existing_task.status in ["processing", "failed"]:
-                # Recover from crash or retry failed task
-                old_status = existing_task.status
-                existing_task.status = "pending"
-                session.commit()
-                logger.info(f"Task {task_id} reset from '{old_status}' -> 'pending'")
-            else:
-                logger.info(f"Task {task_id} exists with status: {existing_task.status}")
-            session.close()
-            return task_id
-
-        # Create new task if not found
-        task = Task(audio_path=audio_path, image_path=image_path, status="pending")
-        session.add(task)
-        session.commit()
-        task_id = task.id
-        session.close()
-        logger.info(f"New task added: ID {task_id}")
-        return task_id
-
-    def update_status(self, task_id: int, status: str, output_path: str = None, error_msg: str = None):
-        session = self.Session()
-        task = session.get(Task, task_id)
-        if task:
-            task.status = status
-            if output_path:
-                task.output_path = output_path
-            if error_msg:
-                task.error_msg = error_msg
-            session.commit()
-            logger.info(f"Task {task_id} updated to {status}")
-        session.close()
-
-    def get_pending_tasks(self) -> List[Task]:
-        session = self.Session()
-        tasks = session.query(Task).filter_by(status="pending").all()
-        session.expunge_all()
-        session.close()
-        return tasks
-
 class Transcriber:
-    def __init__(self, model_size="base"):
-        logger.info(f"Loading Faster Whisper model: {model_size}...")
+    def __init__(self, model_size="base", profile: Optional[Dict[str, Any]] = None,
+                 overrides: Optional[Dict[str, Any]] = None, defaults: Optional[Dict[str, Any]] = None):
+        # Imported here: faster_whisper pulls in ctranslate2 and takes seconds to load
+        from faster_whisper import WhisperModel
+
+        # Host profile written by autotune.py for this many concurrent jobs; without one, fall back to
+        # defaults (e.g. the resource manager's even thread split) and then CPU + Int8.
+        # overrides win over the profile.
+        num_workers = (overrides or {}).get("num_workers", 1)
+        self.profile = autotune.load_profile(model_size, num_workers) if profile is None else profile
+        model_kwargs = {"compute_type": "int8"}
+        model_kwargs.update({k: v for k, v in {**(defaults or {}), **self.profile, **(overrides or {})}.items()
+                             if k in ("compute_type", "cpu_threads", "num_workers")})
+        self.model_size = model_size
+        self.compute_type = model_kwargs["compute_type"]
+        # ctranslate2 runs 4 threads per call unless told otherwise
+        self.cpu_threads = model_kwargs.get("cpu_threads") or 4
+        self.decode_kwargs = {"beam_size": self.profile["beam_size"]} if "beam_size" in self.profile else {}
+
+        logger.info(f"Loading Faster Whisper model: {model_size} ({', '.join(f'{k}={v}' for k, v in model_kwargs.items())}"
+                    f"{', tuned profile' if self.profile else ''})...")
         # Use CPU + Int8 for compatibility on generic Mac hardware without specific setup
-        self.model = WhisperModel(model_size, device="cpu", compute_type="int8")
+        with tracing.span("whisper.load_model", model=model_size, **model_kwargs):
+            self.model = WhisperModel(model_size, device="cpu", **model_kwargs)
 
-    def transcribe(self, audio_path: str) -> List[Any]:
+    def run(self, audio, **kwargs):
+        """model.transcribe() with word timestamps and the host profile's decoding options.
+
+        audio is a path, or 16 kHz mono float32 samples (see pcm_cache.py).
+        """
+        return self.model.transcribe(audio, word_timestamps=True, **{**self.decode_kwargs, **kwargs})
+
+    def transcribe(self, audio_path: str, audio=None) -> List[Any]:
+        """audio: the file already decoded by pcm_cache; otherwise faster-whisper decodes audio_path."""
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
         
         logger.info(f"Transcribing {audio_path}...")
-        segments, info = self.model.transcribe(audio_path, word_timestamps=True)
+        # transcribe() decodes the audio, extracts features and detects the language up front;
+        # the segments themselves are decoded lazily while the generator is consumed
+        with tracing.span("whisper.prepare", model=self.model_size):
+            segments, info = self.run(audio_path if audio is None else audio)
         # Convert generator to list
-        segment_list = list(segments)
+        with tracing.span("whisper.decode", model=self.model_size) as span_args:
+            segment_list = list(segments)
+            span_args["segments"] = len(segment_list)
         logger.info(f"Transcription complete. Detected language: {info.language}")
         return segment_list
 
+class CascadeTranscriber:
+    """Transcribes with a fast model, then re-transcribes only its low-confidence stretches with a larger one.
+
+    Segments whose avg_logprob or no_speech_prob cross the thresholds are
+    re-decoded by `accurate_model` through faster_whisper's clip_timestamps
+    (padded by `padding` seconds for context) and spliced back word by word,
+    so most of the audio costs fast-model time. The larger model is only
+    loaded once some episode needs it.
+    """
+
+    def __init__(self, fast_model="base", accurate_model="medium",
+                 logprob_threshold=cascade.LOGPROB_THRESHOLD, no_speech_threshold=cascade.NO_SPEECH_THRESHOLD,
+                 padding=1.0, overrides: Optional[Dict[str, Any]] = None,
+                 defaults: Optional[Dict[str, Any]] = None):
+        self.fast = Transcriber(model_size=fast_model, overrides=overrides, defaults=defaults)
+        self.model_size = fast_model
+        self.compute_type = self.fast.compute_type
+        self.cpu_threads = self.fast.cpu_threads
+        self.accurate_model = accurate_model
+        self.logprob_threshold = logprob_threshold
+        self.no_speech_threshold = no_speech_threshold
+        self.padding = padding
+        self._overrides = overrides
+        self._defaults = defaults
+        self._accurate = None
+        self._lock = threading.Lock()
+        # Per thread, so concurrent workers each read the stats of their own episode
+        self._local = threading.local()
+
+    @property
+    def last_stats(self) -> Dict[str, Any]:
+        return getattr(self._local, "stats", {})
+
+    @last_stats.setter
+    def last_stats(self, stats: Dict[str, Any]):
+        self._local.stats = stats
+
+    @property
+    def accurate(self) -> Transcriber:
+        with self._lock:
+            if self._accurate is None:
+                self._accurate = Transcriber(model_size=self.accurate_model, overrides=self._overrides,
+                                             defaults=self._defaults)
+        return self._accurate
+
+    def transcribe(self, audio_path: str, audio=None) -> List[Any]:
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+
+        # Both passes read the same samples; with a decoded array neither decodes the file
+        source = audio_path if audio is None else audio
+        logger.info(f"Transcribing {audio_path} (cascade pass 1)...")
+        with tracing.span("whisper.prepare", model=self.fast.model_size):
+            segments, info = self.fast.run(source)
+        with tracing.span("whisper.decode", model=self.fast.model_size):
+            segments = list(segments)
+
+        flagged = cascade.flag_segments(segments, self.logprob_threshold, self.no_speech_threshold)
+        ranges = cascade.pad_ranges(cascade.merge_ranges(flagged), self.padding, info.duration)
+        retranscribed = sum(end - start for start, end in ranges)
+        self.last_stats = {
+            "segments": len(segments),
+            "flagged_segments": len(flagged),
+            "retranscribed_seconds": round(retranscribed, 2),
+            "retranscribed_fraction": round(retranscribed / info.duration, 4) if info.duration else 0.0,
+            "accurate_model": self.accurate_model,
+        }
+        if not ranges:
+            logger.info(f"Transcription complete. Detected language: {info.language}; no segments below threshold.")
+            return segments
+
+        logger.info(f"{len(flagged)}/{len(segments)} segment(s) below threshold; re-transcribing "
+                    f"{retranscribed:.1f}s ({100 * self.last_stats['retranscribed_fraction']:.1f}%) "
+                    f"with '{self.accurate_model}'...")
+        accurate = self.accurate
+        with tracing.span("cascade.retranscribe", model=self.accurate_model, seconds=round(retranscribed, 2)):
+            replacement, _ = accurate.run(
+                source, language=info.language, clip_timestamps=cascade.clip_timestamps(ranges),
+            )
+            replacement = list(replacement)
+        merged = cascade.splice(segments, flagged, replacement)
+        logger.info(f"Transcription complete. Detected language: {info.language}")
+        return merged
+
 class SubtitleGenerator:
     @staticmethod
     def format_time_ass(seconds: float) -> str:
@@ -124,6 +180,7 @@ class SubtitleGenerator:
         cs = int((seconds * 100) % 100)
         return f"{h}:{m:02}:{s:02}.{cs:02}"
 
+    @tracing.traced("ass.write")
     def generate_ass(self, segments: List[Any], output_path: str):
         logger.info(f"Generating ASS subtitles to {output_path}...")
         
@@ -182,87 +239,290 @@ Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(header + "\n".join(events))
 
+# Render profiles: "default" keeps x264's defaults; "upload" targets a per-minute byte budget.
+# A still background only changes when the karaoke highlight moves, so a low frame rate,
+# long GOP and capped bitrate cost nothing visible while shrinking what bili_upload sends.
+RENDER_PROFILES = {
+    "default": {"fps": None, "crf": None, "audio_bitrate": "192k", "bytes_per_minute": None},
+    "upload": {"fps": 15, "crf": 28, "audio_bitrate": "128k", "bytes_per_minute": 4 * 1024 * 1024},
+}
+
+# Same sizing in FFmpeg, for backgrounds that could not be pre-sized (see generate_images.normalize_background)
+CANVAS_FILTERS = {
+    "fit": "scale=1920:1080:force_original_aspect_ratio=decrease,pad=1920:1080:(ow-iw)/2:(oh-ih)/2,setsar=1",
+    "fill": "scale=1920:1080:force_original_aspect_ratio=increase,crop=1920:1080,setsar=1",
+}
+
 class VideoRenderer:
-    def render(self, audio_path: str, image_path: str, ass_path: str, output_video: str):
-        logger.info(f"Rendering video to {output_video}...")
+    def __init__(self, profile: str = "default", bytes_per_minute: Optional[int] = None, canvas: str = "fit"):
+        if profile not in RENDER_PROFILES:
+            raise ValueError(f"Unknown render profile '{profile}' (choose from {', '.join(RENDER_PROFILES)})")
+        if canvas not in CANVAS_FILTERS:
+            raise ValueError(f"Unknown canvas mode '{canvas}' (choose from {', '.join(CANVAS_FILTERS)})")
+        self.profile = profile
+        self.canvas = canvas
+        self.settings = dict(RENDER_PROFILES[profile])
+        if bytes_per_minute:
+            self.settings["bytes_per_minute"] = bytes_per_minute
+
+    def estimated_bytes(self, duration: Optional[float]) -> int:
+        """Expected output size, when the profile caps the bitrate (0 if unknown)."""
+        budget = self.settings["bytes_per_minute"]
+        return int(budget * duration / 60) if budget and duration else 0
+
+    def video_bitrate_kbps(self) -> Optional[int]:
+        """Video bitrate cap that keeps video + audio within the per-minute byte budget."""
+        budget = self.settings["bytes_per_minute"]
+        if not budget:
+            return None
+        audio_kbps = int(self.settings["audio_bitrate"].rstrip("k"))
+        return max(200, int(budget * 8 / 60 / 1000) - audio_kbps)
+
+    def background(self, image_path: str):
+        """(image, extra filters): the background pre-sized to 1920x1080, else FFmpeg filters that size it."""
+        try:
+            # Imported here: Pillow is only needed once something renders
+            from generate_images import normalize_background
+            return normalize_background(image_path, mode=self.canvas), ""
+        except (ImportError, OSError) as e:
+            logger.warning(f"Could not pre-size background {image_path} ({e}); scaling it in FFmpeg")
+            return image_path, CANVAS_FILTERS[self.canvas] + ","
+
+    def can_copy_audio(self, codec: Optional[str], bitrate: Optional[int]) -> bool:
+        """AAC sources go into the MP4 as is (no decode/re-encode) when they fit the profile's audio bitrate.
+
+        Applies to every profile, so no output carries more audio than its profile would encode.
+        """
+        if codec != "aac":
+            return False
+        return bool(bitrate) and bitrate <= int(self.settings["audio_bitrate"].rstrip("k")) * 1000
+
+    def encode_args(self, copy_audio: bool = False) -> List[str]:
+        settings = self.settings
+        args = ["-c:v", "libx264", "-tune", "stillimage"]
+        if settings["fps"]:
+            fps = settings["fps"]
+            # One keyframe every 10 s; a still image needs few I-frames
+            args += ["-r", str(fps), "-g", str(fps * 10), "-keyint_min", str(fps)]
+        if settings["crf"] is not None:
+            args += ["-crf", str(settings["crf"])]
+        max_kbps = self.video_bitrate_kbps()
+        if max_kbps:
+            args += ["-maxrate", f"{max_kbps}k", "-bufsize", f"{max_kbps * 2}k"]
+        if copy_audio:
+            args += ["-c:a", "copy"]
+        else:
+            args += ["-c:a", "aac", "-b:a", settings["audio_bitrate"]]
+        args += ["-pix_fmt", "yuv420p"]
+        if self.profile != "default":
+            # Moov atom up front: the upload can be probed/streamed before it finishes
+            args += ["-movflags", "+faststart"]
+        return args
+
+    def render(self, audio_path: str, image_path: str, ass_path: str, output_video: str,
+               threads: Optional[int] = None, audio_codec: Optional[str] = None,
+               audio_bitrate: Optional[int] = None):
+        # audio_codec / audio_bitrate: the source's, as probed by the scanner
+        copy_audio = self.can_copy_audio(audio_codec, audio_bitrate)
+        logger.info(f"Rendering video to {output_video} (profile: {self.profile}"
+                    f"{f', {threads} threads' if threads else ''}{', audio copied' if copy_audio else ''})...")
         
-        if os.path.exists(output_video):
-            os.remove(output_video)
-
         # Basic escaping for single quotes in path
         safe_ass_path = ass_path.replace("'", "'\\''")
+        # A still as large as the source artwork would be encoded at that size; render at the canvas instead
+        background, canvas_filters = self.background(image_path)
 
         cmd = [
             "ffmpeg",
             "-y", 
             "-loop", "1",
-            "-i", image_path,
+            "-i", background,
             "-i", audio_path,
-            "-vf", f"subtitles='{safe_ass_path}'",
-            "-c:v", "libx264",
-            "-tune", "stillimage",
-            "-c:a", "aac",
-            "-b:a", "192k",
-            "-pix_fmt", "yuv420p",
+            "-vf", f"{canvas_filters}subtitles='{safe_ass_path}'",
+            *self.encode_args(copy_audio=copy_audio),
+            *(["-threads", str(threads)] if threads else []),
             "-shortest",
-            output_video
         ]
         
         try:
-            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            # Rendered to a temp name; output_video only appears once the encode finished
+            with artifact_store.atomic_path(output_video) as tmp_video, \
+                    tracing.span("ffmpeg.render", profile=self.profile, threads=threads, copy_audio=copy_audio):
+                subprocess.run(cmd + [tmp_video], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         except subprocess.CalledProcessError as e:
             logger.error(f"FFmpeg failed: {e.stderr.decode()}")
             raise RuntimeError(f"FFmpeg rendering failed")
 
+def measure_quality(reference_video: str, candidate_video: str) -> Dict[str, Optional[float]]:
+    """Compares two renders of the same episode with FFmpeg's SSIM and PSNR filters.
+
+    Frames are paired by timestamp, so renders at different frame rates compare fine.
+    """
+    lavfi = "[0:v]split[c1][c2];[1:v]split[r1][r2];[c1][r1]ssim;[c2][r2]psnr"
+    cmd = ["ffmpeg", "-i", candidate_video, "-i", reference_video, "-lavfi", lavfi, "-f", "null", "-"]
+    result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    log = result.stderr.decode(errors="replace")
+
+    ssim = re.findall(r"SSIM .*?All:([\d.]+)", log)
+    psnr = re.findall(r"PSNR .*?average:([\d.]+|inf)", log)
+    return {
+        "ssim": float(ssim[-1]) if ssim else None,
+        "psnr": float(psnr[-1]) if psnr else None,
+    }
+
 # --- Workflow Orchestrator ---
 
 class KaraokeGenerator:
-    def __init__(self):
-        self.job_manager = JobManager()
-        self.transcriber = Transcriber(model_size="base")
+    def __init__(self, render_profile: str = "default", model_size: str = "base",
+                 cascade_model: Optional[str] = None, workers: int = 1,
+                 resource_manager: Optional[resources.ResourceManager] = None,
+                 transcriber=None, job_manager: Optional[JobManager] = None,
+                 artifacts: Optional[artifact_store.ArtifactStore] = None,
+                 pcm: Optional[pcm_cache.PCMCache] = None, canvas: str = "fit"):
+        # transcriber: anything with transcribe(audio_path, audio=None) -> segments and a cpu_threads
+        # attribute replaces the Whisper models (e.g. the benchmarks' FakeTranscriber)
+        self.job_manager = job_manager or JobManager()
+        self.workers = max(1, workers)
+        self.resources = resource_manager
+        overrides = defaults = None
+        if self.workers > 1:
+            self.resources = self.resources or resources.ResourceManager()
+            # One shared model serving `workers` concurrent transcriptions. A profile tuned for this
+            # worker count sets the threads; otherwise the cores are split evenly between them
+            overrides = {"num_workers": self.workers}
+            defaults = {"cpu_threads": max(1, self.resources.cpus // self.workers)}
+        if transcriber is not None:
+            self.transcriber = transcriber
+        elif cascade_model:
+            # model_size transcribes everything; cascade_model only the low-confidence parts
+            self.transcriber = CascadeTranscriber(fast_model=model_size, accurate_model=cascade_model,
+                                                  overrides=overrides, defaults=defaults)
+        else:
+            self.transcriber = Transcriber(model_size=model_size, overrides=overrides, defaults=defaults)
+        if self.resources and transcriber is None:
+            # Loaded models stay resident for the whole run
+            self.resources.reserve(resources.model_memory_mb(model_size, self.transcriber.compute_type))
+            if cascade_model:
+                self.resources.reserve(resources.model_memory_mb(cascade_model, self.transcriber.compute_type))
         self.subtitle_gen = SubtitleGenerator()
-        self.renderer = VideoRenderer()
-
-    def add_task(self, audio_path: str, image_path: str):
-        return self.job_manager.add_task(audio_path, image_path)
-
-    def process_pending_tasks(self):
+        self.renderer = VideoRenderer(profile=render_profile, canvas=canvas)
+        # Budget from STREAMFLUENT_ARTIFACT_BUDGET_GB unless a store is passed in
+        self.artifacts = artifacts or artifact_store.ArtifactStore(OUTPUT_DIR, job_manager=self.job_manager)
+        # Whisper gets each episode decoded once to shared 16 kHz PCM; injected transcribers only if asked
+        self.pcm = pcm or (pcm_cache.PCMCache() if transcriber is None else None)
+        if self.pcm is not None:
+            self.pcm.sweep()
+        swept = self.artifacts.sweep_temporaries()
+        if swept:
+            logger.info(f"Removed {swept} unfinished file(s) left in {self.artifacts.root} by an earlier run")
+
+    def add_task(self, audio_path: str, image_path: str, **metadata):
+        return self.job_manager.add_task(audio_path, image_path, **metadata)
+
+    def process_pending_tasks(self, policy: str = "lpt"):
         tasks = self.job_manager.get_pending_tasks()
         if not tasks:
             logger.info("No pending tasks.")
             return
 
-        for task in tasks:
-            logger.info(f"Processing Task {task.id}...")
-            self.job_manager.update_status(task.id, "processing")
-            
-            try:
-                # 1. Transcribe
-                transcript_segments = self.transcriber.transcribe(task.audio_path)
-                
-                # Save plain text
-                base_name = os.path.splitext(os.path.basename(task.audio_path))[0]
-                timestamp = int(datetime.datetime.now().timestamp())
-                txt_path = os.path.join(OUTPUT_DIR, f"{base_name}_{timestamp}.txt")
-                ass_path = os.path.join(OUTPUT_DIR, f"{base_name}_{timestamp}.ass")
-                vid_path = os.path.join(OUTPUT_DIR, f"{base_name}_{timestamp}.mp4")
-
-                full_text = "".join([s.text for s in transcript_segments])
-                with open(txt_path, "w", encoding="utf-8") as f:
-                    f.write(full_text)
-                
-                # 2. Generate ASS
-                self.subtitle_gen.generate_ass(transcript_segments, ass_path)
-                
-                # 3. Render Video
-                self.renderer.render(task.audio_path, task.image_path, ass_path, vid_path)
-                
-                self.job_manager.update_status(task.id, "completed", output_path=vid_path)
-                logger.info(f"Task {task.id} completed successfully. Output: {vid_path}")
-
-            except Exception as e:
-                logger.exception(f"Task {task.id} failed.")
-                self.job_manager.update_status(task.id, "failed", error_msg=str(e))
+        tasks = scheduler.order_tasks(tasks, policy)
+        eta = scheduler.predict_makespan(tasks, workers=self.workers)
+        logger.info(f"{len(tasks)} pending task(s), order '{policy}', {self.workers} worker(s). "
+                    f"Predicted completion: {scheduler.format_eta(eta)}")
+
+        if self.workers == 1:
+            for task in tasks:
+                self.process_task(task)
+            return
+
+        # Workers pick tasks up in policy order; the resource manager holds back any that do not fit
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(self.process_task, tasks))
+        logger.info(f"Resource usage: {self.resources.snapshot()}")
+
+    def _decoded(self, audio_path: str):
+        if self.pcm is None:
+            return nullcontext(None)
+        return self.pcm.open(audio_path)
+
+    @contextmanager
+    def _admit(self, cost: resources.Cost):
+        if self.resources is None:
+            yield resources.Grant(threads=None, memory_mb=cost.memory_mb)
+            return
+        with self.resources.admit(cost) as grant:
+            yield grant
+
+    def run_stages(self, audio_path: str, image_path: str, duration: Optional[float] = None,
+                   output_dir: str = OUTPUT_DIR, codec: Optional[str] = None,
+                   bitrate: Optional[int] = None) -> Dict[str, Any]:
+        """Transcribe, ASS and render for one episode, without touching the job database.
+
+        duration, codec and bitrate are the scanner's probe results, if any.
+        Returns the paths written ("text", "ass", "video") and, under "metrics",
+        the cascade stats if a cascade transcriber is in use.
+        """
+        # 1. Transcribe, from audio decoded once for every pass and released with the stage
+        with self._decoded(audio_path) as pcm:
+            if duration is None and pcm is not None:
+                duration = len(pcm) / pcm_cache.SAMPLE_RATE
+            with self._admit(resources.transcribe_cost(duration, self.transcriber.cpu_threads)):
+                started = time.perf_counter()
+                with metrics.track("transcribe"):
+                    transcript_segments = self.transcriber.transcribe(audio_path, audio=pcm)
+                metrics.observe_transcription(time.perf_counter() - started, duration)
+        cascade_stats = getattr(self.transcriber, "last_stats", None)
+
+        # Save plain text
+        base_name = os.path.splitext(os.path.basename(audio_path))[0]
+        timestamp = int(datetime.datetime.now().timestamp())
+        os.makedirs(output_dir, exist_ok=True)
+        txt_path = os.path.join(output_dir, f"{base_name}_{timestamp}.txt")
+        ass_path = os.path.join(output_dir, f"{base_name}_{timestamp}.ass")
+        vid_path = os.path.join(output_dir, f"{base_name}_{timestamp}.mp4")
+
+        # The task row only points at these once it completes; hold them until then
+        with self.artifacts.hold(vid_path):
+            full_text = "".join([s.text for s in transcript_segments])
+            artifact_store.write_text(txt_path, full_text)
+
+            # 2. Generate ASS
+            with metrics.track("subtitles"), artifact_store.atomic_path(ass_path) as tmp_ass:
+                self.subtitle_gen.generate_ass(transcript_segments, tmp_ass)
+
+            # 3. Render Video
+            self.artifacts.collect(incoming_bytes=self.renderer.estimated_bytes(duration))
+            with self._admit(resources.render_cost()) as grant:
+                started = time.perf_counter()
+                with metrics.track("render"):
+                    self.renderer.render(audio_path, image_path, ass_path, vid_path, threads=grant.threads,
+                                         audio_codec=codec, audio_bitrate=bitrate)
+                metrics.observe_encode(time.perf_counter() - started, duration)
+
+        stage_metrics = {"transcribe": cascade_stats} if cascade_stats else {}
+        return {"text": txt_path, "ass": ass_path, "video": vid_path, "metrics": stage_metrics}
+
+    def process_task(self, task: Task) -> Optional[str]:
+        """Transcribes and renders one task; returns the video path, or None if it failed."""
+        logger.info(f"Processing Task {task.id}...")
+        self.job_manager.update_status(task.id, "processing")
+
+        try:
+            with tracing.task(task.id), tracing.span("task", audio=os.path.basename(task.audio_path)):
+                outputs = self.run_stages(task.audio_path, task.image_path, task.duration,
+                                          codec=task.codec, bitrate=task.bitrate)
+            for stage, stage_metrics in outputs["metrics"].items():
+                self.job_manager.record_stage_metrics(task.id, stage, stage_metrics)
+
+            vid_path = outputs["video"]
+            self.job_manager.update_status(task.id, "completed", output_path=vid_path)
+            logger.info(f"Task {task.id} completed successfully. Output: {vid_path}")
+            return vid_path
+
+        except Exception as e:
+            logger.exception(f"Task {task.id} failed.")
+            self.job_manager.update_status(task.id, "failed", error_msg=str(e))
+            return None
 
 if __name__ == "__main__":
     import sys
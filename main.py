@@ -2,27 +2,40 @@
 StreamFluent — CrewAI pipeline entry point
 
 Pipeline:
-  1. Scanner Agent  — scans a podcast directory, generates missing images, writes tasks.json
+  1. Scanner Agent  — scans a podcast directory, generates missing images, writes tasks.jsonl
   2. Producer Agent — transcribes audio (Whisper), renders karaoke MP4 videos (FFmpeg)
   3. Publisher Agent — uploads completed videos to Bilibili
 
+With --direct the same three stages run as plain function calls (pipeline.py):
+no LLM round-trips, no network access before the upload stage, and the exit
+code reports the outcome (0 ok, 1 a stage failed, 2 some tasks failed).
+--stream runs them concurrently instead: each episode is rendered as soon as
+it is scanned and uploaded as soon as it is rendered.
+
 Usage:
   python main.py --dir ../PodCast
-  python main.py --dir ../PodCast --tasks tasks.json
+  python main.py --dir ../PodCast --tasks tasks.jsonl
   python main.py --dir ../PodCast --skip-upload
+  python main.py --dir ../PodCast --direct --report run.json
+  python main.py --dir ../PodCast --stream
 """
 
 import argparse
+import json
 import os
 import sys
 
-from crewai import Crew, Process
 
-from crew.agents import scanner_agent, producer_agent, publisher_agent
-from crew.tasks import scan_task, produce_task, publish_task
+def build_crew(skip_upload: bool = False):
+    # The CrewAI/LLM stack is only imported when agent mode is used
+    from crewai import Crew, Process
+
+    from crew.agents import build_agents
+    from crew.tasks import build_tasks
 
+    scanner_agent, producer_agent, publisher_agent = build_agents()
+    scan_task, produce_task, publish_task = build_tasks(scanner_agent, producer_agent, publisher_agent)
 
-def build_crew(skip_upload: bool = False) -> Crew:
     agents = [scanner_agent, producer_agent]
     tasks = [scan_task, produce_task]
 
@@ -38,6 +51,28 @@ def build_crew(skip_upload: bool = False) -> Crew:
     )
 
 
+def run_direct(podcast_dir: str, tasks_path: str, skip_upload: bool, report: str = None,
+               stream: bool = False) -> int:
+    import pipeline
+
+    run = pipeline.run_streaming if stream else pipeline.run_pipeline
+    results = run(podcast_dir, tasks_path, skip_upload=skip_upload)
+    code = pipeline.exit_code(results)
+
+    print("\n=== Pipeline Complete ===")
+    for r in results:
+        counts = ", ".join(f"{k}={v}" for k, v in r.counts.items())
+        print(f"  [{'ok' if r.ok else 'FAILED'}] {r.stage:<8} {r.seconds:8.1f}s  {counts}")
+        print(f"           {r.message}")
+    print(f"Exit code: {code}")
+
+    if report:
+        with open(report, "w", encoding="utf-8") as f:
+            json.dump({"exit_code": code, "stages": [r.to_dict() for r in results]}, f,
+                      indent=2, ensure_ascii=False)
+    return code
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="StreamFluent CrewAI Pipeline — scan → produce → publish"
@@ -49,27 +84,54 @@ def main():
     )
     parser.add_argument(
         "--tasks",
-        default="tasks.json",
-        help="Output path for the tasks JSON file (default: tasks.json)",
+        default="tasks.jsonl",
+        help="Output path for the task manifest (default: tasks.jsonl)",
     )
     parser.add_argument(
         "--skip-upload",
         action="store_true",
         help="Stop after video production; skip the Bilibili upload step",
     )
+    parser.add_argument(
+        "--direct",
+        action="store_true",
+        help="Run the stages as a plain pipeline without CrewAI agents (no LLM calls)",
+    )
+    parser.add_argument(
+        "--report",
+        help="With --direct or --stream, write the per-stage results to this JSON file",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Direct mode that moves each episode to the next stage as soon as it is ready",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="PATH",
+        help="Write a Chrome/Perfetto trace of every task and stage to this .json file or directory",
+    )
     args = parser.parse_args()
 
+    if args.trace:
+        import tracing
+        print(f"Tracing to {tracing.enable(args.trace)}")
+
     podcast_dir = os.path.abspath(args.dir)
     if not os.path.isdir(podcast_dir):
         print(f"Error: Directory not found: {podcast_dir}")
         sys.exit(1)
 
-    print(f"\n=== StreamFluent CrewAI Pipeline ===")
+    mode = "Streaming" if args.stream else "Direct" if args.direct else "CrewAI"
+    print(f"\n=== StreamFluent {mode} Pipeline ===")
     print(f"  Podcast dir : {podcast_dir}")
     print(f"  Tasks file  : {args.tasks}")
     print(f"  Upload step : {'disabled' if args.skip_upload else 'enabled'}")
     print("=====================================\n")
 
+    if args.direct or args.stream:
+        sys.exit(run_direct(podcast_dir, args.tasks, args.skip_upload, args.report, stream=args.stream))
+
     crew = build_crew(skip_upload=args.skip_upload)
     result = crew.kickoff(inputs={"podcast_dir": podcast_dir})
 
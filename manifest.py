@@ -0,0 +1,143 @@
+"""
+Task manifests: the task list passed from the scanner to the render and upload stages.
+
+Two formats are supported:
+  *.jsonl — one JSON record per line, written and read as a stream. The writer
+            finishes with an end marker so that a reader following a manifest
+            that is still being written knows when to stop; a writer that
+            fails part-way leaves an abort marker instead, and the reader raises.
+  *.json  — the original indented JSON array (read in full; kept for old files).
+"""
+
+import json
+import os
+import time
+
+END_MARKER = "_manifest_end"
+ABORT_MARKER = "_manifest_aborted"
+
+
+def is_jsonl(path):
+    return not str(path).lower().endswith(".json")
+
+
+def _drop_end_marker(path):
+    """Removes a finished manifest's trailing end marker, so records appended after it get read."""
+    try:
+        f = open(path, "r+b")
+    except FileNotFoundError:
+        return
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(0, size - 4096))
+        tail = f.read()
+        start = tail.rstrip(b"\n").rfind(b"\n") + 1
+        try:
+            record = json.loads(tail[start:])
+        except ValueError:
+            return
+        if isinstance(record, dict) and END_MARKER in record:
+            f.truncate(size - len(tail) + start)
+
+
+class ManifestWriter:
+    """Writes task records one at a time, flushing each so readers can start immediately."""
+
+    def __init__(self, path, append=False):
+        self.path = str(path)
+        self.count = 0
+        self.jsonl = is_jsonl(self.path)
+        if append and not self.jsonl:
+            raise ValueError(f"Cannot append to {self.path}: only JSONL manifests can be extended")
+        # An appending writer (e.g. watch mode) never ends the manifest, and reopens one a scan ended
+        self.append = append
+        if append:
+            _drop_end_marker(self.path)
+        self._f = open(self.path, "a" if self.append else "w", encoding="utf-8")
+        if not self.jsonl:
+            self._f.write("[\n")
+
+    def write(self, record):
+        if self.jsonl:
+            self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            prefix = ",\n" if self.count else ""
+            body = json.dumps(record, indent=4, ensure_ascii=False)
+            self._f.write(prefix + "\n".join("    " + line for line in body.splitlines()))
+        self._f.flush()
+        self.count += 1
+
+    def close(self, complete=True):
+        """complete=False (the scan failed): the manifest is not marked finished."""
+        if self._f.closed:
+            return
+        if self.jsonl:
+            if not self.append:
+                marker = END_MARKER if complete else ABORT_MARKER
+                self._f.write(json.dumps({marker: True, "count": self.count}) + "\n")
+        elif complete:
+            self._f.write("\n]\n")
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(complete=exc_type is None)
+
+
+def _iter_jsonl(f, follow, poll_interval):
+    buffer = ""
+    while True:
+        line = f.readline()
+        if not line:
+            if not follow:
+                return
+            time.sleep(poll_interval)
+            continue
+        buffer += line
+        if not buffer.endswith("\n"):
+            # Partially written record; wait for the rest of the line
+            if not follow:
+                return
+            continue
+        record_text, buffer = buffer.strip(), ""
+        if not record_text:
+            continue
+        record = json.loads(record_text)
+        if END_MARKER in record:
+            return
+        if ABORT_MARKER in record:
+            raise RuntimeError(f"Manifest writer failed after {record.get('count', '?')} record(s); it is incomplete")
+        yield record
+
+
+def iter_manifest(path, follow=False, poll_interval=0.5):
+    """Yields task records from a manifest.
+
+    With follow=True a JSONL manifest is tailed while it is being written
+    (waiting for the file to appear if needed) until the writer's end marker.
+    """
+    path = str(path)
+    if follow:
+        while not os.path.exists(path):
+            time.sleep(poll_interval)
+
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if first == "[":
+            # Legacy JSON array
+            f.seek(0)
+            yield from json.load(f)
+            return
+        f.seek(0)
+        yield from _iter_jsonl(f, follow, poll_interval)
+
+
+def default_manifest_path(preferred="tasks.jsonl"):
+    """Returns `preferred`, or the legacy tasks.json if only that exists."""
+    if not os.path.exists(preferred) and os.path.exists("tasks.json"):
+        return "tasks.json"
+    return preferred
@@ -0,0 +1,43 @@
+import json
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+
+def probe_audio(audio_path):
+    """Returns {"duration", "codec", "bitrate"} for an audio file using ffprobe.
+
+    Values are None when ffprobe is missing or the file cannot be read.
+    """
+    info = {"duration": None, "codec": None, "bitrate": None}
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "format=duration,bit_rate:stream=codec_name,bit_rate",
+        "-of", "json",
+        audio_path,
+    ]
+    try:
+        result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=60)
+        data = json.loads(result.stdout or b"{}")
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return info
+
+    fmt = data.get("format", {})
+    stream = (data.get("streams") or [{}])[0]
+    if fmt.get("duration"):
+        info["duration"] = float(fmt["duration"])
+    info["codec"] = stream.get("codec_name")
+    bitrate = stream.get("bit_rate") or fmt.get("bit_rate")
+    if bitrate:
+        info["bitrate"] = int(bitrate)
+    return info
+
+
+def probe_many(audio_paths, max_workers=8):
+    """Probes files in parallel (ffprobe is I/O and process bound). Returns {path: info}."""
+    audio_paths = list(audio_paths)
+    if not audio_paths or shutil.which("ffprobe") is None:
+        return {p: {"duration": None, "codec": None, "bitrate": None} for p in audio_paths}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return dict(zip(audio_paths, pool.map(probe_audio, audio_paths)))
@@ -0,0 +1,345 @@
+"""
+Process-local pipeline metrics in the Prometheus text format, plus a tiny
+HTTP server exposing them.
+
+  GET /metrics  Prometheus exposition (scrape it, graph it, alert on it)
+  GET /status   the same numbers as JSON for a quick look
+
+Stages report through track() (in-flight gauge, latency histogram, failure
+counter, last-progress timestamp) and the observe_* helpers; queue depth is
+read from the tasks table at scrape time and functools.lru_cache hit rates
+from the caches passed to register_cache(). Standard library only, so it
+can run inside any worker.
+
+Alert on stalls with e.g.
+  time() - streamfluent_last_progress_timestamp_seconds > 1800
+  and on(instance) sum by (instance) (streamfluent_stage_in_flight) > 0
+"""
+
+import bisect
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "streamfluent_"
+STAGE_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1200, 1800, 3600, math.inf)
+# Processing seconds per audio second; below 1 is faster than real time
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 1.5, 2, 4, math.inf)
+# Audio seconds encoded per wall-clock second (FFmpeg's "speed=")
+SPEED_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, math.inf)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in key)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(key, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = PREFIX + name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values: Dict[LabelKey, float] = {}
+
+    def samples(self) -> List[Tuple[str, LabelKey, float]]:
+        with self._lock:
+            return [(self.name, key, value) for key, value in sorted(self._values.items())]
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_labels(labels), 0.0)
+
+    def label_values(self, label: str) -> List[str]:
+        with self._lock:
+            keys = list(self._values) + list(getattr(self, "_series", {}))
+        return sorted({dict(key)[label] for key in keys if label in dict(key)})
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_labels(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float]):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets) if math.isinf(buckets[-1]) else tuple(buckets) + (math.inf,)
+        self._series: Dict[LabelKey, List[float]] = {}  # per-bucket counts, then sum, then count
+
+    def observe(self, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(_labels(labels))
+            return int(series[-1]) if series else 0
+
+    def mean(self, **labels) -> Optional[float]:
+        with self._lock:
+            series = self._series.get(_labels(labels))
+            return series[-2] / series[-1] if series and series[-1] else None
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0.0
+                for bound, n in zip(self.buckets, series):
+                    cumulative += n
+                    out.append((self.name + "_bucket", key + (("le", _format_value(bound)),), cumulative))
+                out.append((self.name + "_sum", key, series[-2]))
+                out.append((self.name + "_count", key, series[-1]))
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, LabelKey, float]]]] = []
+        self._lock = threading.Lock()
+
+    def add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable):
+        """collector() returns (name, kind, help, labels, value) rows computed at scrape time."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        seen = set()
+        for collector in list(self._collectors):
+            try:
+                rows = collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector {collector!r} failed: {e}")
+                continue
+            for name, kind, help_text, key, value in rows:
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f"# HELP {name} {help_text}")
+                    lines.append(f"# TYPE {name} {kind}")
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_IN_FLIGHT = REGISTRY.add(Gauge("stage_in_flight", "Stage executions currently running"))
+STAGE_SECONDS = REGISTRY.add(Histogram("stage_duration_seconds", "Wall-clock time per stage execution",
+                                       STAGE_BUCKETS))
+STAGE_FAILURES = REGISTRY.add(Counter("stage_failures_total", "Stage executions that raised"))
+LAST_PROGRESS = REGISTRY.add(Gauge("last_progress_timestamp_seconds",
+                                   "Unix time the last stage execution finished"))
+TRANSCRIBE_RTF = REGISTRY.add(Histogram("transcribe_rtf", "Transcription seconds per second of audio",
+                                        RTF_BUCKETS))
+ENCODE_SPEED = REGISTRY.add(Histogram("encode_speed", "FFmpeg audio seconds encoded per wall-clock second",
+                                      SPEED_BUCKETS))
+UPLOAD_BYTES = REGISTRY.add(Counter("upload_bytes_total", "Bytes sent to Bilibili"))
+UPLOAD_RATE = REGISTRY.add(Gauge("upload_bytes_per_second", "Average rate of the most recent upload"))
+
+_caches: Dict[str, Callable] = {}
+_queues: List = []
+
+
+@contextmanager
+def track(stage: str):
+    """Counts one execution of `stage`: in flight while inside, then timed and marked as progress."""
+    STAGE_IN_FLIGHT.inc(stage=stage)
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_FAILURES.inc(stage=stage)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage)
+        STAGE_IN_FLIGHT.dec(stage=stage)
+        LAST_PROGRESS.set(time.time())
+
+
+def observe_transcription(seconds: float, audio_seconds: Optional[float]):
+    if audio_seconds:
+        TRANSCRIBE_RTF.observe(seconds / audio_seconds)
+
+
+def observe_encode(seconds: float, audio_seconds: Optional[float]):
+    if audio_seconds and seconds > 0:
+        ENCODE_SPEED.observe(audio_seconds / seconds)
+
+
+def observe_upload(nbytes: float, bytes_per_s: float):
+    UPLOAD_BYTES.inc(nbytes)
+    UPLOAD_RATE.set(bytes_per_s)
+
+
+def register_cache(name: str, cached_function: Callable):
+    """Reports hits/misses of a functools.lru_cache-wrapped function under `name`."""
+    _caches[name] = cached_function
+
+
+def unregister_cache(name: str):
+    _caches.pop(name, None)
+
+
+def _cache_rows():
+    rows = []
+    for name, fn in sorted(_caches.items()):
+        info = fn.cache_info()
+        key = _labels({"cache": name})
+        total = info.hits + info.misses
+        rows += [
+            (PREFIX + "cache_hits_total", "counter", "Cache lookups answered from the cache", key, info.hits),
+            (PREFIX + "cache_misses_total", "counter", "Cache lookups that had to compute", key, info.misses),
+            (PREFIX + "cache_hit_ratio", "gauge", "Share of cache lookups that hit", key,
+             info.hits / total if total else 0.0),
+            (PREFIX + "cache_entries", "gauge", "Entries currently held", key, info.currsize),
+        ]
+    return rows
+
+
+REGISTRY.add_collector(_cache_rows)
+
+
+def _queue_counts() -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for job_manager in _queues:
+        for state, n in job_manager.status_counts().items():
+            counts[state] = counts.get(state, 0) + n
+    return counts
+
+
+def _queue_rows():
+    return [(PREFIX + "tasks", "gauge", "Tasks in the job database by status", _labels({"status": state}), n)
+            for state, n in sorted(_queue_counts().items())]
+
+
+REGISTRY.add_collector(_queue_rows)
+
+
+def watch_queue(job_manager):
+    """Adds the tasks table's count per status (queue depth) to every scrape."""
+    if job_manager not in _queues:
+        _queues.append(job_manager)
+
+
+def unwatch_queue(job_manager):
+    """Stops reporting a job database added by watch_queue (e.g. when its app shuts down)."""
+    if job_manager in _queues:
+        _queues.remove(job_manager)
+
+
+def status() -> Dict[str, object]:
+    """JSON-friendly summary for /status."""
+    stages = sorted(set(STAGE_SECONDS.label_values("stage")) | set(STAGE_IN_FLIGHT.label_values("stage")))
+    last = LAST_PROGRESS.value()
+    summary = {
+        "stages": {stage: {"in_flight": int(STAGE_IN_FLIGHT.value(stage=stage)),
+                           "completed": STAGE_SECONDS.count(stage=stage),
+                           "failed": int(STAGE_FAILURES.value(stage=stage)),
+                           "mean_seconds": STAGE_SECONDS.mean(stage=stage)}
+                   for stage in stages},
+        "seconds_since_progress": round(time.time() - last, 1) if last else None,
+        "transcribe_rtf_mean": TRANSCRIBE_RTF.mean(),
+        "encode_speed_mean": ENCODE_SPEED.mean(),
+        "upload_bytes_total": UPLOAD_BYTES.value(),
+        "upload_bytes_per_second": UPLOAD_RATE.value(),
+        "caches": {name: fn.cache_info()._asdict() for name, fn in sorted(_caches.items())},
+    }
+    if _queues:
+        try:
+            summary["tasks"] = _queue_counts()
+        except Exception as e:
+            summary["tasks"] = {"error": str(e)}
+    return summary
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/metrics":
+            body, content_type = self.registry.render().encode(), "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/status":
+            body, content_type = json.dumps(status(), indent=2).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(port: int, host: str = "0.0.0.0", job_manager=None) -> ThreadingHTTPServer:
+    """Starts the /metrics and /status endpoint on a daemon thread and returns the server."""
+    if job_manager is not None:
+        watch_queue(job_manager)
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics").start()
+    logger.info(f"Metrics on http://{host}:{server.server_port}/metrics")
+    return server
@@ -0,0 +1,167 @@
+"""
+Decode-once PCM cache for an episode's audio.
+
+MP3/M4A input used to be decoded by faster-whisper on every transcribe()
+call (twice with the model cascade) and again by anything that needed the
+duration. PCMCache decodes each file once to 16 kHz mono float32 (what
+Whisper consumes) in a raw file and hands out read-only numpy memmaps of it:
+
+  with cache.open(audio_path) as pcm:       # np.memmap, float32, 16 kHz
+      segments = transcriber.transcribe(audio_path, audio=pcm)
+      duration = len(pcm) / SAMPLE_RATE
+
+Every consumer maps the same pages, so concurrent transcriptions and other
+processes (np.memmap(pcm.filename, dtype="float32", mode="r")) share one
+copy through the page cache. Files are reference counted: the last user of
+an episode deletes its file, so the cache lives exactly as long as the task
+that needs it. 16 kHz mono 16-bit WAV is converted without FFmpeg.
+
+Location: $STREAMFLUENT_PCM_DIR, else <system temp>/streamfluent-pcm.
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from contextlib import contextmanager
+from typing import Dict, List
+
+import artifact_store
+import tracing
+
+SAMPLE_RATE = 16000
+DIR_ENV = "STREAMFLUENT_PCM_DIR"
+# Decoded files older than this with no user in this process are leftovers of a crashed run
+STALE_SECONDS = 6 * 3600
+# Frames converted per step on the WAV fast path (30 s)
+_WAV_BLOCK = SAMPLE_RATE * 30
+
+
+def default_dir() -> str:
+    return os.environ.get(DIR_ENV) or os.path.join(tempfile.gettempdir(), "streamfluent-pcm")
+
+
+def _cache_name(audio_path: str) -> str:
+    # Path + size + mtime: a replaced file gets a new entry without hashing its content
+    st = os.stat(audio_path)
+    raw = f"{os.path.abspath(audio_path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24] + ".f32"
+
+
+def _decode_wav(audio_path: str, out_path: str) -> bool:
+    """Converts 16 kHz mono 16-bit WAV directly; returns False for anything that needs resampling."""
+    import numpy as np
+
+    try:
+        with wave.open(audio_path, "rb") as src:
+            if (src.getnchannels(), src.getsampwidth(), src.getframerate()) != (1, 2, SAMPLE_RATE):
+                return False
+            with open(out_path, "wb") as dst:
+                while True:
+                    frames = src.readframes(_WAV_BLOCK)
+                    if not frames:
+                        break
+                    (np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0).tofile(dst)
+    except (wave.Error, EOFError):
+        return False
+    return True
+
+
+def _decode_ffmpeg(audio_path: str, out_path: str):
+    cmd = [
+        "ffmpeg", "-nostdin", "-v", "error", "-y",
+        "-i", audio_path,
+        "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-f", "f32le", out_path,
+    ]
+    try:
+        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Decoding {audio_path} failed: {e.stderr.decode(errors='replace')}")
+
+
+def _decode_av(audio_path: str, out_path: str):
+    # Without an ffmpeg binary, the PyAV decoder faster-whisper itself uses
+    from faster_whisper.audio import decode_audio
+
+    decode_audio(audio_path, sampling_rate=SAMPLE_RATE).astype("float32").tofile(out_path)
+
+
+def decode_to_file(audio_path: str, out_path: str):
+    """Writes audio_path as raw 16 kHz mono float32 (little-endian) to out_path, atomically."""
+    with artifact_store.atomic_path(out_path) as tmp:
+        if _decode_wav(audio_path, tmp):
+            return
+        if shutil.which("ffmpeg"):
+            _decode_ffmpeg(audio_path, tmp)
+        else:
+            _decode_av(audio_path, tmp)
+
+
+class PCMCache:
+    def __init__(self, root: str = None, keep: bool = False):
+        # keep=True leaves decoded files in place after the last user (e.g. for repeated benchmarks)
+        self.root = root or default_dir()
+        self.keep = keep
+        self.decodes = 0
+        self.hits = 0
+        self._lock = threading.Lock()
+        # cache path -> [users, lock held while the file is being decoded]
+        self._entries: Dict[str, List] = {}
+
+    def path_for(self, audio_path: str) -> str:
+        return os.path.join(self.root, _cache_name(audio_path))
+
+    @contextmanager
+    def open(self, audio_path: str):
+        """Yields the episode's samples as a read-only float32 memmap, decoding on first use."""
+        import numpy as np
+
+        if not os.path.exists(audio_path):
+            raise FileNotFoundError(f"Audio file not found: {audio_path}")
+        path = self.path_for(audio_path)
+        with self._lock:
+            entry = self._entries.setdefault(path, [0, threading.Lock()])
+            entry[0] += 1
+        try:
+            with entry[1]:
+                if os.path.exists(path):
+                    self.hits += 1
+                else:
+                    os.makedirs(self.root, exist_ok=True)
+                    with tracing.span("audio.decode", audio=os.path.basename(audio_path)):
+                        decode_to_file(audio_path, path)
+                    self.decodes += 1
+            # mmap cannot map an empty file
+            yield np.memmap(path, dtype=np.float32, mode="r") if os.path.getsize(path) else np.zeros(0, np.float32)
+        finally:
+            with self._lock:
+                entry[0] -= 1
+                if not entry[0]:
+                    del self._entries[path]
+                    if not self.keep and os.path.exists(path):
+                        # Open maps stay valid after unlink; the pages go once the last one closes
+                        os.remove(path)
+
+    def sweep(self, older_than: float = STALE_SECONDS) -> int:
+        """Deletes decoded files nobody here is using that are older than `older_than`; returns how many."""
+        if not os.path.isdir(self.root):
+            return 0
+        removed = 0
+        cutoff = time.time() - older_than
+        with self._lock:
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                if path in self._entries:
+                    continue
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass  # another process's run just finished with it
+        return removed
@@ -0,0 +1,400 @@
+"""
+Direct (agent-free) pipeline: scan → produce → publish as plain function calls.
+
+Each stage returns a StageResult; run_pipeline() stops at the first stage
+that fails and exit_code() turns the results into a process exit status.
+The CrewAI tools wrap the same stage functions, so both modes share one
+code path. Nothing here imports crewai or an LLM client.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List
+
+EXIT_OK = 0        # every stage succeeded
+EXIT_FAILED = 1    # a stage could not run (bad input, missing credential, exception)
+EXIT_PARTIAL = 2   # stages ran, but some tasks failed
+
+CREDENTIAL_FILE = "bili_sess.json"
+
+
+@dataclass
+class StageResult:
+    stage: str
+    ok: bool
+    message: str
+    counts: Dict[str, int] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def failed(self) -> int:
+        return self.counts.get("failed", 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def run_async(coro):
+    """Runs a coroutine to completion whether or not an event loop is already running.
+
+    CrewAI runs its own event loop, so asyncio.run() would raise
+    'This event loop is already running'. Running in a fresh thread avoids that.
+    """
+    outcome: list = [None, None]
+
+    def target():
+        try:
+            outcome[0] = asyncio.run(coro)
+        except Exception as e:
+            outcome[1] = e
+
+    t = threading.Thread(target=target, daemon=True)
+    t.start()
+    t.join()
+    if outcome[1]:
+        raise outcome[1]
+    return outcome[0]
+
+
+_FAILURE_LABELS = {"scan": "Directory scan failed", "produce": "Karaoke processing failed",
+                   "publish": "Upload failed"}
+
+
+def _timed(stage, fn, *args, **kwargs) -> StageResult:
+    started = time.monotonic()
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as e:
+        result = StageResult(stage, False, f"{_FAILURE_LABELS[stage]} — {e}")
+    result.seconds = round(time.monotonic() - started, 3)
+    return result
+
+
+def _scan(base_dir: str, output: str, defer_images: bool) -> StageResult:
+    from manifest import ManifestWriter
+    from scan_tasks import iter_scan
+
+    if not os.path.isdir(base_dir):
+        return StageResult("scan", False, f"Directory not found: '{base_dir}'")
+
+    preview = "N/A"
+    with ManifestWriter(output) as writer:
+        for task in iter_scan(base_dir, defer_images=defer_images):
+            if writer.count == 0:
+                preview = task.get("audio_path", "N/A")
+            writer.write(task)
+    if not writer.count:
+        return StageResult("scan", True, f"No audio tasks found in '{base_dir}'.", {"tasks": 0})
+
+    return StageResult(
+        "scan", True,
+        f"Scan complete. Found {writer.count} audio task(s). Written to '{output}'. First entry: {preview}",
+        {"tasks": writer.count},
+    )
+
+
+def scan(base_dir: str, output: str = "tasks.jsonl", defer_images: bool = False) -> StageResult:
+    """Scans base_dir and writes the task manifest."""
+    return _timed("scan", _scan, base_dir, output, defer_images)
+
+
+def _produce(tasks_path: str, render_profile: str) -> StageResult:
+    from generate_images import ImagePool
+    from job_store import Task as KaraokeTask
+    from karaoke_gen import KaraokeGenerator
+    from manifest import iter_manifest
+    from scan_tasks import task_metadata
+
+    if not os.path.exists(tasks_path):
+        return StageResult("produce", False, f"Tasks file not found: '{tasks_path}'")
+
+    gen = KaraokeGenerator(render_profile=render_profile)
+    added, skipped = [], 0
+
+    # Stream the manifest; backgrounds the scanner deferred are generated in parallel meanwhile
+    with ImagePool() as pool:
+        for task in iter_manifest(tasks_path):
+            audio = task.get("audio_path", "")
+            image = task.get("image_path", "")
+            if not audio or not os.path.exists(audio):
+                skipped += 1
+                continue
+            if image and not os.path.exists(image):
+                pool.submit(task.get("image_title") or task.get("title", ""), image)
+            gen.add_task(audio, image, **task_metadata(task))
+            added.append(audio)
+        pool.wait()
+
+    if not added and not skipped:
+        return StageResult("produce", False, "Tasks file is empty.")
+    if not added:
+        return StageResult("produce", True, f"No valid tasks to process (skipped {skipped} with missing audio).",
+                           {"added": 0, "skipped": skipped})
+
+    gen.process_pending_tasks()
+
+    # Per-run outcome: a task counts as done if it (or its canonical duplicate) has a video
+    manager = gen.job_manager
+    done = sum(1 for audio in added if manager.find_output(audio))
+    counts = {"added": len(added), "skipped": skipped, "completed": done, "failed": len(added) - done}
+
+    # DB totals, as reported to the agent before
+    session = manager.Session()
+    completed = session.query(KaraokeTask).filter_by(status="completed").count()
+    failed = session.query(KaraokeTask).filter_by(status="failed").count()
+    session.close()
+
+    return StageResult(
+        "produce", True,
+        f"Karaoke processing complete. Added: {len(added)}, Skipped (missing audio): {skipped}. "
+        f"DB totals — Completed: {completed}, Failed: {failed}.",
+        counts,
+    )
+
+
+def produce(tasks_path: str = "tasks.jsonl", render_profile: str = "default") -> StageResult:
+    """Queues every task in the manifest and renders all pending videos."""
+    return _timed("produce", _produce, tasks_path, render_profile)
+
+
+def _publish(tasks_path: str, cleanup: bool, credential_file: str) -> StageResult:
+    if not os.path.exists(credential_file):
+        return StageResult("publish", False,
+                           "bili_sess.json not found. Please authenticate first: python bili_upload.py --login")
+    if not os.path.exists(tasks_path):
+        return StageResult("publish", False, f"Tasks file not found: '{tasks_path}'")
+
+    from bili_upload import batch_upload
+
+    results = run_async(batch_upload(tasks_path, cleanup=cleanup))
+    if results is None:
+        return StageResult("publish", False, "Upload could not start; check console output above.")
+    return StageResult(
+        "publish", True,
+        f"Bilibili batch upload completed from '{tasks_path}'. Uploaded: {results['uploaded']}, "
+        f"Failed: {results['failed']}, Skipped: {results['skipped']}.",
+        dict(results),
+    )
+
+
+def publish(tasks_path: str = "tasks.jsonl", cleanup: bool = False,
+            credential_file: str = CREDENTIAL_FILE) -> StageResult:
+    """Uploads every completed video in the manifest."""
+    return _timed("publish", _publish, tasks_path, cleanup, credential_file)
+
+
+def run_pipeline(podcast_dir: str, tasks_path: str = "tasks.jsonl", skip_upload: bool = False,
+                 defer_images: bool = False, render_profile: str = "default") -> List[StageResult]:
+    results = [scan(podcast_dir, tasks_path, defer_images=defer_images)]
+    if not results[-1].ok or not results[-1].counts.get("tasks"):
+        return results
+
+    results.append(produce(tasks_path, render_profile=render_profile))
+    if not results[-1].ok or skip_upload:
+        return results
+
+    results.append(publish(tasks_path))
+    return results
+
+
+def exit_code(results: List[StageResult]) -> int:
+    if any(not r.ok for r in results):
+        return EXIT_FAILED
+    if any(r.failed for r in results):
+        return EXIT_PARTIAL
+    return EXIT_OK
+
+
+async def stream_pipeline(podcast_dir: str, tasks_path: str = "tasks.jsonl", skip_upload: bool = False,
+                          defer_images: bool = False, render_profile: str = "default", queue_size: int = 2,
+                          upload_concurrency: int = 1, rate_per_min: float = 12,
+                          credential_file: str = CREDENTIAL_FILE, generator=None) -> List[StageResult]:
+    """Streams each episode through scan → produce → publish as soon as it is ready.
+
+    The three stages run concurrently, connected by bounded queues: the scanner
+    hands over each task as it is found, renders run one at a time in a worker
+    thread, and each finished video is uploaded while the next one renders.
+    A full queue makes the stage before it wait, so neither scan results nor
+    rendered videos pile up ahead of a slower stage.
+    """
+    started = time.monotonic()
+    render_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    upload_queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    counts = {
+        "scan": {"tasks": 0},
+        "produce": {"added": 0, "skipped": 0, "completed": 0, "failed": 0},
+        "publish": {"uploaded": 0, "failed": 0, "skipped": 0},
+    }
+    errors: Dict[str, str] = {}
+    finished: Dict[str, float] = {}
+    first_video: list = [None, None]  # seconds to first rendered / first published video
+    image_pools: list = []  # one ImagePool for deferred backgrounds and covers, created on first use
+
+    def image_pool():
+        if not image_pools:
+            from generate_images import ImagePool
+            image_pools.append(ImagePool())
+        return image_pools[0]
+
+    if not os.path.isdir(podcast_dir):
+        return [StageResult("scan", False, f"Directory not found: '{podcast_dir}'")]
+    if not skip_upload and not os.path.exists(credential_file):
+        # Fail before hours of rendering rather than at the first upload
+        return [StageResult("publish", False,
+                            "bili_sess.json not found. Please authenticate first: python bili_upload.py --login")]
+
+    async def drain(queue):
+        while await queue.get() is not None:
+            pass
+
+    async def scan_stage():
+        from manifest import ManifestWriter
+        from scan_tasks import iter_scan
+
+        try:
+            records = iter_scan(podcast_dir, defer_images=defer_images)
+            with ManifestWriter(tasks_path) as writer:
+                while True:
+                    task = await asyncio.to_thread(next, records, None)
+                    if task is None:
+                        break
+                    writer.write(task)
+                    counts["scan"]["tasks"] += 1
+                    await render_queue.put(task)
+        except Exception as e:
+            errors["scan"] = f"{_FAILURE_LABELS['scan']} — {e}"
+        finally:
+            finished["scan"] = time.monotonic()
+            await render_queue.put(None)
+
+    async def produce_stage():
+        from scan_tasks import task_metadata
+
+        c = counts["produce"]
+        try:
+            gen = generator
+            if gen is None:
+                from karaoke_gen import KaraokeGenerator
+                gen = await asyncio.to_thread(KaraokeGenerator, render_profile=render_profile)
+            manager = gen.job_manager
+
+            while (task := await render_queue.get()) is not None:
+                audio = task.get("audio_path", "")
+                image = task.get("image_path", "")
+                if not audio or not os.path.exists(audio):
+                    c["skipped"] += 1
+                    continue
+                if image and not os.path.exists(image):
+                    from generate_images import ensure_task_images
+                    await asyncio.to_thread(ensure_task_images, [task], pool=image_pool())
+
+                await asyncio.to_thread(gen.add_task, audio, image, **task_metadata(task))
+                c["added"] += 1
+                db_task = await asyncio.to_thread(manager.get_task, audio)
+                if db_task is not None and db_task.status == "pending":
+                    video = await asyncio.to_thread(gen.process_task, db_task)
+                    if video is None:
+                        c["failed"] += 1
+                        continue
+                else:
+                    # Rendered by an earlier run, or a duplicate of another episode
+                    video = await asyncio.to_thread(manager.find_output, audio)
+                    if video is None:
+                        c["skipped"] += 1
+                        continue
+
+                c["completed"] += 1
+                if first_video[0] is None:
+                    first_video[0] = time.monotonic() - started
+                if not skip_upload:
+                    await upload_queue.put(task)
+        except Exception as e:
+            errors["produce"] = f"{_FAILURE_LABELS['produce']} — {e}"
+            await drain(render_queue)
+        finally:
+            finished["produce"] = time.monotonic()
+            if not skip_upload:
+                await upload_queue.put(None)
+
+    async def publish_stage():
+        c = counts["publish"]
+        try:
+            from bili_upload import load_credential, prepare_upload, upload_with_retry
+            from job_store import JobManager
+            from rate_limit import AdaptiveTokenBucket
+
+            credential = load_credential()
+            manager = JobManager()
+            limiter = AdaptiveTokenBucket(rate=rate_per_min / 60, capacity=upload_concurrency)
+            slots = asyncio.Semaphore(upload_concurrency)
+            running = set()
+            in_flight = set()  # canonical task ids; duplicate audio is uploaded once
+
+            async def run_one(kwargs):
+                try:
+                    result = await upload_with_retry(limiter, credential=credential, **kwargs)
+                    if result is None:
+                        c["failed"] += 1
+                        return
+                    c["uploaded"] += 1
+                    if first_video[1] is None:
+                        first_video[1] = time.monotonic() - started
+                finally:
+                    in_flight.discard(kwargs["ledger"].task_id)
+                    slots.release()
+
+            while (task := await upload_queue.get()) is not None:
+                kwargs = await asyncio.to_thread(prepare_upload, manager, task, in_flight=in_flight,
+                                                 image_pool=image_pool())
+                if kwargs is None:
+                    c["skipped"] += 1
+                    continue
+                in_flight.add(kwargs["ledger"].task_id)
+                await slots.acquire()
+                job = asyncio.create_task(run_one(kwargs))
+                running.add(job)
+                job.add_done_callback(running.discard)
+
+            if running:
+                await asyncio.gather(*running)
+        except Exception as e:
+            errors["publish"] = f"{_FAILURE_LABELS['publish']} — {e}"
+            await drain(upload_queue)
+        finally:
+            finished["publish"] = time.monotonic()
+
+    stages = [scan_stage(), produce_stage()]
+    if not skip_upload:
+        stages.append(publish_stage())
+    try:
+        await asyncio.gather(*stages)
+    finally:
+        for pool in image_pools:
+            pool.shutdown()
+
+    def first(seconds):
+        return f"{seconds:.1f}s" if seconds is not None else "n/a"
+
+    messages = {
+        "scan": f"Scan complete. Found {counts['scan']['tasks']} audio task(s). Written to '{tasks_path}'.",
+        "produce": (f"Karaoke processing complete. Completed: {counts['produce']['completed']}, "
+                    f"Failed: {counts['produce']['failed']}, Skipped: {counts['produce']['skipped']}. "
+                    f"First video ready after {first(first_video[0])}."),
+        "publish": (f"Bilibili upload complete. Uploaded: {counts['publish']['uploaded']}, "
+                    f"Failed: {counts['publish']['failed']}, Skipped: {counts['publish']['skipped']}. "
+                    f"First video published after {first(first_video[1])}."),
+    }
+    return [
+        StageResult(stage, stage not in errors, errors.get(stage, messages[stage]), counts[stage],
+                    round(finished[stage] - started, 3))
+        for stage in ("scan", "produce", "publish") if stage in finished
+    ]
+
+
+def run_streaming(podcast_dir: str, tasks_path: str = "tasks.jsonl", skip_upload: bool = False,
+                  **kwargs) -> List[StageResult]:
+    """Blocking wrapper around stream_pipeline()."""
+    return run_async(stream_pipeline(podcast_dir, tasks_path, skip_upload=skip_upload, **kwargs))
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+
+class AdaptiveTokenBucket:
+    """Async token bucket whose refill rate adapts to platform throttling.
+
+    Each acquire() takes one token. Tokens refill at `rate` per second up to
+    `capacity`. On a throttling response, on_throttle() halves the rate,
+    empties the bucket and pauses for `cooldown` seconds. Each on_success()
+    then raises the rate additively back towards `max_rate` (AIMD), so pacing
+    follows what the platform currently accepts instead of a fixed sleep.
+    """
+
+    def __init__(self, rate=0.2, capacity=2, max_rate=None, min_rate=1 / 120,
+                 backoff=0.5, increase=0.02, cooldown=30.0, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.min_rate = min_rate
+        self.backoff = backoff
+        self.increase = increase
+        self.cooldown = cooldown
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self):
+        """Seconds until a token is available (0 if one can be taken now)."""
+        now = self._clock()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                wait = self.delay()
+                if wait <= 0:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep(wait)
+
+    def on_throttle(self):
+        now = self._clock()
+        self.rate = max(self.min_rate, self.rate * self.backoff)
+        self._tokens = 0.0
+        self._paused_until = max(self._paused_until, now + self.cooldown)
+        self._updated = self._paused_until
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + self.increase)
@@ -0,0 +1,149 @@
+"""
+Local resource manager: admits transcription and render work only while it
+fits the host's cores and memory, and tells each job how many threads to use.
+
+Costs are estimated per stage from the Whisper model size and the episode's
+duration. A job waits in admit() until enough memory is free and at least its
+minimum thread count is idle; it is then granted up to the threads it asked
+for. A job larger than the whole budget is still admitted once nothing else
+is running, so it can never wait forever.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+# Resident size of a loaded faster-whisper model with int8 weights (float32 is about double)
+MODEL_MEMORY_MB = {
+    "tiny": 250, "base": 400, "small": 900, "medium": 2000,
+    "large": 3600, "large-v1": 3600, "large-v2": 3600, "large-v3": 3600, "turbo": 1800,
+}
+# Decoded audio (16 kHz mono float32) plus the model's working buffers
+AUDIO_MB_PER_SECOND = 16000 * 4 / 1024 / 1024
+TRANSCRIBE_WORKING_MB = 300
+# x264 at 1080p with a still input: lookahead and reference frames, plus a share per thread
+RENDER_BASE_MB = 250
+RENDER_MB_PER_THREAD = 40
+RENDER_THREADS = 4
+
+
+@dataclass
+class Cost:
+    threads: int
+    memory_mb: float
+    min_threads: int = 1
+
+
+@dataclass
+class Grant:
+    threads: int
+    memory_mb: float
+
+
+def available_memory_mb() -> Optional[float]:
+    """Memory the OS can hand out now (MemAvailable on Linux), or total RAM elsewhere."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def model_memory_mb(model_size: str, compute_type: str = "int8") -> float:
+    base = MODEL_MEMORY_MB.get(model_size, MODEL_MEMORY_MB["large"])
+    return base * (2 if compute_type == "float32" else 1)
+
+
+def transcribe_cost(duration: Optional[float], threads: int) -> Cost:
+    """One transcription on an already loaded model (reserve the model itself separately).
+
+    The model's cpu_threads are fixed when it is loaded, so the job needs all of them.
+    """
+    memory = TRANSCRIBE_WORKING_MB + (duration or 0) * AUDIO_MB_PER_SECOND
+    return Cost(threads=threads, memory_mb=memory, min_threads=threads)
+
+
+def render_cost(threads: int = RENDER_THREADS) -> Cost:
+    """One FFmpeg encode; it runs fine on fewer threads than asked for, just slower."""
+    return Cost(threads=threads, memory_mb=RENDER_BASE_MB + RENDER_MB_PER_THREAD * threads, min_threads=1)
+
+
+class ResourceManager:
+    def __init__(self, cpus: Optional[int] = None, memory_mb: Optional[float] = None, headroom_mb: float = 1024):
+        self.cpus = cpus or os.cpu_count() or 1
+        total = memory_mb if memory_mb is not None else (available_memory_mb() or 4096)
+        self.memory_mb = max(0.0, total - headroom_mb)
+        self._cond = threading.Condition()
+        self._reserved_mb = 0.0
+        self._used_threads = 0
+        self._used_mb = 0.0
+        self._active = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+
+    def reserve(self, memory_mb: float):
+        """Takes memory out of the budget for good, e.g. for a model loaded once and shared."""
+        with self._cond:
+            self._reserved_mb += memory_mb
+
+    def free_threads(self) -> int:
+        return self.cpus - self._used_threads
+
+    def free_memory_mb(self) -> float:
+        return self.memory_mb - self._reserved_mb - self._used_mb
+
+    def _grantable(self, cost: Cost) -> Optional[int]:
+        if self._active == 0:
+            # Nothing running: admit even an oversized job rather than deadlock
+            return max(1, min(cost.threads, self.cpus))
+        if cost.memory_mb > self.free_memory_mb():
+            return None
+        if self.free_threads() < cost.min_threads:
+            return None
+        return min(cost.threads, self.free_threads())
+
+    @contextmanager
+    def admit(self, cost: Cost):
+        """Blocks until `cost` fits, then yields a Grant with the thread count to use."""
+        started = time.monotonic()
+        with self._cond:
+            threads = self._grantable(cost)
+            if threads is None:
+                self.waits += 1
+            while threads is None:
+                self._cond.wait()
+                threads = self._grantable(cost)
+            self.wait_seconds += time.monotonic() - started
+            self._used_threads += threads
+            self._used_mb += cost.memory_mb
+            self._active += 1
+        try:
+            yield Grant(threads=threads, memory_mb=cost.memory_mb)
+        finally:
+            with self._cond:
+                self._used_threads -= threads
+                self._used_mb -= cost.memory_mb
+                self._active -= 1
+                self._cond.notify_all()
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "cpus": self.cpus,
+                "threads_in_use": self._used_threads,
+                "memory_budget_mb": round(self.memory_mb),
+                "memory_reserved_mb": round(self._reserved_mb),
+                "memory_in_use_mb": round(self._used_mb),
+                "active_jobs": self._active,
+                "admission_waits": self.waits,
+                "admission_wait_seconds": round(self.wait_seconds, 2),
+            }
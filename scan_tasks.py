@@ -1,181 +1,321 @@
 import os
-import json
+import re
 import argparse
+import shutil
 from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-def scan_directory(base_dir):
-    tasks = []
+import tracing
+from manifest import ManifestWriter
+from media_probe import probe_audio
+
+# Task fields passed through to JobManager.add_task
+TASK_METADATA_KEYS = ("duration", "codec", "bitrate", "priority", "deadline")
+
+# Supported extensions (ordered: earlier extensions win on exact-name matches)
+AUDIO_EXTS = ('.mp3', '.wav', '.m4a', '.flac')
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.webp')
+
+
+def extract_episode_num(filename):
+    # Matches "Ep. 30", "Ep30", "30" etc.
+    # We look for the last significant number or specific "Ep" patterns
+    # 1. Look for Ep/Episode followed by digits
+    match = re.search(r'(?:ep|episode)[._\s]*(\d+)', filename, re.IGNORECASE)
+    if match:
+        return int(match.group(1))
+
+    # 2. Fallback: return the last distinct number found in filename (risky if dates are present)
+    # But commonly "Title 01.mp3" -> 1
+    nums = re.findall(r'\d+', filename)
+    if nums:
+        # Heuristic: usually the episode number is towards the end or is the only number
+        return int(nums[-1])
+    return None
+
+
+def parse_title(filename_stem):
+    """Splits a filename stem into (channel_part, actual_title)."""
+    # Regex: Optional [Channel], Optional Number (e.g., 42. or 42 ), then Core Title
+    match = re.match(r'^(\[.*?\])?\s*(\d+\s*[\.\s]\s*)?(.*)$', filename_stem)
+
+    channel_part = ""
+    actual_title = filename_stem # Fallback
+
+    if match:
+        channel_part = (match.group(1) or "").strip()
+        # Also strip trailing "Ep. XX" if present in the rest of the title
+        raw_actual = (match.group(3) or "").strip()
+        actual_title = re.sub(r'\s*\|\s*Ep\.\s*\d+$', '', raw_actual) # remove " | Ep. 41"
+        actual_title = re.sub(r'\s+Ep\.\s*\d+$', '', actual_title)    # remove " Ep. 41"
+        actual_title = actual_title.strip()
+
+    return channel_part, actual_title
+
+
+class DirIndex:
+    """Audio files and image lookup tables for one directory.
+
+    Built from a single os.scandir() pass so that matching an episode to its
+    background or cover is a dict lookup instead of a scan over every image.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.audio = []
+        self.subdirs = []
+        self.images = set()      # exact image filenames
+        self.by_num = {}         # episode number -> first image filename
+        self.cover_by_num = {}   # episode number -> first "cover_*" image filename
+
+    def add_image(self, name):
+        self.images.add(name)
+        num = extract_episode_num(name)
+        if num is None:
+            return
+        self.by_num.setdefault(num, name)
+        if name.lower().startswith("cover_"):
+            self.cover_by_num.setdefault(num, name)
+
+    def find_background(self, audio_name, audio_num):
+        # Strategy 1: Exact name match (Audio.mp3 -> Audio.jpg)
+        stem = os.path.splitext(audio_name)[0]
+        for ext in IMAGE_EXTS:
+            if stem + ext in self.images:
+                return os.path.join(self.path, stem + ext)
+
+        # Strategy 2: Smart Number Match (same directory, same episode number)
+        if audio_num is not None and audio_num in self.by_num:
+            return os.path.join(self.path, self.by_num[audio_num])
+
+        # Strategy 3: Fallback to 'cover' image
+        for ext in IMAGE_EXTS:
+            if "cover" + ext in self.images:
+                return os.path.join(self.path, "cover" + ext)
+        return None
+
+    def find_cover(self, audio_num):
+        if audio_num is not None and audio_num in self.cover_by_num:
+            return os.path.join(self.path, self.cover_by_num[audio_num])
+        return None
+
+
+def index_directory(path):
+    """Lists one directory with os.scandir and returns its DirIndex."""
+    index = DirIndex(path)
+    with os.scandir(path) as it:
+        entries = sorted(it, key=lambda e: e.name)
+    for entry in entries:
+        try:
+            # Like Path.rglob, do not descend into symlinked directories
+            if entry.is_dir(follow_symlinks=False):
+                index.subdirs.append(entry.path)
+                continue
+            if not entry.is_file():
+                continue
+        except OSError:
+            continue
+        ext = os.path.splitext(entry.name)[1].lower()
+        if ext in AUDIO_EXTS:
+            index.audio.append(entry.name)
+        elif ext in IMAGE_EXTS:
+            index.add_image(entry.name)
+    return index
+
+
+def walk_directories(base_path):
+    """Yields a DirIndex for base_path and every directory below it, in sorted order."""
+    stack = [str(base_path)]
+    while stack:
+        path = stack.pop()
+        try:
+            index = index_directory(path)
+        except OSError as e:
+            print(f"Warning: cannot read {path}: {e}")
+            continue
+        yield index
+        stack.extend(reversed(index.subdirs))
+
+
+def build_task(audio_name, index, base_path):
+    """Builds the task dict for one audio file.
+
+    Returns (task, image_title, missing) where missing lists the
+    (output_path, is_cover) images that still have to be generated.
+    """
+    audio_file = Path(index.path) / audio_name
+    audio_num = extract_episode_num(audio_name)
+
+    task = {
+        "audio_path": str(audio_file),
+        "image_path": index.find_background(audio_name, audio_num)
+    }
+    missing = []
+
+    # Extraction Logic for Titles
+    channel_part, actual_title = parse_title(audio_file.stem)
+
+    image_title = actual_title
+    if audio_num is not None:
+        image_title = f"{actual_title} | Ep. {audio_num}"
+
+    bili_title_full = (f"{channel_part} {actual_title}").strip()
+
+    # Ensure image_path is set even if not found
+    if not task["image_path"]:
+        # Default to original filename with .jpg extension in the same directory
+        task["image_path"] = str(audio_file.with_suffix(".jpg"))
+        missing.append((task["image_path"], False))
+
+    # Differentiate between render background and Bilibili cover
+    # Logic: look for "cover_" + episode_num
+    bili_cover_path = index.find_cover(audio_num)
+    if not bili_cover_path:
+        # We expect cover_EpXX.jpeg
+        cover_name = f"cover_Ep{audio_num}.jpeg" if audio_num else f"cover_{audio_file.stem}.jpeg"
+        bili_cover_path = str(Path(base_path) / cover_name)
+        if not os.path.exists(bili_cover_path):
+            missing.append((bili_cover_path, True))
+
+    # Add metadata for Bilibili upload (Always present in JSON)
+    if len(bili_title_full) > 80:
+        bili_title_full = bili_title_full[:80]
+
+    task["title"] = bili_title_full
+    task["desc"] = ""
+    task["tags"] = "英语听力,英语学习,PodCast,English"
+    task["tid"] = 181 # Knowledge default (知识区)
+    task["copyright"] = 2 # 1=Original,2=Cover
+    task["source"] = "https://open.spotify.com/show/571TfkIrKfbMXse360yYfT?si=f40497ceb21e42e8"
+    task["bili_cover_path"] = bili_cover_path
+
+    return task, image_title, missing
+
+
+def task_metadata(task):
+    """Returns the scheduling metadata of a task dict as add_task() keyword arguments."""
+    return {key: task.get(key) for key in TASK_METADATA_KEYS}
+
+
+def _traced_probe(audio_path):
+    with tracing.span("scan.probe", audio=os.path.basename(audio_path)):
+        return probe_audio(audio_path)
+
+
+def iter_scan(base_dir, image_pool=None, defer_images=False, probe=True, window=64):
+    """Scans base_dir and yields one task dict per audio file, as soon as it is ready.
+
+    Missing backgrounds and covers are rendered in a process pool while the
+    scan continues; pass an ImagePool to share one across scans, or
+    defer_images=True to skip generation entirely and leave it to the
+    render/upload stages (see generate_images.ensure_task_images).
+
+    With probe=True each audio file's duration, codec and bitrate are read
+    with ffprobe in a thread pool, also concurrently with the scan.
+
+    A task is yielded once its probe and images are done. At most `window`
+    tasks are held back waiting for them, so memory stays flat however large
+    the library is.
+    """
     base_path = Path(base_dir).resolve()
-    
+
     if not base_path.exists():
         print(f"Error: Directory {base_path} not found.")
-        return []
+        return
 
     print(f"Scanning directory: {base_path}")
-    
-    # Supported extensions
-    audio_exts = {'.mp3', '.wav', '.m4a', '.flac'}
-    image_exts = {'.jpg', '.jpeg', '.png', '.webp'}
-    
-    # Find all audio files
-    audio_files = []
-    for ext in audio_exts:
-        audio_files.extend(base_path.rglob(f"*{ext}"))
-    
-    audio_files.sort()
-    
-    # Helper to extract numbers from string
-    import re
-    def extract_episode_num(filename):
-        # Matches "Ep. 30", "Ep30", "30" etc.
-        # We look for the last significant number or specific "Ep" patterns
-        # 1. Look for Ep/Episode followed by digits
-        match = re.search(r'(?:ep|episode)[._\s]*(\d+)', filename, re.IGNORECASE)
-        if match:
-            return int(match.group(1))
-        
-        # 2. Fallback: return the last distinct number found in filename (risky if dates are present)
-        # But commonly "Title 01.mp3" -> 1
-        nums = re.findall(r'\d+', filename)
-        if nums:
-            # Heuristic: usually the episode number is towards the end or is the only number
-            return int(nums[-1])
-        return None
 
-    # Pre-scan images in the directory to avoid repeated IO
-    all_images = []
-    for ext in image_exts:
-        all_images.extend(base_path.rglob(f"*{ext}"))
+    pool = image_pool
+    owns_pool = False
+    prober = ThreadPoolExecutor(max_workers=8) if probe and shutil.which("ffprobe") else None
+    in_flight = deque()
 
-    for audio_file in audio_files:
-        task = {
-            "audio_path": str(audio_file),
-            "image_path": None
-        }
-        
-        found_img = False
-        audio_num = extract_episode_num(audio_file.name)
+    def finish(task, probe_future, image_futures):
+        if probe_future is not None:
+            task.update(probe_future.result())
+        for future in image_futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Error generating image for {task['audio_path']}: {e}")
+        return task
 
-        # Strategy 1: Exact name match (Audio.mp3 -> Audio.jpg)
-        for ext in image_exts:
-            img_candidate = audio_file.with_suffix(ext)
-            if img_candidate.exists():
-                task["image_path"] = str(img_candidate)
-                found_img = True
-                break
-        
-        # Strategy 2: Smart Number Match (if in same directory)
-        if not found_img:
-            if audio_num is not None:
-                # Look for images in the SAME directory with the same number
-                parent_dir = audio_file.parent
-                candidates = [img for img in all_images if img.parent == parent_dir]
-                
-                for img in candidates:
-                    img_num = extract_episode_num(img.name)
-                    if img_num == audio_num:
-                        task["image_path"] = str(img)
-                        found_img = True
-                        break
+    try:
+        for index in walk_directories(base_path):
+            for audio_name in index.audio:
+                task, image_title, missing = build_task(audio_name, index, base_path)
+                # Kept so deferred image generation can render the same title later
+                task["image_title"] = image_title
+
+                # Automation: If images missing, generate them!
+                image_futures = []
+                if not defer_images:
+                    for output_path, is_cover in missing:
+                        # Another episode may already have produced this shared cover
+                        if os.path.exists(output_path):
+                            continue
+                        if pool is None:
+                            from generate_images import ImagePool
+                            pool = ImagePool()
+                            owns_pool = True
+                        kind = "Cover" if is_cover else "Background"
+                        print(f"{kind} missing for {audio_name}, generating -> {Path(output_path).name}")
+                        image_futures.append(pool.submit(image_title, output_path, is_cover=is_cover))
+
+                probe_future = prober.submit(_traced_probe, task["audio_path"]) if prober is not None else None
+                in_flight.append((task, probe_future, image_futures))
+                print(f"[OK] Processed: {audio_name} (Title: {task['title']})")
+
+                # Hand back finished tasks in order; block on the oldest once the window is full
+                while in_flight and (len(in_flight) > window or _all_done(in_flight[0])):
+                    yield finish(*in_flight.popleft())
+
+        while in_flight:
+            yield finish(*in_flight.popleft())
+    finally:
+        if prober is not None:
+            prober.shutdown()
+        if owns_pool:
+            pool.shutdown()
+
+
+def _all_done(entry):
+    _task, probe_future, image_futures = entry
+    return (probe_future is None or probe_future.done()) and all(f.done() for f in image_futures)
+
+
+@tracing.traced("scan.directory")
+def scan_directory(base_dir, image_pool=None, defer_images=False, probe=True):
+    """Scans base_dir for audio and returns the full task list (see iter_scan)."""
+    return list(iter_scan(base_dir, image_pool=image_pool, defer_images=defer_images, probe=probe))
+
+
+@tracing.traced("scan.directory")
+def write_manifest(base_dir, output_path, **scan_options):
+    """Streams a scan into a manifest file, one record at a time. Returns the record count."""
+    with ManifestWriter(output_path) as writer:
+        for task in iter_scan(base_dir, **scan_options):
+            writer.write(task)
+    return writer.count
 
-        # Strategy 3: Fallback to 'cover' image
-        if not found_img:
-            parent_dir = audio_file.parent
-            for ext in image_exts:
-                cover_candidate = parent_dir / f"cover{ext}"
-                if cover_candidate.exists():
-                    task["image_path"] = str(cover_candidate)
-                    found_img = True
-                    break
-        
-        # Extraction Logic for Titles (Always run this first)
-        import re
-        filename_stem = audio_file.stem
-        # Regex: Optional [Channel], Optional Number (e.g., 42. or 42 ), then Core Title
-        match = re.match(r'^(\[.*?\])?\s*(\d+\s*[\.\s]\s*)?(.*)$', filename_stem)
-        
-        channel_part = ""
-        actual_title = filename_stem # Fallback
-        
-        if match:
-            channel_part = (match.group(1) or "").strip()
-            # Also strip trailing "Ep. XX" if present in the rest of the title
-            raw_actual = (match.group(3) or "").strip()
-            actual_title = re.sub(r'\s*\|\s*Ep\.\s*\d+$', '', raw_actual) # remove " | Ep. 41"
-            actual_title = re.sub(r'\s+Ep\.\s*\d+$', '', actual_title)    # remove " Ep. 41"
-            actual_title = actual_title.strip()
-        
-        image_title = actual_title
-        if audio_num is not None:
-            image_title = f"{actual_title} | Ep. {audio_num}"
-            
-        bili_title_full = (f"{channel_part} {actual_title}").strip()
-        
-        # Ensure image_path is set even if not found
-        if not task["image_path"]:
-            # Default to original filename with .jpg extension in the same directory
-            task["image_path"] = str(audio_file.with_suffix(".jpg"))
-
-        # Differentiate between render background and Bilibili cover
-        # Logic: look for "cover_" + episode_num
-        bili_cover_path = None
-        if audio_num is not None:
-            parent_dir = audio_file.parent
-            candidates = [img for img in all_images if img.parent == parent_dir]
-            for img in candidates:
-                if img.name.lower().startswith("cover_"):
-                    img_num = extract_episode_num(img.name)
-                    if img_num == audio_num:
-                        bili_cover_path = str(img)
-                        break
-        
-        # Automation: If images missing, generate them!
-        from generate_images import ImageGenerator
-        gen = ImageGenerator()
-        
-        if not os.path.exists(task["image_path"]):
-            print(f"Background missing for {audio_file.name}, generating -> {Path(task['image_path']).name}")
-            gen.generate(image_title, task["image_path"], is_cover=False)
-            
-        if not bili_cover_path:
-            # We expect cover_EpXX.jpeg
-            cover_name = f"cover_Ep{audio_num}.jpeg" if audio_num else f"cover_{audio_file.stem}.jpeg"
-            bili_cover_path = str(base_path / cover_name)
-            
-        if not os.path.exists(bili_cover_path):
-            print(f"Cover missing for {audio_file.name}, generating -> {Path(bili_cover_path).name}")
-            gen.generate(image_title, bili_cover_path, is_cover=True)
-        
-        # Add metadata for Bilibili upload (Always present in JSON)
-        if len(bili_title_full) > 80:
-            bili_title_full = bili_title_full[:80]
-            
-        task["title"] = bili_title_full
-        task["desc"] = ""
-        task["tags"] = "英语听力,英语学习,PodCast,English"
-        task["tid"] = 181 # Knowledge default (知识区)
-        task["copyright"] = 2 # 1=Original,2=Cover
-        task["source"] = "https://open.spotify.com/show/571TfkIrKfbMXse360yYfT?si=f40497ceb21e42e8"   
-        task["bili_cover_path"] = bili_cover_path
-        
-        tasks.append(task)
-        print(f"[OK] Processed: {audio_file.name} (Title: {task['title']})")
-
-    return tasks
 
 def main():
     parser = argparse.ArgumentParser(description="Scan directory for audio tasks")
     parser.add_argument("directory", nargs="?", default="../PodCast", help="Directory to scan")
-    parser.add_argument("--output", "-o", default="tasks.json", help="Output JSON file")
-    
+    parser.add_argument("--output", "-o", default="tasks.jsonl",
+                        help="Output manifest (.jsonl streams one task per line; .json writes the legacy array)")
+    parser.add_argument("--defer-images", action="store_true",
+                        help="Skip image generation; render/upload create missing images on demand")
+    parser.add_argument("--no-probe", action="store_true", help="Skip probing audio duration/codec/bitrate")
+
     args = parser.parse_args()
-    
-    tasks = scan_directory(args.directory)
-    
-    if tasks:
-        with open(args.output, 'w', encoding='utf-8') as f:
-            json.dump(tasks, f, indent=4, ensure_ascii=False)
-        print(f"\nSuccessfully generated {len(tasks)} tasks in '{args.output}'")
+
+    count = write_manifest(args.directory, args.output,
+                           defer_images=args.defer_images, probe=not args.no_probe)
+
+    if count:
+        print(f"\nSuccessfully generated {count} tasks in '{args.output}'")
     else:
         print("\nNo tasks found.")
 
@@ -0,0 +1,77 @@
+"""
+Ordering and completion-time prediction for pending karaoke tasks.
+
+Policies:
+  lpt      — longest audio first (minimises makespan across several workers)
+  priority — highest `priority` first, then longest first
+  deadline — earliest `deadline` first, then longest first
+  fifo     — database order (the previous behaviour)
+"""
+
+import datetime
+import heapq
+
+POLICIES = ("lpt", "priority", "deadline", "fifo")
+
+# Processing seconds per second of audio (transcribe + ASS + render) on CPU with the base model
+DEFAULT_RTF = 0.6
+# Fixed per-task overhead in seconds (model warm-up, FFmpeg start-up, DB updates)
+TASK_OVERHEAD = 5.0
+
+
+def _duration(task, fallback):
+    duration = getattr(task, "duration", None)
+    return duration if duration is not None else fallback
+
+
+def estimate_seconds(task, rtf=DEFAULT_RTF, fallback_duration=0.0):
+    return _duration(task, fallback_duration) * rtf + TASK_OVERHEAD
+
+
+def order_tasks(tasks, policy="lpt"):
+    """Returns tasks in the order they should be processed."""
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown scheduling policy '{policy}' (choose from {', '.join(POLICIES)})")
+    tasks = list(tasks)
+    if policy == "fifo":
+        return tasks
+
+    # Unprobed tasks are treated as average length rather than as zero
+    known = [t.duration for t in tasks if getattr(t, "duration", None) is not None]
+    fallback = sum(known) / len(known) if known else 0.0
+    longest_first = lambda t: -_duration(t, fallback)
+
+    if policy == "lpt":
+        key = longest_first
+    elif policy == "priority":
+        key = lambda t: (-(getattr(t, "priority", None) or 0), longest_first(t))
+    else:
+        far_future = datetime.datetime.max
+        key = lambda t: (getattr(t, "deadline", None) or far_future, longest_first(t))
+    return sorted(tasks, key=key)
+
+
+def predict_makespan(tasks, workers=1, rtf=DEFAULT_RTF):
+    """Simulates list scheduling of `tasks` (in the given order) on `workers` workers.
+
+    Each task goes to the worker that frees up first. Returns the predicted
+    number of seconds until the last task finishes.
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return 0.0
+    known = [t.duration for t in tasks if getattr(t, "duration", None) is not None]
+    fallback = sum(known) / len(known) if known else 0.0
+
+    finish_times = [0.0] * max(1, workers)
+    for task in tasks:
+        start = heapq.heappop(finish_times)
+        heapq.heappush(finish_times, start + estimate_seconds(task, rtf, fallback))
+    return max(finish_times)
+
+
+def format_eta(seconds):
+    finish = datetime.datetime.now() + datetime.timedelta(seconds=seconds)
+    h, rem = divmod(int(seconds), 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}h{m:02}m{s:02}s (around {finish:%Y-%m-%d %H:%M})"
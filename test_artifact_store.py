@@ -0,0 +1,112 @@
+import os
+import time
+
+import pytest
+
+from artifact_store import ArtifactStore, atomic_path, write_text
+
+
+class FakeJobs:
+    def __init__(self, refs=None):
+        self.refs = refs or {}
+
+    def artifact_refs(self):
+        return self.refs
+
+
+def make_group(root, stem, size, age):
+    """Writes stem.{txt,ass,mp4} (size bytes in the mp4), last used `age` seconds ago."""
+    stamp = time.time() - age
+    for ext, n in ((".txt", 10), (".ass", 10), (".mp4", size)):
+        path = os.path.join(root, stem + ext)
+        with open(path, "wb") as f:
+            f.write(b"x" * n)
+        os.utime(path, (stamp, stamp))
+    return os.path.join(root, stem + ".mp4")
+
+
+def test_atomic_write_leaves_nothing_on_failure(tmp_path):
+    target = tmp_path / "ep.mp4"
+    with pytest.raises(RuntimeError):
+        with atomic_path(str(target)) as tmp:
+            assert tmp.endswith(".mp4")
+            with open(tmp, "wb") as f:
+                f.write(b"half")
+            raise RuntimeError("encoder crashed")
+    assert os.listdir(tmp_path) == []
+
+    write_text(str(tmp_path / "ep.txt"), "hello")
+    assert os.listdir(tmp_path) == ["ep.txt"]
+    assert (tmp_path / "ep.txt").read_text(encoding="utf-8") == "hello"
+
+
+def test_finished_files_get_default_permissions(tmp_path):
+    write_text(str(tmp_path / "ep.txt"), "hello")
+    with open(tmp_path / "plain.txt", "w") as f:
+        f.write("hello")
+    assert os.stat(tmp_path / "ep.txt").st_mode == os.stat(tmp_path / "plain.txt").st_mode
+
+
+def test_collect_evicts_least_recently_used_groups(tmp_path):
+    root = str(tmp_path)
+    oldest = make_group(root, "a_1", 1000, age=300)
+    middle = make_group(root, "b_2", 1000, age=200)
+    newest = make_group(root, "c_3", 1000, age=100)
+    store = ArtifactStore(root, budget_bytes=2500, low_water=0.95)
+
+    ArtifactStore(root).touch(oldest)  # used again: now the newest
+    deleted = store.collect()
+
+    assert {os.path.basename(p) for p in deleted} == {"b_2.txt", "b_2.ass", "b_2.mp4"}
+    assert os.path.exists(oldest) and os.path.exists(newest) and not os.path.exists(middle)
+    assert store.usage() <= 2500 and store.evicted_groups == 1
+
+
+def test_pinned_and_held_groups_are_kept(tmp_path):
+    root = str(tmp_path)
+    needed = make_group(root, "a_1", 1000, age=300)
+    in_progress = make_group(root, "b_2", 1000, age=200)
+    spare = make_group(root, "c_3", 1000, age=100)
+    store = ArtifactStore(root, budget_bytes=1500, job_manager=FakeJobs({needed: 1}))
+
+    with store.hold(in_progress):
+        store.collect()
+    assert os.path.exists(needed) and os.path.exists(in_progress)
+    assert not os.path.exists(spare)
+
+    assert ArtifactStore(root, budget_bytes=10 ** 6).collect() == []
+
+
+def test_sweep_removes_only_stale_temporaries(tmp_path):
+    root = str(tmp_path)
+    store = ArtifactStore(root)
+    path = str(tmp_path / "ep.mp4")
+    stale = store.path(".ep.partial-old.mp4")
+    fresh = store.path(".ep.partial-new.mp4")
+    for p in (stale, fresh, path):
+        open(p, "wb").close()
+    os.utime(stale, (time.time() - 7 * 3600,) * 2)
+
+    assert store.sweep_temporaries() == 1
+    assert sorted(os.listdir(root)) == sorted([os.path.basename(fresh), "ep.mp4"])
+    # Temporaries never count towards usage or get grouped with finished files
+    assert store.usage() == 0
+
+
+def test_reused_output_survives_collection(tmp_path):
+    pytest.importorskip("sqlalchemy")
+    from job_store import JobManager
+
+    root = str(tmp_path / "output")
+    os.makedirs(root)
+    reused = make_group(root, "a_1", 1000, age=300)
+    idle = make_group(root, "b_2", 1000, age=200)
+    make_group(root, "c_3", 1000, age=100)
+    jobs = JobManager(f"sqlite:///{tmp_path / 'jobs.db'}")
+    task_id = jobs.add_task(str(tmp_path / "ep.mp3"), "bg.png")
+    jobs.update_status(task_id, "uploaded", output_path=reused)
+
+    # A re-run (or a duplicate of the episode) looks the video up again
+    assert jobs.find_output(str(tmp_path / "ep.mp3")) == reused
+    ArtifactStore(root, budget_bytes=2500, job_manager=jobs).collect()
+    assert os.path.exists(reused) and not os.path.exists(idle)
@@ -0,0 +1,71 @@
+import json
+
+from autotune import (candidate_grid, load_profile, pick_best, pick_best_per_workers, save_profile,
+                      word_agreement)
+
+
+def test_candidate_grid_fits_cores():
+    grid = candidate_grid(6, compute_types=("int8",), beam_sizes=(1,))
+    assert {c["cpu_threads"] for c in grid} == {1, 2, 4, 6}
+    assert all(c["cpu_threads"] * c["num_workers"] <= 6 for c in grid)
+    assert {"compute_type": "int8", "cpu_threads": 2, "num_workers": 2, "beam_size": 1} in grid
+
+
+def test_word_agreement():
+    assert word_agreement("Hello world", "hello world") == 1.0
+    assert word_agreement("", "") == 1.0
+    assert 0.5 < word_agreement("the quick brown fox", "the quick brown box") < 1.0
+
+
+def test_pick_best_respects_memory_and_accuracy():
+    results = [
+        {"rtf": 0.30, "peak_memory_mb": 900, "agreement": 1.0},
+        {"rtf": 0.10, "peak_memory_mb": 3000, "agreement": 0.99},   # too much memory
+        {"rtf": 0.12, "peak_memory_mb": 800, "agreement": 0.80},    # too inaccurate
+        {"rtf": 0.20, "peak_memory_mb": 1000, "agreement": 0.97},
+        {"error": "timeout"},
+    ]
+    assert pick_best(results, max_memory_mb=2000)["rtf"] == 0.20
+    assert pick_best(results, max_memory_mb=100) is None
+    # No agreement score means no reference transcript to check against
+    assert pick_best([{"rtf": 0.05, "peak_memory_mb": 500}]) is None
+
+
+def test_best_is_picked_per_worker_count():
+    results = [
+        {"num_workers": 1, "cpu_threads": 8, "rtf": 0.20, "peak_memory_mb": 900, "agreement": 1.0},
+        {"num_workers": 1, "cpu_threads": 2, "rtf": 0.40, "peak_memory_mb": 900, "agreement": 1.0},
+        {"num_workers": 4, "cpu_threads": 2, "rtf": 0.08, "peak_memory_mb": 1500, "agreement": 0.99},
+        {"num_workers": 4, "cpu_threads": 1, "rtf": 0.05, "peak_memory_mb": 1500, "agreement": 0.50},
+        {"num_workers": 2, "error": "timeout"},
+    ]
+    best = pick_best_per_workers(results)
+    assert sorted(best) == [1, 4]
+    assert best[1]["cpu_threads"] == 8 and best[4]["cpu_threads"] == 2
+
+
+def test_profile_round_trip(tmp_path):
+    path = str(tmp_path / "profiles.json")
+    assert load_profile("base", path=path) == {}
+    save_profile("base", {"compute_type": "int8", "cpu_threads": 8, "num_workers": 1, "beam_size": 1, "rtf": 0.1},
+                 path=path, host="worker-1")
+    save_profile("base", {"compute_type": "int8", "cpu_threads": 2, "num_workers": 4, "beam_size": 1, "rtf": 0.05},
+                 path=path, host="worker-1")
+    assert load_profile("base", path=path, host="worker-1") == {
+        "compute_type": "int8", "cpu_threads": 8, "num_workers": 1, "beam_size": 1}
+    assert load_profile("base", 4, path=path, host="worker-1")["cpu_threads"] == 2
+    assert load_profile("base", 2, path=path, host="worker-1") == {}
+    assert load_profile("base", path=path, host="worker-2") == {}
+    assert load_profile("medium", path=path, host="worker-1") == {}
+
+
+def test_single_profile_from_older_tune_applies_to_its_worker_count(tmp_path):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps({"worker-1": {"base": {"compute_type": "int8", "cpu_threads": 2, "num_workers": 4,
+                                                      "beam_size": 1}}}))
+    assert load_profile("base", 1, path=str(path), host="worker-1") == {}
+    assert load_profile("base", 4, path=str(path), host="worker-1")["cpu_threads"] == 2
+
+    save_profile("base", {"compute_type": "int8", "cpu_threads": 8, "num_workers": 1, "beam_size": 1},
+                 path=str(path), host="worker-1")
+    assert load_profile("base", 1, path=str(path), host="worker-1")["cpu_threads"] == 8
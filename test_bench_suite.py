@@ -0,0 +1,81 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+
+import pytest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from bench_suite import compare, previous_run  # noqa: E402
+from fixtures import FakeTranscriber, build_library, wav_duration, write_wav  # noqa: E402
+from fingerprint import quick_fingerprint  # noqa: E402
+from mock_bili_server import MockState, start_server  # noqa: E402
+from scan_tasks import scan_directory  # noqa: E402
+
+
+def test_wav_fixture_and_fake_transcript(tmp_path):
+    path = write_wav(str(tmp_path / "ep.wav"), 3.0)
+    assert wav_duration(path) == 3.0
+
+    fake = FakeTranscriber()
+    first, second = fake.transcribe(path), fake.transcribe(path)
+    assert first == second
+    words = [w for s in first for w in s.words]
+    assert words[0].start == 0.0 and words[-1].end <= 3.0
+    assert all(a.end <= b.start for a, b in zip(words, words[1:]))
+    assert first[0].text == "".join(w.word for w in first[0].words)
+
+
+def test_library_is_scannable(tmp_path):
+    audio = build_library(str(tmp_path), shows=2, episodes_per_show=3, seconds=0.5)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tasks = scan_directory(str(tmp_path), probe=False, defer_images=True)
+    assert sorted(t["audio_path"] for t in tasks) == sorted(audio)
+    assert all(os.path.exists(t["image_path"]) and os.path.exists(t["bili_cover_path"]) for t in tasks)
+    # Distinct content, or the job store would file the copies as duplicates
+    assert len({quick_fingerprint(path) for path in audio}) == len(audio)
+
+
+def test_regressions_respect_metric_direction():
+    old = {"scan": {"seconds": 1.0, "episodes_per_s": 1000, "episodes": 10},
+           "render": {"upload_speed": 50.0, "upload_bytes": 100}}
+    new = {"scan": {"seconds": 1.5, "episodes_per_s": 1100, "episodes": 20},
+           "render": {"upload_speed": 30.0, "upload_bytes": 500}}
+    flagged = {(name, metric) for name, metric, *_ in compare(old, new, threshold=0.2)}
+    assert flagged == {("scan", "seconds"), ("render", "upload_speed")}
+    assert compare(None, new, 0.2) == []
+
+
+def test_previous_run_matches_host_and_size():
+    history = [{"host": "a", "size": "small", "transcriber": "fake", "id": 1},
+               {"host": "b", "size": "small", "transcriber": "fake", "id": 2},
+               {"host": "a", "size": "large", "transcriber": "fake", "id": 3}]
+    assert previous_run(history, {"host": "a", "size": "small", "transcriber": "fake"})["id"] == 1
+    assert previous_run(history, {"host": "c", "size": "small", "transcriber": "fake"}) is None
+
+
+def test_mock_upos_refuses_to_complete_with_missing_chunks():
+    server, base = start_server(MockState())
+
+    def call(method, path, data=b""):
+        request = urllib.request.Request(base + path, data=data, method=method)
+        with urllib.request.urlopen(request) as resp:
+            return resp.read()
+
+    try:
+        upload_id = json.loads(call("POST", "/ugcfr/mock/ep.mp4?uploads"))["upload_id"]
+        parts = json.dumps({"parts": [{"partNumber": n, "eTag": "etag"} for n in (1, 2)]}).encode()
+        call("PUT", f"/ugcfr/mock/ep.mp4?uploadId={upload_id}&partNumber=1&total=15", b"x" * 10)
+        with pytest.raises(urllib.error.HTTPError) as missing:
+            call("POST", f"/ugcfr/mock/ep.mp4?uploadId={upload_id}", parts)
+        assert missing.value.code == 400
+
+        call("PUT", f"/ugcfr/mock/ep.mp4?uploadId={upload_id}&partNumber=2&total=15", b"x" * 5)
+        assert json.loads(call("POST", f"/ugcfr/mock/ep.mp4?uploadId={upload_id}", parts))["OK"] == 1
+    finally:
+        server.shutdown()
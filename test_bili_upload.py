@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("PIL")
+
+from bili_upload import prepare_upload  # noqa: E402
+from job_store import JobManager  # noqa: E402
+
+
+def test_mirrored_audio_is_uploaded_once(tmp_path):
+    jobs = JobManager(f"sqlite:///{tmp_path / 'jobs.db'}")
+    tasks = []
+    for show in ("Show A", "Show B"):
+        folder = tmp_path / show
+        folder.mkdir()
+        (folder / "ep.mp3").write_bytes(b"the same episode")
+        (folder / "cover_Ep1.jpg").write_bytes(b"jpg")
+        tasks.append({"title": f"{show} Ep. 1", "audio_path": str(folder / "ep.mp3"),
+                      "image_path": str(folder / "cover_Ep1.jpg"), "bili_cover_path": str(folder / "cover_Ep1.jpg")})
+        jobs.add_task(tasks[-1]["audio_path"], tasks[-1]["image_path"])
+
+    canonical = jobs.get_canonical_task(tasks[1]["audio_path"])
+    assert jobs.get_task(tasks[1]["audio_path"]).status == "duplicate"
+    video = tmp_path / "ep.mp4"
+    video.write_bytes(b"video")
+    jobs.update_status(canonical.id, "completed", output_path=str(video))
+
+    # Both copies resolve to the canonical task's video and ledger
+    in_flight = set()
+    first = prepare_upload(jobs, tasks[0], in_flight=in_flight)
+    assert first["video_path"] == str(video) and first["ledger"].task_id == canonical.id
+    in_flight.add(first["ledger"].task_id)
+    assert prepare_upload(jobs, tasks[1], in_flight=in_flight) is None
+
+    jobs.mark_uploaded(canonical.id, "BV1xx")
+    assert prepare_upload(jobs, tasks[1]) is None
+    assert os.path.exists(video)
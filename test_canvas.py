@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from PIL import Image  # noqa: E402
+
+from generate_images import CANVAS, ImageGenerator, ImagePool, ensure_task_images, normalize_background  # noqa: E402
+
+
+def make_image(path, size, mode="RGB", color=(200, 30, 30)):
+    Image.new(mode, size, color if mode == "RGB" else color + (255,)).save(path)
+    return str(path)
+
+
+def test_matching_background_is_used_as_is(tmp_path):
+    path = make_image(tmp_path / "bg.png", CANVAS)
+    assert normalize_background(path, cache_dir=str(tmp_path / "cache")) == path
+    assert not os.path.exists(tmp_path / "cache")
+
+
+@pytest.mark.parametrize("mode", ["fit", "fill"])
+def test_large_cover_is_resized_to_the_canvas(tmp_path, mode):
+    path = make_image(tmp_path / "cover.png", (4000, 4000), mode="RGBA")
+    out = normalize_background(path, mode=mode, cache_dir=str(tmp_path / "cache"))
+    with Image.open(out) as img:
+        assert img.size == CANVAS and img.mode == "RGB"
+        corner = img.getpixel((0, 0))
+    # Letterboxing pads the sides; cropping keeps artwork edge to edge
+    assert corner == ((0, 0, 0) if mode == "fit" else (200, 30, 30))
+
+
+def test_same_content_shares_one_cached_copy(tmp_path):
+    cache = str(tmp_path / "cache")
+    first = normalize_background(make_image(tmp_path / "a.jpg", (801, 601)), cache_dir=cache)
+    second = normalize_background(make_image(tmp_path / "b.jpg", (801, 601)), cache_dir=cache)
+    assert first == second and os.listdir(cache) == [os.path.basename(first)]
+
+
+def test_odd_canvas_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        normalize_background(make_image(tmp_path / "bg.png", (10, 10)), canvas=(1919, 1080))
+
+
+def test_image_pool_forgets_collected_jobs(tmp_path):
+    with ImagePool(max_workers=1) as pool:
+        pool.submit("Episode 1", str(tmp_path / "bg.jpg"))
+        assert pool.submit("Episode 1", str(tmp_path / "bg.jpg")) is pool._futures[str(tmp_path / "bg.jpg")]
+        assert pool.wait() == 0
+        assert pool._futures == {}
+        pool.submit("Broken", str(tmp_path / "missing" / "bg.jpg"))
+        assert pool.wait() == 1
+        assert pool.wait() == 0
+    assert os.path.exists(tmp_path / "bg.jpg")
+
+
+def test_ensure_task_images_reuses_the_callers_pool(tmp_path):
+    tasks = [{"title": f"Episode {i}", "bili_cover_path": str(tmp_path / f"cover_{i}.jpg")} for i in range(2)]
+    with ImagePool(max_workers=1) as pool:
+        assert ensure_task_images(tasks[:1], covers=True, pool=pool) == 0
+        executor = pool._executor
+        assert ensure_task_images(tasks, covers=True, pool=pool) == 0
+        assert pool._executor is executor and pool._futures == {}
+    assert all(os.path.exists(t["bili_cover_path"]) for t in tasks)
+
+
+def test_generate_many_decodes_each_template_once(tmp_path, monkeypatch):
+    background = make_image(tmp_path / "background_base.png", (640, 360))
+    cover = make_image(tmp_path / "cover_base.png", (360, 360))
+    opened = []
+    real_open = Image.open
+    monkeypatch.setattr(Image, "open", lambda path, *a, **k: opened.append(path) or real_open(path, *a, **k))
+
+    gen = ImageGenerator(background_base=background, cover_base=cover)
+    jobs = [(f"Episode {i}", str(tmp_path / f"out_{i}.jpg"), i % 2 == 1) for i in range(6)]
+    assert gen.generate_many(jobs + [("Bad", str(tmp_path / "missing" / "x.jpg"), False)]) == [True] * 6 + [False]
+    assert sorted(opened) == sorted([background, cover])
+
+
+def test_fast_jpeg_changes_encoder_options(tmp_path, monkeypatch):
+    background = make_image(tmp_path / "background_base.png", (640, 360))
+    saved = []
+    real_save = Image.Image.save
+    monkeypatch.setattr(Image.Image, "save",
+                        lambda img, path, *a, **k: saved.append(k) or real_save(img, path, *a, **k))
+
+    for fast_jpeg in (False, True):
+        ImageGenerator(background_base=background, fast_jpeg=fast_jpeg).generate_many(
+            [("Episode 1", str(tmp_path / f"out_{fast_jpeg}.jpg"), False)])
+    assert saved == [{"quality": 95}, {"quality": 85, "subsampling": 2, "optimize": False}]
+    assert os.path.getsize(tmp_path / "out_True.jpg") < os.path.getsize(tmp_path / "out_False.jpg")
@@ -0,0 +1,36 @@
+from collections import namedtuple
+
+from cascade import clip_timestamps, flag_segments, merge_ranges, pad_ranges, splice
+
+Segment = namedtuple("Segment", "start end text words avg_logprob no_speech_prob")
+Word = namedtuple("Word", "start end word")
+
+
+def seg(start, end, text, logprob=-0.2, no_speech=0.01):
+    step = (end - start) / max(1, len(text.split()))
+    words = [Word(start + i * step, start + (i + 1) * step, " " + w) for i, w in enumerate(text.split())]
+    return Segment(start, end, " " + text, words, logprob, no_speech)
+
+
+def test_flag_segments():
+    segments = [seg(0, 4, "clear words"), seg(4, 8, "mumbled", logprob=-1.4),
+                seg(8, 12, "ghost text", no_speech=0.9), seg(12, 16, "", no_speech=0.9)]
+    assert flag_segments(segments) == [(4, 8), (8, 12)]
+
+
+def test_ranges_merge_pad_and_clip():
+    assert merge_ranges([(8, 12), (4, 8), (20, 22)]) == [(4, 12), (20, 22)]
+    assert merge_ranges([(0, 1), (1.5, 2)], gap=1.0) == [(0, 2)]
+    assert pad_ranges([(0.5, 3), (4, 9.5)], padding=1, duration=10) == [(0.0, 10)]
+    assert clip_timestamps([(1.0, 2.5), (7, 8)]) == [1.0, 2.5, 7, 8]
+
+
+def test_splice_replaces_only_flagged_words():
+    base = [seg(0, 4, "one two"), seg(4, 8, "bad bad", logprob=-1.5), seg(8, 12, "five six")]
+    flagged = flag_segments(base)
+    # The accurate pass was padded, so it re-decoded the neighbours' edge words as well
+    replacement = [seg(3, 9, "two three four five", logprob=-0.1)]
+
+    merged = splice(base, flagged, replacement)
+    assert [s.text.strip() for s in merged] == ["one two", "three four", "five six"]
+    assert merged[1].start == 4.5 and merged[1].end == 7.5
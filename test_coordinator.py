@@ -0,0 +1,124 @@
+import datetime
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from worker import CoordinatorClient, process_one, run_worker
+
+
+class FakeCoordinator(BaseHTTPRequestHandler):
+    """Minimal stand-in for coordinator.py: one queued task, records what the worker sends."""
+    queue, artifacts, completed, heartbeats = [], {}, [], []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def do_POST(self):
+        payload = json.loads(self._body() or b"{}")
+        if self.path == "/claim":
+            return self._reply(200, self.queue.pop(0)) if self.queue else self._reply(204)
+        if self.path.endswith("/heartbeat"):
+            self.heartbeats.append(payload["worker_id"])
+            return self._reply(200, {})
+        self.completed.append(payload)
+        self._reply(200, {})
+
+    def do_PUT(self):
+        name = self.path.split("/artifacts/")[1].split("?")[0]
+        self.artifacts[name] = self._body()
+        self._reply(200, {"bytes": len(self.artifacts[name])})
+
+
+class FakeGenerator:
+    def run_stages(self, audio_path, image_path, duration=None, output_dir="output", codec=None, bitrate=None):
+        os.makedirs(output_dir, exist_ok=True)
+        paths = {}
+        for kind, ext in (("text", "txt"), ("ass", "ass"), ("video", "mp4")):
+            paths[kind] = os.path.join(output_dir, f"ep.{ext}")
+            with open(paths[kind], "w") as f:
+                f.write(f"{kind} of {os.path.basename(audio_path)}")
+        paths["metrics"] = {"transcribe": {"rerun_ratio": 0.1}}
+        return paths
+
+
+@pytest.fixture
+def coordinator(tmp_path):
+    audio, image = tmp_path / "ep.mp3", tmp_path / "bg.png"
+    audio.write_bytes(b"audio")
+    image.write_bytes(b"image")
+    FakeCoordinator.queue = [{"id": 1, "audio_path": str(audio), "image_path": str(image),
+                              "duration": 60.0, "attempts": 1, "lease_seconds": 0.03}]
+    FakeCoordinator.artifacts, FakeCoordinator.completed, FakeCoordinator.heartbeats = {}, [], []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCoordinator)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_worker_uploads_artifacts_then_completes(coordinator):
+    client = CoordinatorClient(coordinator, "node-a")
+    assert run_worker(client, FakeGenerator(), exit_when_idle=True) == 1
+    assert sorted(FakeCoordinator.artifacts) == ["ep.ass", "ep.mp4", "ep.txt"]
+    assert FakeCoordinator.artifacts["ep.mp4"] == b"video of ep.mp3"
+    assert FakeCoordinator.completed == [{"worker_id": "node-a", "status": "completed", "output": "ep.mp4",
+                                          "error": None, "metrics": {"transcribe": {"rerun_ratio": 0.1}}}]
+
+
+def test_failed_stage_is_reported(coordinator):
+    class Broken:
+        def run_stages(self, *args, **kwargs):
+            raise RuntimeError("ffmpeg exploded")
+
+    client = CoordinatorClient(coordinator, "node-b")
+    assert process_one(client, Broken(), client.claim()) is False
+    assert FakeCoordinator.completed[0]["status"] == "failed"
+    assert "ffmpeg exploded" in FakeCoordinator.completed[0]["error"]
+    assert not FakeCoordinator.artifacts
+
+
+def test_coordinator_leases_and_requeues(tmp_path):
+    pytest.importorskip("sqlalchemy")
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    import metrics
+    from coordinator import create_app
+    from job_store import JobManager
+
+    jobs = JobManager(f"sqlite:///{tmp_path / 'jobs.db'}")
+    for name, duration in (("short", 60), ("long", 600)):
+        # Distinct content, or the job store files the second as a duplicate of the first
+        (tmp_path / f"{name}.mp3").write_bytes(name.encode())
+        jobs.add_task(str(tmp_path / f"{name}.mp3"), "bg.png", duration=duration)
+    with TestClient(create_app(jobs, artifact_dir=str(tmp_path / "artifacts"), lease_seconds=60)) as api:
+        assert jobs in metrics._queues
+
+        first = api.post("/claim", json={"worker_id": "a"}).json()
+        second = api.post("/claim", json={"worker_id": "b"}).json()
+        assert first["audio_path"].endswith("long.mp3") and second["audio_path"].endswith("short.mp3")
+        assert api.post("/claim", json={"worker_id": "c"}).status_code == 204
+        assert api.post(f"/tasks/{first['id']}/heartbeat", json={"worker_id": "b"}).status_code == 409
+
+        api.put(f"/tasks/{first['id']}/artifacts/long.mp4", params={"worker_id": "a"}, content=b"video")
+        done = api.post(f"/tasks/{first['id']}/complete", json={"worker_id": "a", "output": "long.mp4"})
+        assert done.status_code == 200 and os.path.exists(done.json()["output_path"])
+
+        # Worker b goes silent: once its lease lapses the task goes back to the queue
+        assert jobs.requeue_expired(now=datetime.datetime.utcnow() + datetime.timedelta(seconds=120)) == 1
+        assert api.post("/claim", json={"worker_id": "c"}).json()["id"] == second["id"]
+        assert api.get("/status").json() == {"completed": 1, "processing": 1}
+    # Shutting the app down stops its database reporting into the process-wide gauges
+    assert jobs not in metrics._queues
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+from fingerprint import SAMPLE_COUNT, SAMPLE_SIZE, full_hash, quick_fingerprint
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+
+def test_identical_files_share_fingerprint(tmp_path):
+    data = os.urandom(SAMPLE_COUNT * SAMPLE_SIZE * 3)
+    a = write(tmp_path / "a.mp3", data)
+    b = write(tmp_path / "b.mp3", data)
+    assert quick_fingerprint(a) == quick_fingerprint(b)
+    assert full_hash(a) == full_hash(b)
+
+
+def test_unsampled_difference_is_caught_by_full_hash(tmp_path):
+    data = bytearray(os.urandom(SAMPLE_COUNT * SAMPLE_SIZE * 3))
+    a = write(tmp_path / "a.mp3", bytes(data))
+    # Flip a byte just past the first sampled chunk
+    data[SAMPLE_SIZE + 1] ^= 0xFF
+    b = write(tmp_path / "b.mp3", bytes(data))
+    assert quick_fingerprint(a) == quick_fingerprint(b)
+    assert full_hash(a) != full_hash(b)
+
+
+def test_size_is_part_of_fingerprint(tmp_path):
+    a = write(tmp_path / "a.mp3", b"x" * 100)
+    b = write(tmp_path / "b.mp3", b"x" * 101)
+    assert quick_fingerprint(a) != quick_fingerprint(b)
+
+
+def test_duplicate_requeues_a_failed_canonical_task(tmp_path):
+    pytest.importorskip("sqlalchemy")
+    from job_store import JobManager
+
+    jobs = JobManager(f"sqlite:///{tmp_path / 'jobs.db'}")
+    data = os.urandom(4096)
+    original = write(tmp_path / "a.mp3", data)
+    mirror = write(tmp_path / "b.mp3", data)
+    task_id = jobs.add_task(original, "bg.png")
+    jobs.update_status(task_id, "failed", error_msg="ffmpeg exploded")
+
+    # A new copy of the episode retries it...
+    assert jobs.add_task(mirror, "bg.png") == task_id
+    assert jobs.get_task_by_id(task_id).status == "pending"
+
+    # ...and so does re-adding the copy's path
+    jobs.update_status(task_id, "failed", error_msg="ffmpeg exploded")
+    assert jobs.add_task(mirror, "bg.png") == task_id
+    assert jobs.get_task_by_id(task_id).status == "pending"
@@ -0,0 +1,28 @@
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+HEAVY = ("faster_whisper", "ctranslate2", "torch", "crewai", "litellm", "bilibili_api", "sqlalchemy", "PIL", "tqdm")
+
+
+def loaded_after_import(module, cwd=ROOT):
+    code = f"import sys; sys.path.insert(0, {ROOT!r}); import {module}; " \
+           f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True)
+    return [m for m in out.stdout.strip().split(",") if m]
+
+
+@pytest.mark.parametrize("module", ["main", "pipeline", "scan_tasks", "watch_tasks", "batch_run_kgen", "bili_upload",
+                                    "worker"])
+def test_light_entry_points_import_nothing_heavy(module):
+    assert loaded_after_import(module) == []
+
+
+@pytest.mark.skipif(importlib.util.find_spec("sqlalchemy") is None, reason="SQLAlchemy not installed")
+def test_karaoke_gen_defers_whisper_and_output_dir(tmp_path):
+    assert loaded_after_import("karaoke_gen", cwd=str(tmp_path)) == ["sqlalchemy"]
+    assert not (tmp_path / "output").exists()
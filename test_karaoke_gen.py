@@ -0,0 +1,138 @@
+import os
+import shutil
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from fixtures import FakeTranscriber, write_wav  # noqa: E402
+from karaoke_gen import RENDER_PROFILES, KaraokeGenerator, VideoRenderer  # noqa: E402
+from job_store import JobManager  # noqa: E402
+from artifact_store import ArtifactStore  # noqa: E402
+
+
+class FileRenderer:
+    """Writes a placeholder video instead of running FFmpeg."""
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self.calls = []
+
+    def estimated_bytes(self, duration):
+        return self.renderer.estimated_bytes(duration)
+
+    def render(self, audio_path, image_path, ass_path, output_video, **options):
+        self.calls.append(options)
+        with open(output_video, "wb") as f:
+            f.write(b"video")
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # process_task writes to ./output
+    jobs = JobManager(f"sqlite:///{tmp_path / 'jobs.db'}")
+    return KaraokeGenerator(transcriber=FakeTranscriber(), job_manager=jobs,
+                            artifacts=ArtifactStore(str(tmp_path / "output"), job_manager=jobs))
+
+
+def episode(tmp_path):
+    return write_wav(str(tmp_path / "ep.wav"), 3.0), os.path.join(ROOT, "background_base.png")
+
+
+def test_process_task_runs_every_stage(tmp_path, generator):
+    audio, image = episode(tmp_path)
+    generator.renderer = FileRenderer(generator.renderer)
+    task_id = generator.add_task(audio, image, duration=3.0)
+
+    video = generator.process_task(generator.job_manager.get_task_by_id(task_id))
+
+    task = generator.job_manager.get_task_by_id(task_id)
+    assert task.status == "completed", task.error_msg
+    assert task.output_path == video and os.path.exists(video)
+    stem = os.path.splitext(video)[0]
+    assert open(stem + ".ass", encoding="utf-8").read().startswith("[Script Info]")
+    assert open(stem + ".txt", encoding="utf-8").read().strip()
+    assert generator.renderer.calls == [{"threads": None, "audio_codec": None, "audio_bitrate": None}]
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not on PATH")
+def test_run_stages_renders_video(tmp_path, generator):
+    audio, image = episode(tmp_path)
+    outputs = generator.run_stages(audio, image, 3.0, output_dir=str(tmp_path / "output"))
+    assert set(outputs) == {"text", "ass", "video", "metrics"}
+    assert os.path.getsize(outputs["video"]) > 0
+
+
+def test_default_profile_keeps_x264_defaults():
+    renderer = VideoRenderer()
+    assert renderer.video_bitrate_kbps() is None
+    assert renderer.estimated_bytes(600) == 0
+    assert renderer.encode_args() == ["-c:v", "libx264", "-tune", "stillimage",
+                                      "-c:a", "aac", "-b:a", "192k", "-pix_fmt", "yuv420p"]
+
+
+def test_upload_profile_caps_bitrate_to_the_byte_budget():
+    renderer = VideoRenderer("upload")
+    budget = RENDER_PROFILES["upload"]["bytes_per_minute"]
+    # 4 MiB/min is 559 kbit/s in total, 128 of which go to the audio
+    assert renderer.video_bitrate_kbps() == int(budget * 8 / 60 / 1000) - 128 == 431
+    assert renderer.encode_args() == [
+        "-c:v", "libx264", "-tune", "stillimage",
+        "-r", "15", "-g", "150", "-keyint_min", "15",
+        "-crf", "28",
+        "-maxrate", "431k", "-bufsize", "862k",
+        "-c:a", "aac", "-b:a", "128k",
+        "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+    ]
+    args = renderer.encode_args(copy_audio=True)
+    assert args[args.index("-c:a"):args.index("-pix_fmt")] == ["-c:a", "copy"]
+
+
+def test_byte_budget_math():
+    renderer = VideoRenderer("upload", bytes_per_minute=6 * 1000 * 1000)
+    assert renderer.video_bitrate_kbps() == 800 - 128
+    assert renderer.estimated_bytes(90) == 9 * 1000 * 1000
+    # Unknown duration: no estimate
+    assert renderer.estimated_bytes(0) == 0
+    assert renderer.estimated_bytes(None) == 0
+    # A budget too small for the audio still leaves the video a usable floor
+    assert VideoRenderer("upload", bytes_per_minute=1000 * 1000).video_bitrate_kbps() == 200
+    # The override does not leak into the shared profile table
+    assert RENDER_PROFILES["upload"]["bytes_per_minute"] == 4 * 1024 * 1024
+
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        VideoRenderer("archive")
+
+
+@pytest.mark.parametrize("tuned, threads", [({"cpu_threads": 2, "num_workers": 4}, 2), ({}, 4)])
+def test_tuned_threads_win_over_the_even_split(tmp_path, monkeypatch, tuned, threads):
+    import autotune
+    import resources
+
+    built = []
+    monkeypatch.setitem(sys.modules, "faster_whisper",
+                        types.SimpleNamespace(WhisperModel=lambda model, **kwargs: built.append(kwargs)))
+    lookups = []
+    monkeypatch.setattr(autotune, "load_profile", lambda model, num_workers=1: lookups.append(num_workers) or tuned)
+
+    gen = KaraokeGenerator(workers=4, resource_manager=resources.ResourceManager(cpus=16, memory_mb=64000),
+                           job_manager=JobManager(f"sqlite:///{tmp_path / 'jobs.db'}"))
+    assert lookups == [4]
+    assert built == [{"device": "cpu", "compute_type": "int8", "cpu_threads": threads, "num_workers": 4}]
+    # Admission control reserves the threads the model really runs
+    assert gen.transcriber.cpu_threads == threads
+
+
+@pytest.mark.parametrize("profile, limit", [("default", 192000), ("upload", 128000)])
+def test_aac_is_copied_only_within_the_profile_bitrate(profile, limit):
+    renderer = VideoRenderer(profile)
+    assert renderer.can_copy_audio("aac", limit)
+    assert not renderer.can_copy_audio("aac", limit + 1000)
+    assert not renderer.can_copy_audio("aac", None)  # unknown bitrate: re-encode to be safe
+    assert not renderer.can_copy_audio("mp3", 64000)
@@ -0,0 +1,86 @@
+import json
+import threading
+import time
+
+import pytest
+
+from manifest import ManifestWriter, iter_manifest
+
+
+def test_jsonl_round_trip(tmp_path):
+    path = str(tmp_path / "tasks.jsonl")
+    records = [{"audio_path": f"/a/{i}.mp3", "title": f"标题 {i}"} for i in range(3)]
+    with ManifestWriter(path) as writer:
+        for record in records:
+            writer.write(record)
+    assert list(iter_manifest(path)) == records
+
+
+def test_legacy_json_array(tmp_path):
+    records = [{"audio_path": "/a/1.mp3"}, {"audio_path": "/a/2.mp3"}]
+    path = str(tmp_path / "tasks.json")
+    with ManifestWriter(path) as writer:
+        for record in records:
+            writer.write(record)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == records
+    assert list(iter_manifest(path)) == records
+
+
+def test_follow_reads_records_while_writing(tmp_path):
+    path = str(tmp_path / "tasks.jsonl")
+    seen = []
+
+    def consume():
+        for record in iter_manifest(path, follow=True, poll_interval=0.01):
+            seen.append((record["n"], time.monotonic()))
+
+    reader = threading.Thread(target=consume)
+    reader.start()
+    with ManifestWriter(path) as writer:
+        writer.write({"n": 0})
+        time.sleep(0.2)
+        first_written_at = time.monotonic()
+        writer.write({"n": 1})
+    reader.join(timeout=5)
+
+    assert [n for n, _ in seen] == [0, 1]
+    # The first record was consumed before the writer finished
+    assert seen[0][1] < first_written_at
+
+
+def test_failed_writer_does_not_mark_manifest_complete(tmp_path):
+    path = str(tmp_path / "tasks.jsonl")
+    with pytest.raises(OSError):
+        with ManifestWriter(path) as writer:
+            writer.write({"n": 0})
+            raise OSError("disk went away mid-scan")
+    # A reader must not mistake the partial list for the whole scan
+    with pytest.raises(RuntimeError, match="after 1 record"):
+        list(iter_manifest(path))
+
+    legacy = str(tmp_path / "tasks.json")
+    with pytest.raises(OSError):
+        with ManifestWriter(legacy) as writer:
+            writer.write({"n": 0})
+            raise OSError
+    with pytest.raises(ValueError):
+        list(iter_manifest(legacy))
+
+
+def test_watch_mode_appends_after_a_finished_scan(tmp_path):
+    from scan_tasks import write_manifest
+
+    show = tmp_path / "Show"
+    show.mkdir()
+    for name in ("Show Ep. 1.mp3", "Show Ep. 1.jpg", "cover_Ep1.jpeg"):
+        (show / name).write_bytes(b"")
+    path = str(tmp_path / "tasks.jsonl")
+    assert write_manifest(str(tmp_path), path, probe=False, defer_images=True) == 1
+
+    with ManifestWriter(path, append=True) as writer:
+        writer.write({"audio_path": "/new/Show Ep. 2.mp3"})
+    assert [r["audio_path"] for r in iter_manifest(path)] == [str(show / "Show Ep. 1.mp3"), "/new/Show Ep. 2.mp3"]
+
+    with pytest.raises(ValueError):
+        ManifestWriter(str(tmp_path / "tasks.json"), append=True)
@@ -0,0 +1,63 @@
+import json
+import urllib.request
+from functools import lru_cache
+
+import pytest
+
+import metrics
+
+
+def test_histogram_exposition_is_cumulative():
+    hist = metrics.Histogram("test_seconds", "Test histogram", (1, 5))
+    for value in (0.5, 2, 2, 30):
+        hist.observe(value, stage="render")
+    lines = [f"{name}{metrics._format_labels(key)} {metrics._format_value(v)}" for name, key, v in hist.samples()]
+    assert lines == [
+        'streamfluent_test_seconds_bucket{stage="render",le="1"} 1',
+        'streamfluent_test_seconds_bucket{stage="render",le="5"} 3',
+        'streamfluent_test_seconds_bucket{stage="render",le="+Inf"} 4',
+        'streamfluent_test_seconds_sum{stage="render"} 34.5',
+        'streamfluent_test_seconds_count{stage="render"} 4',
+    ]
+    assert hist.mean(stage="render") == 8.625
+
+
+def test_track_counts_in_flight_and_failures():
+    with metrics.track("unit"):
+        assert metrics.STAGE_IN_FLIGHT.value(stage="unit") == 1
+    with pytest.raises(ValueError):
+        with metrics.track("unit"):
+            raise ValueError
+    assert metrics.STAGE_IN_FLIGHT.value(stage="unit") == 0
+    assert metrics.STAGE_SECONDS.count(stage="unit") == 2
+    assert metrics.STAGE_FAILURES.value(stage="unit") == 1
+    assert metrics.status()["stages"]["unit"]["failed"] == 1
+
+
+def test_endpoint_serves_queue_depth_and_cache_hits():
+    @lru_cache(maxsize=8)
+    def square(x):
+        return x * x
+
+    for x in (1, 1, 1, 2):
+        square(x)
+    metrics.register_cache("square", square)
+
+    class Jobs:
+        def status_counts(self):
+            return {"pending": 3, "completed": 5}
+
+    jobs = Jobs()
+    server = metrics.serve(0, host="127.0.0.1", job_manager=jobs)
+    try:
+        base = f"http://127.0.0.1:{server.server_port}"
+        text = urllib.request.urlopen(base + "/metrics").read().decode()
+        assert 'streamfluent_tasks{status="pending"} 3' in text
+        assert 'streamfluent_cache_hit_ratio{cache="square"} 0.5' in text
+        assert "# TYPE streamfluent_stage_duration_seconds histogram" in text
+        status = json.loads(urllib.request.urlopen(base + "/status").read())
+        assert status["tasks"] == {"completed": 5, "pending": 3}
+    finally:
+        server.shutdown()
+        metrics.unwatch_queue(jobs)
+        metrics.unregister_cache("square")
@@ -0,0 +1,58 @@
+import os
+import sys
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+from fixtures import FakeTranscriber, write_wav  # noqa: E402
+from pcm_cache import SAMPLE_RATE, PCMCache  # noqa: E402
+
+
+def test_wav_decodes_to_float_samples_without_ffmpeg(tmp_path):
+    wav = write_wav(str(tmp_path / "ep.wav"), 2.0)
+    cache = PCMCache(root=str(tmp_path / "pcm"))
+    with cache.open(wav) as pcm:
+        assert isinstance(pcm, np.memmap) and pcm.dtype == np.float32
+        assert len(pcm) == 2 * SAMPLE_RATE
+        assert 0 < np.abs(pcm).max() <= 1.0
+        assert FakeTranscriber().transcribe(wav, audio=pcm) == FakeTranscriber().transcribe(wav)
+    # Last user gone: the decoded file goes with it
+    assert os.listdir(tmp_path / "pcm") == []
+
+
+def test_concurrent_users_share_one_decode(tmp_path):
+    wav = write_wav(str(tmp_path / "ep.wav"), 1.0)
+    cache = PCMCache(root=str(tmp_path / "pcm"))
+    ready, release = threading.Barrier(3), threading.Event()
+    files = []
+
+    def consumer():
+        with cache.open(wav) as pcm:
+            files.append(pcm.filename)
+            ready.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=consumer) for _ in range(3)]
+    for t in threads:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join()
+    assert cache.decodes == 1 and cache.hits == 2
+    assert len(set(files)) == 1 and not os.path.exists(files[0])
+
+
+def test_keep_and_sweep(tmp_path):
+    wav = write_wav(str(tmp_path / "ep.wav"), 0.5)
+    cache = PCMCache(root=str(tmp_path / "pcm"), keep=True)
+    with cache.open(wav):
+        pass
+    path = cache.path_for(wav)
+    assert os.path.exists(path)
+    assert cache.sweep() == 0
+    os.utime(path, (0, 0))
+    assert cache.sweep() == 1 and not os.path.exists(path)
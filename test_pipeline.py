@@ -0,0 +1,109 @@
+import json
+import os
+import subprocess
+import sys
+
+import pipeline
+from pipeline import EXIT_FAILED, EXIT_OK, EXIT_PARTIAL, StageResult, exit_code
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "w").close()
+
+
+def test_exit_code():
+    ok = StageResult("scan", True, "", {"tasks": 2})
+    assert exit_code([ok]) == EXIT_OK
+    assert exit_code([ok, StageResult("produce", True, "", {"failed": 1})]) == EXIT_PARTIAL
+    assert exit_code([ok, StageResult("produce", False, "boom")]) == EXIT_FAILED
+
+
+def test_scan_stage_writes_manifest(tmp_path):
+    touch(str(tmp_path / "Show" / "Show Ep. 1.mp3"))
+    touch(str(tmp_path / "Show" / "Show Ep. 1.png"))
+    touch(str(tmp_path / "Show" / "cover.jpg"))
+    output = str(tmp_path / "tasks.jsonl")
+
+    result = pipeline.scan(str(tmp_path / "Show"), output, defer_images=True)
+    assert result.ok and result.counts == {"tasks": 1}
+    assert json.loads(open(output).readline())["audio_path"].endswith("Show Ep. 1.mp3")
+
+
+def test_pipeline_stops_after_empty_scan(tmp_path):
+    results = pipeline.run_pipeline(str(tmp_path), str(tmp_path / "tasks.jsonl"))
+    assert [r.stage for r in results] == ["scan"]
+    assert exit_code(results) == EXIT_OK
+
+
+def test_failures_become_results(tmp_path):
+    missing = pipeline.scan(str(tmp_path / "nope"), str(tmp_path / "tasks.jsonl"))
+    assert not missing.ok and "not found" in missing.message
+    no_login = pipeline.publish(str(tmp_path / "tasks.jsonl"), credential_file=str(tmp_path / "bili_sess.json"))
+    assert not no_login.ok and "--login" in no_login.message
+
+
+def test_direct_mode_does_not_import_crewai():
+    code = "import sys, main, pipeline; print('crewai' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert out.stdout.strip() == "False"
+
+
+class _Row:
+    def __init__(self, id, audio_path, image_path):
+        self.id, self.audio_path, self.image_path, self.status = id, audio_path, image_path, "pending"
+
+
+class _FakeGenerator:
+    """Stands in for KaraokeGenerator: records when each episode is rendered."""
+
+    def __init__(self, events, manifest):
+        self.events = events
+        self.manifest = manifest
+        self.rows = {}
+        self.job_manager = self
+
+    def add_task(self, audio, image, **metadata):
+        row = self.rows.setdefault(audio, _Row(len(self.rows) + 1, audio, image))
+        return row.id
+
+    def get_task(self, audio):
+        return self.rows.get(audio)
+
+    def find_output(self, audio):
+        return None
+
+    def process_task(self, row):
+        # How far the scanner had got when this episode started rendering
+        with open(self.manifest) as f:
+            self.events.append(sum(1 for _ in f))
+        row.status = "completed"
+        return row.audio_path + ".mp4"
+
+
+def test_streaming_renders_before_scan_finishes(tmp_path):
+    show = tmp_path / "Show"
+    for n in range(1, 6):
+        touch(str(show / f"Show Ep. {n}.mp3"))
+        touch(str(show / f"Show Ep. {n}.png"))
+    touch(str(show / "cover.jpg"))
+    events = []
+    manifest = str(tmp_path / "tasks.jsonl")
+
+    results = pipeline.run_streaming(str(show), manifest, skip_upload=True, defer_images=True,
+                                     queue_size=1, generator=_FakeGenerator(events, manifest))
+
+    assert [r.stage for r in results] == ["scan", "produce"]
+    assert results[0].counts == {"tasks": 5}
+    assert results[1].counts["completed"] == 5
+    assert exit_code(results) == EXIT_OK
+    assert len(events) == 5
+    # The first episode rendered while the bounded queue was still holding the scanner back
+    assert events[0] < 5
+
+
+def test_streaming_fails_fast_without_login(tmp_path):
+    results = pipeline.run_streaming(str(tmp_path), str(tmp_path / "tasks.jsonl"),
+                                     credential_file=str(tmp_path / "bili_sess.json"))
+    assert [r.stage for r in results] == ["publish"] and not results[0].ok
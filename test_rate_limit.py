@@ -0,0 +1,44 @@
+import asyncio
+
+from rate_limit import AdaptiveTokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_burst_then_refill():
+    clock = FakeClock()
+    bucket = AdaptiveTokenBucket(rate=0.5, capacity=2, clock=clock)
+    assert bucket.delay() == 0
+    asyncio.run(bucket.acquire())
+    asyncio.run(bucket.acquire())
+    assert bucket.delay() == 2.0
+    clock.now += 2.0
+    assert bucket.delay() == 0
+
+
+def test_throttle_backs_off_and_recovers():
+    clock = FakeClock()
+    bucket = AdaptiveTokenBucket(rate=1.0, capacity=1, cooldown=10, increase=0.25, clock=clock)
+    bucket.on_throttle()
+    assert bucket.rate == 0.5
+    # Paused for the cooldown, then a token needs 1 / rate seconds to refill
+    assert bucket.delay() == 10
+    clock.now += 10
+    assert bucket.delay() == 2.0
+    bucket.on_success()
+    bucket.on_success()
+    bucket.on_success()
+    assert bucket.rate == 1.0
+
+
+def test_rate_never_drops_below_minimum():
+    bucket = AdaptiveTokenBucket(rate=0.1, min_rate=0.05, clock=FakeClock())
+    for _ in range(5):
+        bucket.on_throttle()
+    assert bucket.rate == 0.05
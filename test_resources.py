@@ -0,0 +1,49 @@
+import threading
+import time
+
+from resources import Cost, ResourceManager, render_cost, transcribe_cost
+
+
+def test_costs_scale_with_duration_and_threads():
+    short, long = transcribe_cost(60, 4), transcribe_cost(3600, 4)
+    assert long.memory_mb > short.memory_mb
+    assert short.min_threads == short.threads == 4
+    assert render_cost(2).memory_mb < render_cost(8).memory_mb
+    assert render_cost().min_threads == 1
+
+
+def test_grant_shrinks_to_free_threads():
+    rm = ResourceManager(cpus=8, memory_mb=10000, headroom_mb=0)
+    with rm.admit(Cost(threads=6, memory_mb=100)) as first:
+        assert first.threads == 6
+        with rm.admit(Cost(threads=4, memory_mb=100, min_threads=1)) as second:
+            assert second.threads == 2
+            assert rm.free_threads() == 0
+    assert rm.free_threads() == 8
+
+
+def test_oversized_job_runs_when_idle():
+    rm = ResourceManager(cpus=2, memory_mb=500, headroom_mb=0)
+    with rm.admit(Cost(threads=16, memory_mb=5000)) as grant:
+        assert grant.threads == 2
+    assert rm.snapshot()["active_jobs"] == 0
+
+
+def test_reserve_and_memory_blocking():
+    rm = ResourceManager(cpus=8, memory_mb=3000, headroom_mb=0)
+    rm.reserve(1000)
+    assert rm.free_memory_mb() == 2000
+    order = []
+
+    def second():
+        with rm.admit(Cost(threads=1, memory_mb=1500)):
+            order.append("second")
+
+    with rm.admit(Cost(threads=1, memory_mb=1500)):
+        t = threading.Thread(target=second)
+        t.start()
+        time.sleep(0.1)
+        order.append("first done")
+    t.join(timeout=5)
+    assert order == ["first done", "second"]
+    assert rm.snapshot()["admission_waits"] == 1
@@ -0,0 +1,50 @@
+import os
+
+from scan_tasks import extract_episode_num, index_directory, scan_directory
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "w").close()
+
+
+def test_extract_episode_num():
+    assert extract_episode_num("Show Ep. 30.mp3") == 30
+    assert extract_episode_num("cover_Ep7.jpeg") == 7
+    assert extract_episode_num("Title 01") == 1
+    assert extract_episode_num("no number") is None
+
+
+def test_index_matching_strategies(tmp_path):
+    show = tmp_path / "Show"
+    touch(str(show / "Exact Ep. 1.mp3"))
+    touch(str(show / "Exact Ep. 1.png"))
+    touch(str(show / "Other Ep. 2.mp3"))
+    touch(str(show / "bg 2.jpg"))
+    touch(str(show / "cover_Ep2.jpeg"))
+    touch(str(show / "Lonely Ep. 3.mp3"))
+    touch(str(show / "cover.jpg"))
+
+    index = index_directory(str(show))
+    assert index.audio == ["Exact Ep. 1.mp3", "Lonely Ep. 3.mp3", "Other Ep. 2.mp3"]
+    assert index.find_background("Exact Ep. 1.mp3", 1) == str(show / "Exact Ep. 1.png")
+    assert index.find_background("Other Ep. 2.mp3", 2) == str(show / "bg 2.jpg")
+    assert index.find_background("Lonely Ep. 3.mp3", 3) == str(show / "cover.jpg")
+    assert index.find_cover(2) == str(show / "cover_Ep2.jpeg")
+    assert index.find_cover(1) is None
+
+
+def test_scan_directory_recurses(tmp_path):
+    for show in ("A", "B/Nested"):
+        touch(str(tmp_path / show / "Ep5.mp3"))
+        touch(str(tmp_path / show / "Ep5.jpg"))
+        touch(str(tmp_path / show / "cover_Ep5.jpeg"))
+
+    tasks = scan_directory(str(tmp_path))
+    assert [os.path.relpath(t["audio_path"], tmp_path) for t in tasks] == [
+        os.path.join("A", "Ep5.mp3"),
+        os.path.join("B", "Nested", "Ep5.mp3"),
+    ]
+    for t in tasks:
+        assert t["image_path"] == os.path.splitext(t["audio_path"])[0] + ".jpg"
+        assert t["bili_cover_path"] == os.path.join(os.path.dirname(t["audio_path"]), "cover_Ep5.jpeg")
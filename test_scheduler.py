@@ -0,0 +1,34 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import scheduler
+
+
+def make(id, duration, priority=0, deadline=None):
+    return SimpleNamespace(id=id, duration=duration, priority=priority, deadline=deadline)
+
+
+def test_lpt_orders_longest_first_and_unknown_as_average():
+    tasks = [make(1, 600), make(2, None), make(3, 10800), make(4, 60)]
+    assert [t.id for t in scheduler.order_tasks(tasks, "lpt")] == [3, 2, 1, 4]
+
+
+def test_priority_and_deadline_policies():
+    soon = datetime.datetime(2030, 1, 1)
+    later = datetime.datetime(2030, 6, 1)
+    tasks = [make(1, 100, priority=0, deadline=later), make(2, 50, priority=5), make(3, 200, deadline=soon)]
+    assert [t.id for t in scheduler.order_tasks(tasks, "priority")] == [2, 3, 1]
+    assert [t.id for t in scheduler.order_tasks(tasks, "deadline")] == [3, 1, 2]
+    assert scheduler.order_tasks(tasks, "fifo") == tasks
+    with pytest.raises(ValueError):
+        scheduler.order_tasks(tasks, "random")
+
+
+def test_lpt_reduces_predicted_makespan():
+    tasks = [make(i, d) for i, d in enumerate([600, 600, 600, 600, 2400])]
+    fifo = scheduler.predict_makespan(tasks, workers=2, rtf=1.0)
+    lpt = scheduler.predict_makespan(scheduler.order_tasks(tasks, "lpt"), workers=2, rtf=1.0)
+    assert lpt < fifo
+    assert lpt == pytest.approx(4 * (600 + scheduler.TASK_OVERHEAD))
@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import tracing
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def load(path):
+    # Appended incrementally: trailing comma, no closing bracket
+    text = open(path).read().rstrip().rstrip(",")
+    return json.loads(text + "]")
+
+
+@pytest.fixture
+def trace(tmp_path):
+    path = tracing.enable(str(tmp_path / "run.json"))
+    yield path
+    tracing.disable()
+
+
+def test_disabled_spans_record_nothing(tmp_path):
+    assert not tracing.enabled()
+    with tracing.task(1), tracing.span("noop") as args:
+        args["ignored"] = True
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_nested_spans_carry_task_id_and_lane(trace):
+    with tracing.task(7):
+        with tracing.span("task"):
+            with tracing.span("ffmpeg.render", profile="upload"):
+                pass
+    with pytest.raises(RuntimeError):
+        with tracing.span("whisper.decode"):
+            raise RuntimeError("boom")
+
+    events = load(trace)
+    spans = {e["name"]: e for e in events if e["ph"] == "X"}
+    outer, inner = spans["task"], spans["ffmpeg.render"]
+    assert inner["args"] == {"profile": "upload", "task_id": 7}
+    assert outer["tid"] == inner["tid"]
+    assert outer["ts"] <= inner["ts"] and inner["ts"] + inner["dur"] <= outer["ts"] + outer["dur"]
+    assert "RuntimeError: boom" in spans["whisper.decode"]["args"]["error"]
+    assert spans["whisper.decode"]["tid"] != outer["tid"]
+    lanes = [e for e in events if e["ph"] == "M" and e["name"] == "thread_name"]
+    assert lanes[0]["args"]["name"] == "task 7" and lanes[0]["tid"] == outer["tid"]
+
+
+def test_child_processes_append_to_the_same_file(trace):
+    code = "import tracing\nwith tracing.span('image.generate'):\n    pass\n"
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True)
+    with tracing.span("scan.directory"):
+        pass
+    pids = {e["name"]: e["pid"] for e in load(trace) if e["ph"] == "X"}
+    assert pids["scan.directory"] == os.getpid()
+    assert pids["image.generate"] != os.getpid()
+
+
+def test_env_var_directory_gets_a_file_per_run(tmp_path):
+    env = dict(os.environ, STREAMFLUENT_TRACE=str(tmp_path))
+    env.pop("STREAMFLUENT_TRACE_FILE", None)
+    code = "import tracing\nwith tracing.span('run'):\n    pass\n"
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True)
+    files = sorted(tmp_path.iterdir())
+    assert len(files) == 2
+    assert [e["name"] for e in load(files[0]) if e["ph"] == "X"] == ["run"]
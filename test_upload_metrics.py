@@ -0,0 +1,52 @@
+from upload_metrics import UploadMeter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def chunk(n, size=100, total=3):
+    return {"chunk_number": n, "offset": n * size, "total_chunk_count": total}
+
+
+def test_meter_tracks_rate_latency_and_retries():
+    clock = FakeClock()
+    meter = UploadMeter("Episode", total_bytes=250, clock=clock, smoothing=1.0)
+
+    meter.on_pre_chunk(chunk(0))
+    clock.now += 1.0
+    meter.on_chunk_failed(chunk(0))
+    meter.on_pre_chunk(chunk(0))
+    meter.on_pre_chunk(chunk(1))
+    clock.now += 1.0
+    meter.on_after_chunk(chunk(1))
+    meter.on_after_chunk(chunk(0))
+
+    assert meter.retries == 1
+    assert meter.bytes_done == 200
+    assert meter.rate == 100.0
+    assert meter.eta() == 0.5
+
+    meter.on_pre_chunk(chunk(2))
+    clock.now += 0.5
+    meter.on_after_chunk(chunk(2))  # last chunk is only 50 bytes
+    summary = meter.summary()
+    assert summary["bytes"] == 250
+    assert summary["chunks"] == 3
+    assert summary["retries"] == 1
+    assert summary["chunk_latency"]["max"] == 1.0
+    assert summary["chunk_latency"]["buckets"]["0.5"] == 1
+    assert summary["chunk_latency"]["buckets"]["1"] == 2
+
+
+def test_resumed_bytes_do_not_inflate_rate():
+    clock = FakeClock()
+    meter = UploadMeter("Episode", total_bytes=1000, clock=clock)
+    meter.skip(900)
+    clock.now += 10
+    assert meter.average_rate() == 0
+    assert meter.summary()["resumed_bytes"] == 900
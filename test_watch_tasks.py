@@ -0,0 +1,90 @@
+import os
+import threading
+
+import pytest
+
+from watch_tasks import Debouncer, EpisodeWatcher, PollingWatcher, ProcessingWorker
+
+
+def test_debouncer_waits_for_file_to_settle(tmp_path):
+    path = tmp_path / "ep.mp3"
+    path.write_bytes(b"half")
+    debouncer = Debouncer(settle=5)
+    debouncer.add(str(path))
+
+    assert debouncer.ready(now=0) == []
+    assert debouncer.ready(now=4) == []
+    # Still being written: the settle clock restarts
+    with open(path, "ab") as f:
+        f.write(b" more")
+    assert debouncer.ready(now=6) == []
+    assert debouncer.ready(now=10) == []
+    assert debouncer.ready(now=11) == [str(path)]
+    assert len(debouncer) == 0
+
+
+def test_debouncer_drops_vanished_and_holds_empty_files(tmp_path):
+    gone, empty = tmp_path / "gone.mp3", tmp_path / "empty.mp3"
+    gone.write_bytes(b"x")
+    empty.write_bytes(b"")
+    debouncer = Debouncer(settle=1)
+    debouncer.add(str(gone))
+    debouncer.add(str(empty))
+    debouncer.ready(now=0)
+
+    gone.unlink()
+    assert debouncer.ready(now=5) == []
+    assert len(debouncer) == 1  # the empty file waits until something is written
+
+
+def test_polling_watcher_reports_new_entries(tmp_path):
+    watcher = PollingWatcher()
+    watcher.add_dir(str(tmp_path))
+    assert watcher.poll(0) == []
+
+    (tmp_path / "ep.mp3").write_bytes(b"x")
+    (tmp_path / "Show").mkdir()
+    assert sorted(watcher.poll(0)) == [(str(tmp_path / "Show"), True), (str(tmp_path / "ep.mp3"), False)]
+    assert watcher.poll(0) == []
+
+    os.rmdir(tmp_path / "Show")
+    os.remove(tmp_path / "ep.mp3")
+    os.rmdir(tmp_path)
+    assert watcher.poll(0) == []  # a deleted directory is dropped, not an error
+
+
+def test_unwatchable_directory_is_skipped(tmp_path):
+    class FullWatcher(PollingWatcher):
+        def add_dir(self, path):
+            raise OSError(28, "No space left on device")
+
+    (tmp_path / "ep.mp3").write_bytes(b"x")
+    watcher = EpisodeWatcher(str(tmp_path), on_ready=None, use_inotify=False)
+    watcher.watcher = FullWatcher()
+    watcher._watch_tree(str(tmp_path), enqueue_existing=True)
+    assert len(watcher.debouncer) == 1
+
+
+def test_processing_worker_survives_a_failed_start(monkeypatch):
+    karaoke_gen = pytest.importorskip("karaoke_gen")
+    tried, processed = threading.Event(), threading.Event()
+    attempts = []
+
+    class FlakyGenerator:
+        def __init__(self):
+            attempts.append(1)
+            tried.set()
+            if len(attempts) == 1:
+                raise RuntimeError("model failed to load")
+
+        def process_pending_tasks(self):
+            processed.set()
+
+    monkeypatch.setattr(karaoke_gen, "KaraokeGenerator", FlakyGenerator)
+    worker = ProcessingWorker()
+    worker.start()
+    worker.notify()
+    assert tried.wait(5)
+    worker.notify()
+    assert processed.wait(5)
+    assert worker.is_alive() and len(attempts) == 2
@@ -0,0 +1,179 @@
+"""
+Opt-in span tracing, written as a Chrome / Perfetto trace file per run.
+
+Off by default and close to free while off. Set STREAMFLUENT_TRACE to a
+directory (a new trace-<time>-<pid>.json is created in it) or to a .json
+path, or call enable(), then open the file in https://ui.perfetto.dev or
+chrome://tracing.
+
+  with tracing.task(task.id):               # one timeline lane per task
+      with tracing.span("ffmpeg.render", profile="upload"):
+          ...
+
+Spans nest by time within a lane and carry the current task id in their
+args. Events are appended to the file as each span ends, by this process
+and by any child process started after tracing was enabled (they inherit
+the target through the environment), so image-pool workers show up as
+their own processes and a crashed run still leaves a readable trace: the
+JSON array format lets the closing bracket be missing.
+"""
+
+import contextvars
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+
+TRACE_ENV = "STREAMFLUENT_TRACE"
+# Set by the process that created the run's file; child processes append to it
+_FILE_ENV = "STREAMFLUENT_TRACE_FILE"
+
+_fd: Optional[int] = None
+_write_lock = threading.Lock()
+_lanes = itertools.count(1)
+
+_task_id: contextvars.ContextVar = contextvars.ContextVar("trace_task_id", default=None)
+_lane: contextvars.ContextVar = contextvars.ContextVar("trace_lane", default=None)
+
+
+def enabled() -> bool:
+    return _fd is not None
+
+
+def _now_us() -> float:
+    # Wall clock, so events from different processes line up
+    return time.time_ns() / 1000
+
+
+def _emit(event: dict):
+    line = (json.dumps(event, default=str, separators=(",", ":")) + ",\n").encode("utf-8")
+    with _write_lock:
+        if _fd is not None:
+            # O_APPEND: each event lands whole even with several processes writing
+            os.write(_fd, line)
+
+
+def _open(path: str, create: bool):
+    global _fd
+    flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | (os.O_TRUNC if create else 0)
+    _fd = os.open(path, flags, 0o644)
+    if create:
+        os.write(_fd, b"[\n")
+    pid = os.getpid()
+    _emit({"ph": "M", "name": "process_name", "pid": pid, "tid": 0,
+           "args": {"name": f"{os.path.basename(sys.argv[0] or 'python')} ({pid})"}})
+
+
+def enable(target: Optional[str] = None) -> str:
+    """Starts a trace for this run and returns the trace file's path.
+
+    target is a .json path or a directory (default: $STREAMFLUENT_TRACE, else the
+    current directory).
+    """
+    target = target or os.environ.get(TRACE_ENV) or "."
+    if target.endswith(".json"):
+        path = target
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    else:
+        os.makedirs(target, exist_ok=True)
+        path = os.path.join(target, f"trace-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.json")
+    disable()
+    _open(path, create=True)
+    os.environ[_FILE_ENV] = path
+    return path
+
+
+def disable():
+    global _fd
+    with _write_lock:
+        if _fd is not None:
+            os.close(_fd)
+            _fd = None
+    os.environ.pop(_FILE_ENV, None)
+
+
+def _tid() -> int:
+    lane = _lane.get()
+    return lane if lane is not None else threading.get_ident()
+
+
+@contextmanager
+def _task(task_id, label):
+    lane = next(_lanes)
+    name = label or (f"task {task_id}" if task_id is not None else f"lane {lane}")
+    _emit({"ph": "M", "name": "thread_name", "pid": os.getpid(), "tid": lane, "args": {"name": name}})
+    task_token, lane_token = _task_id.set(task_id), _lane.set(lane)
+    try:
+        yield
+    finally:
+        _task_id.reset(task_token)
+        _lane.reset(lane_token)
+
+
+def task(task_id=None, label: Optional[str] = None):
+    """Puts the spans inside on a lane of their own, tagged with task_id.
+
+    Use one per concurrently running unit of work (worker thread, asyncio task),
+    so their spans never interleave on one lane.
+    """
+    if _fd is None:
+        return nullcontext()
+    return _task(task_id, label)
+
+
+@contextmanager
+def _span(name, cat, args):
+    task_id = _task_id.get()
+    if task_id is not None:
+        args.setdefault("task_id", task_id)
+    started = _now_us()
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _emit({"ph": "X", "name": name, "cat": cat, "ts": started, "dur": _now_us() - started,
+               "pid": os.getpid(), "tid": _tid(), "args": args})
+
+
+def span(name: str, cat: str = "stage", **args):
+    """Records the time spent inside as a complete ("X") event; yields its args dict for late additions."""
+    if _fd is None:
+        return nullcontext({})
+    return _span(name, cat, args)
+
+
+def traced(name: str, cat: str = "stage"):
+    """Decorator form of span() for a whole function."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _fd is None:
+                return fn(*args, **kwargs)
+            with _span(name, cat, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def instant(name: str, cat: str = "event", **args):
+    if _fd is None:
+        return
+    _emit({"ph": "i", "s": "t", "name": name, "cat": cat, "ts": _now_us(),
+           "pid": os.getpid(), "tid": _tid(), "args": args})
+
+
+# Child processes of a traced run keep appending to its file; otherwise honour the env var
+if os.environ.get(_FILE_ENV):
+    try:
+        _open(os.environ[_FILE_ENV], create=False)
+    except OSError:
+        _fd = None
+elif os.environ.get(TRACE_ENV):
+    enable()
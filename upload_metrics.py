@@ -0,0 +1,135 @@
+import bisect
+import math
+import time
+
+# Upper bounds (seconds) of the chunk latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, math.inf)
+
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.1f} {unit}" if unit != "B" else f"{int(n)} B"
+        n /= 1024
+
+
+def format_seconds(seconds):
+    if seconds is None or math.isinf(seconds):
+        return "--"
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h}h{m:02}m{s:02}s" if h else f"{m}m{s:02}s"
+
+
+class UploadMeter:
+    """Tracks one video's upload from bilibili_api chunk events.
+
+    Feed it PRE_CHUNK / AFTER_CHUNK / CHUNK_FAILED event data; it keeps bytes
+    sent, a smoothed bytes/s rate, a chunk latency histogram, retry count and
+    ETA, prints a progress line at most every `print_interval` seconds and
+    summarises everything for the task's stage telemetry.
+    """
+
+    def __init__(self, title, total_bytes, print_interval=2.0, clock=time.monotonic, smoothing=0.3):
+        self.title = title
+        self.total_bytes = total_bytes
+        self.print_interval = print_interval
+        self.smoothing = smoothing
+        self._clock = clock
+        self.started = clock()
+        self.bytes_done = 0
+        self.resumed_bytes = 0
+        self.chunks_done = 0
+        self.total_chunks = None
+        self.retries = 0
+        self.rate = None  # smoothed bytes/s
+        self.latencies = []
+        self.histogram = [0] * len(LATENCY_BUCKETS)
+        self._chunk_size = None
+        self._chunk_started = {}
+        self._last_print = -math.inf
+
+    def skip(self, nbytes):
+        """Counts bytes confirmed by an earlier, interrupted attempt."""
+        self.resumed_bytes += nbytes
+        self.bytes_done += nbytes
+
+    def _chunk_bytes(self, offset, chunk_number, total_chunks):
+        if self._chunk_size is None and chunk_number:
+            # Every chunk before the last has the same size
+            self._chunk_size = offset // chunk_number
+        size = self._chunk_size or math.ceil(self.total_bytes / max(1, total_chunks or 1))
+        return max(0, min(size, self.total_bytes - offset))
+
+    def on_pre_chunk(self, data):
+        self._chunk_started[data.get("chunk_number")] = self._clock()
+        self.total_chunks = data.get("total_chunk_count", self.total_chunks)
+
+    def on_after_chunk(self, data):
+        now = self._clock()
+        chunk_number = data.get("chunk_number")
+        started = self._chunk_started.pop(chunk_number, None)
+        nbytes = self._chunk_bytes(data.get("offset", 0), chunk_number, data.get("total_chunk_count"))
+        self.bytes_done += nbytes
+        self.chunks_done += 1
+
+        if started is not None:
+            latency = max(now - started, 1e-6)
+            self.latencies.append(latency)
+            self.histogram[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+            instant = nbytes / latency
+            self.rate = instant if self.rate is None else (
+                self.smoothing * instant + (1 - self.smoothing) * self.rate)
+
+        if now - self._last_print >= self.print_interval or self.bytes_done >= self.total_bytes:
+            self._last_print = now
+            print(self.progress_line(), flush=True)
+
+    def on_chunk_failed(self, data):
+        self._chunk_started.pop(data.get("chunk_number"), None)
+        self.retries += 1
+
+    def elapsed(self):
+        return self._clock() - self.started
+
+    def average_rate(self):
+        elapsed = self.elapsed()
+        sent = self.bytes_done - self.resumed_bytes
+        return sent / elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        rate = self.rate or self.average_rate()
+        if not rate:
+            return None
+        return max(0, self.total_bytes - self.bytes_done) / rate
+
+    def progress_line(self):
+        pct = 100 * self.bytes_done / self.total_bytes if self.total_bytes else 100
+        rate = self.rate or self.average_rate()
+        return (f"[upload] {self.title[:30]}: {pct:5.1f}% "
+                f"{format_bytes(self.bytes_done)}/{format_bytes(self.total_bytes)} "
+                f"{format_bytes(rate)}/s ETA {format_seconds(self.eta())}"
+                + (f" retries {self.retries}" if self.retries else ""))
+
+    def percentile(self, q):
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self):
+        return {
+            "bytes": self.bytes_done,
+            "resumed_bytes": self.resumed_bytes,
+            "seconds": round(self.elapsed(), 3),
+            "bytes_per_s": round(self.average_rate(), 1),
+            "chunks": self.chunks_done,
+            "retries": self.retries,
+            "chunk_latency": {
+                "p50": self.percentile(0.5),
+                "p95": self.percentile(0.95),
+                "max": max(self.latencies) if self.latencies else None,
+                "buckets": {("+Inf" if math.isinf(b) else str(b)): n
+                            for b, n in zip(LATENCY_BUCKETS, self.histogram)},
+            },
+        }
@@ -0,0 +1,325 @@
+"""
+Watch mode: enqueue new podcast episodes as soon as they land.
+
+Watches a podcast directory tree (inotify on Linux, directory-mtime polling
+elsewhere), waits until each new audio file has stopped growing, builds its
+task with the same matching rules as scan_tasks, adds it to the karaoke job
+queue and wakes a background worker that processes pending tasks.
+
+Only directories that changed are re-listed; the tree is walked once at start-up.
+
+Usage:
+  python watch_tasks.py ../PodCast
+  python watch_tasks.py ../PodCast --poll --settle 10
+  python watch_tasks.py ../PodCast --no-process
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+from manifest import ManifestWriter, is_jsonl
+from media_probe import probe_audio
+from scan_tasks import AUDIO_EXTS, build_task, index_directory, task_metadata, walk_directories
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o0004000
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_audio(name):
+    return os.path.splitext(name)[1].lower() in AUDIO_EXTS
+
+
+class InotifyWatcher:
+    """Reports files and directories created under watched directories (Linux only)."""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available on this platform")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._paths = {}
+        self.overflowed = False
+
+    def add_dir(self, path):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), self.MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self._paths[wd] = path
+
+    def poll(self, timeout):
+        """Returns a list of (path, is_dir) for entries that appeared or were written."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        changes = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self._paths.pop(wd, None)
+                continue
+            parent = self._paths.get(wd)
+            if parent is None or not name:
+                continue
+            changes.append((os.path.join(parent, os.fsdecode(name)), bool(mask & IN_ISDIR)))
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback watcher: re-lists a directory only when its mtime changes."""
+
+    def __init__(self):
+        self._dirs = {}
+
+    def add_dir(self, path):
+        try:
+            self._dirs[path] = (os.stat(path).st_mtime_ns, set(os.listdir(path)))
+        except OSError:
+            pass
+
+    def poll(self, timeout):
+        time.sleep(timeout)
+        changes = []
+        for path, (mtime, names) in list(self._dirs.items()):
+            try:
+                new_mtime = os.stat(path).st_mtime_ns
+                if new_mtime == mtime:
+                    continue
+                entries = {e.name: e.is_dir(follow_symlinks=False) for e in os.scandir(path)}
+            except OSError:
+                del self._dirs[path]
+                continue
+            self._dirs[path] = (new_mtime, set(entries))
+            for name, is_dir in entries.items():
+                if name not in names:
+                    changes.append((os.path.join(path, name), is_dir))
+        return changes
+
+    def close(self):
+        pass
+
+
+class Debouncer:
+    """Holds candidate files until their size and mtime stop changing for `settle` seconds."""
+
+    def __init__(self, settle=5.0):
+        self.settle = settle
+        self._pending = {}
+
+    def add(self, path):
+        self._pending.setdefault(path, (None, None))
+
+    def __len__(self):
+        return len(self._pending)
+
+    def ready(self, now=None):
+        now = time.monotonic() if now is None else now
+        done = []
+        for path, (signature, since) in list(self._pending.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                # Deleted or renamed away before it settled
+                del self._pending[path]
+                continue
+            current = (st.st_size, st.st_mtime_ns)
+            if current != signature:
+                self._pending[path] = (current, now)
+            elif now - since >= self.settle and st.st_size > 0:
+                del self._pending[path]
+                done.append(path)
+        return done
+
+
+class EpisodeWatcher:
+    def __init__(self, base_dir, on_ready, use_inotify=True, settle=5.0, interval=1.0):
+        self.base_path = Path(base_dir).resolve()
+        self.on_ready = on_ready
+        self.interval = interval
+        self.debouncer = Debouncer(settle)
+        self._stop = threading.Event()
+        self.watcher = None
+        if use_inotify:
+            try:
+                self.watcher = InotifyWatcher()
+            except (OSError, AttributeError) as e:
+                print(f"inotify unavailable ({e}), falling back to polling.")
+        if self.watcher is None:
+            self.watcher = PollingWatcher()
+
+    def _watch_tree(self, root, enqueue_existing):
+        for index in walk_directories(root):
+            try:
+                self.watcher.add_dir(index.path)
+            except OSError as e:
+                # e.g. out of inotify watches, or the directory vanished; its files are still listed below
+                print(f"Warning: not watching {index.path}: {e}")
+            if enqueue_existing:
+                for name in index.audio:
+                    self.debouncer.add(os.path.join(index.path, name))
+
+    def run(self, enqueue_existing=False):
+        print(f"Watching {self.base_path} with {type(self.watcher).__name__}...")
+        self._watch_tree(self.base_path, enqueue_existing)
+        try:
+            while not self._stop.is_set():
+                for path, is_dir in self.watcher.poll(self.interval):
+                    if is_dir:
+                        # A new show folder (possibly moved in with files already inside)
+                        self._watch_tree(path, enqueue_existing=True)
+                    elif is_audio(path):
+                        self.debouncer.add(path)
+
+                if getattr(self.watcher, "overflowed", False):
+                    print("Warning: inotify queue overflowed, re-listing the tree once.")
+                    self.watcher.overflowed = False
+                    self._watch_tree(self.base_path, enqueue_existing=True)
+
+                for path in self.debouncer.ready():
+                    try:
+                        self.on_ready(path)
+                    except Exception as e:
+                        print(f"Error enqueuing {path}: {e}")
+        finally:
+            self.watcher.close()
+
+    def stop(self):
+        self._stop.set()
+
+
+class TaskEnqueuer:
+    """Turns a settled audio file into a queued karaoke task."""
+
+    def __init__(self, base_dir, job_manager, on_enqueued=None, manifest=None):
+        self.base_path = Path(base_dir).resolve()
+        self.job_manager = job_manager
+        self.on_enqueued = on_enqueued
+        self.manifest = manifest
+
+    def __call__(self, audio_path):
+        # Only the episode's own directory is listed to match its artwork
+        index = index_directory(os.path.dirname(audio_path))
+        task, image_title, missing = build_task(os.path.basename(audio_path), index, self.base_path)
+        task["image_title"] = image_title
+
+        if missing:
+            from generate_images import ensure_task_images
+            ensure_task_images([task])
+            ensure_task_images([task], covers=True)
+
+        task.update(probe_audio(audio_path))
+
+        task_id = self.job_manager.add_task(task["audio_path"], task["image_path"], **task_metadata(task))
+        print(f"[QUEUED] {os.path.basename(audio_path)} -> Task {task_id}")
+        if self.manifest:
+            # Upload metadata (title, tags, cover) for bili_upload.py --batch
+            self.manifest.write(task)
+        if self.on_enqueued:
+            self.on_enqueued(task)
+        return task_id
+
+
+class ProcessingWorker(threading.Thread):
+    """Runs KaraokeGenerator.process_pending_tasks() whenever new work is queued."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self._wake = threading.Event()
+
+    def notify(self, *_):
+        self._wake.set()
+
+    def run(self):
+        from karaoke_gen import KaraokeGenerator
+        gen = None
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                if gen is None:
+                    # Built on first use (and again after a failed start, e.g. a model that did not load)
+                    gen = KaraokeGenerator()
+                gen.process_pending_tasks()
+            except Exception as e:
+                # Keep the thread alive: the watcher goes on queueing, and the next episode retries
+                print(f"Error processing pending tasks: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a directory and enqueue new episodes as they land")
+    parser.add_argument("directory", nargs="?", default="../PodCast", help="Directory to watch")
+    parser.add_argument("--poll", action="store_true", help="Use directory polling instead of inotify")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls / stability checks")
+    parser.add_argument("--settle", type=float, default=5.0,
+                        help="Seconds a file's size and mtime must stay unchanged before it is enqueued")
+    parser.add_argument("--existing", action="store_true", help="Also enqueue audio already present at start-up")
+    parser.add_argument("--no-process", action="store_true", help="Only enqueue; do not run transcription")
+    parser.add_argument("--manifest", help="Append each new task to this JSONL manifest (e.g. tasks.jsonl)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"Error: Directory not found: {args.directory}")
+        sys.exit(1)
+    if args.manifest and not is_jsonl(args.manifest):
+        parser.error("--manifest must be a .jsonl file; a .json array cannot be appended to")
+
+    from job_store import JobManager
+
+    worker = None
+    if not args.no_process:
+        worker = ProcessingWorker()
+        worker.start()
+
+    manifest = ManifestWriter(args.manifest, append=True) if args.manifest else None
+    enqueuer = TaskEnqueuer(args.directory, JobManager(), on_enqueued=worker.notify if worker else None,
+                            manifest=manifest)
+    watcher = EpisodeWatcher(args.directory, enqueuer, use_inotify=not args.poll,
+                             settle=args.settle, interval=args.interval)
+    try:
+        watcher.run(enqueue_existing=args.existing)
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        if manifest:
+            manifest.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Render worker: pulls tasks from a coordinator (coordinator.py) and runs the
+usual transcribe -> ASS -> render stages on this machine.
+
+Inputs are read in place when this node sees the same paths as the
+coordinator (shared storage), and downloaded into a scratch folder otherwise.
+A heartbeat thread keeps the task's lease alive while the stages run; if
+the lease is lost (e.g. the node stalled and the task was handed to another
+worker), the result is thrown away instead of uploaded.
+
+Start one per render node, or several on one machine for testing:
+  python worker.py http://coordinator:8700 --model base --profile upload
+  python worker.py http://127.0.0.1:8700 --worker-id local-2 --exit-when-idle
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from email.message import Message
+from typing import Any, Dict, Optional
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 10
+# Downloads are copied to disk in blocks of this size
+COPY_BLOCK = 1024 * 1024
+
+
+class LeaseLost(Exception):
+    pass
+
+
+class CoordinatorClient:
+    def __init__(self, base_url: str, worker_id: str, timeout: float = 60):
+        self.base_url = base_url.rstrip("/")
+        self.worker_id = worker_id
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, payload: Dict[str, Any] = None, data=None,
+                 headers: Dict[str, str] = None):
+        headers = dict(headers or {})
+        if payload is not None:
+            data = json.dumps(payload).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                body = resp.read()
+                return resp.status, json.loads(body) if body else None
+        except urllib.error.HTTPError as e:
+            if e.code == 409:
+                raise LeaseLost(e.read().decode("utf-8", "replace")) from e
+            raise
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        status, task = self._request("POST", "/claim", {"worker_id": self.worker_id})
+        return task if status == 200 else None
+
+    def heartbeat(self, task_id: int):
+        self._request("POST", f"/tasks/{task_id}/heartbeat", {"worker_id": self.worker_id})
+
+    def download(self, task_id: int, kind: str, dest_dir: str) -> str:
+        req = urllib.request.Request(f"{self.base_url}/tasks/{task_id}/{kind}")
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            filename = _content_disposition(resp.headers.get("Content-Disposition", "")).get("filename")
+            path = os.path.join(dest_dir, os.path.basename(filename or kind))
+            with open(path, "wb") as f:
+                shutil.copyfileobj(resp, f, COPY_BLOCK)
+        return path
+
+    def upload_artifact(self, task_id: int, path: str) -> Dict[str, Any]:
+        name = urllib.parse.quote(os.path.basename(path))
+        query = urllib.parse.urlencode({"worker_id": self.worker_id})
+        with open(path, "rb") as f:
+            _, result = self._request(
+                "PUT", f"/tasks/{task_id}/artifacts/{name}?{query}", data=f,
+                headers={"Content-Type": "application/octet-stream",
+                         "Content-Length": str(os.path.getsize(path))})
+        return result
+
+    def complete(self, task_id: int, status: str, output: str = None, error: str = None,
+                 metrics: Dict[str, Any] = None):
+        self._request("POST", f"/tasks/{task_id}/complete",
+                      {"worker_id": self.worker_id, "status": status, "output": output,
+                       "error": error, "metrics": metrics or {}})
+
+
+def _content_disposition(header: str) -> Dict[str, str]:
+    msg = Message()
+    msg["Content-Disposition"] = header
+    return dict(msg.get_params(header="Content-Disposition") or [])
+
+
+class Heartbeat:
+    """Renews the lease every `interval` seconds in the background; `lost` is set if renewal is refused."""
+
+    def __init__(self, client: CoordinatorClient, task_id: int, interval: float):
+        self.client = client
+        self.task_id = task_id
+        self.interval = interval
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.client.heartbeat(self.task_id)
+            except LeaseLost:
+                logger.warning(f"Lease on task {self.task_id} lost")
+                self.lost.set()
+                return
+            except OSError as e:
+                # Coordinator briefly unreachable: keep working, the lease has slack
+                logger.warning(f"Heartbeat for task {self.task_id} failed: {e}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def _local_inputs(client: CoordinatorClient, task: Dict[str, Any], scratch: str):
+    """The task's audio and image paths on this node, downloading whatever is not visible here."""
+    audio, image = task["audio_path"], task["image_path"]
+    if not os.path.exists(audio):
+        audio = client.download(task["id"], "audio", scratch)
+    if not os.path.exists(image):
+        image = client.download(task["id"], "image", scratch)
+    return audio, image
+
+
+def process_one(client: CoordinatorClient, generator, task: Dict[str, Any]) -> bool:
+    """Runs one leased task end to end; returns True if it completed."""
+    task_id = task["id"]
+    logger.info(f"Task {task_id} claimed (attempt {task.get('attempts')}): {task['audio_path']}")
+    with tempfile.TemporaryDirectory(prefix=f"worker-{task_id}-") as scratch, tracing.task(task_id):
+        try:
+            with Heartbeat(client, task_id, interval=task["lease_seconds"] / 3) as beat:
+                with tracing.span("worker.fetch_inputs"):
+                    audio, image = _local_inputs(client, task, scratch)
+                outputs = generator.run_stages(audio, image, task.get("duration"),
+                                               output_dir=os.path.join(scratch, "output"),
+                                               codec=task.get("codec"), bitrate=task.get("bitrate"))
+            if beat.lost.is_set():
+                logger.warning(f"Task {task_id} finished after its lease was lost; result discarded")
+                return False
+            with tracing.span("worker.upload_artifacts"):
+                for kind in ("text", "ass", "video"):
+                    client.upload_artifact(task_id, outputs[kind])
+            client.complete(task_id, "completed", output=os.path.basename(outputs["video"]),
+                            metrics=outputs["metrics"])
+            logger.info(f"Task {task_id} completed and uploaded")
+            return True
+        except LeaseLost:
+            logger.warning(f"Task {task_id} is no longer leased to {client.worker_id}; result discarded")
+            return False
+        except Exception as e:
+            logger.exception(f"Task {task_id} failed.")
+            try:
+                client.complete(task_id, "failed", error=str(e))
+            except (LeaseLost, OSError):
+                pass
+            return False
+
+
+def run_worker(client: CoordinatorClient, generator, poll_seconds: float = POLL_SECONDS,
+               exit_when_idle: bool = False) -> int:
+    """Claims and processes tasks until the queue is empty (with exit_when_idle) or forever."""
+    done = 0
+    while True:
+        try:
+            task = client.claim()
+        except OSError as e:
+            logger.warning(f"Coordinator unreachable: {e}")
+            task = None
+        if task is None:
+            if exit_when_idle:
+                return done
+            time.sleep(poll_seconds)
+            continue
+        done += process_one(client, generator, task)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render worker for a StreamFluent coordinator")
+    parser.add_argument("coordinator", help="Coordinator base URL, e.g. http://127.0.0.1:8700")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--profile", default="default", help="Render profile (default or upload)")
+    parser.add_argument("--model", default="base", help="Whisper model that transcribes every episode")
+    parser.add_argument("--cascade", metavar="MODEL", help="Larger Whisper model for low-confidence segments")
+    parser.add_argument("--poll", type=float, default=POLL_SECONDS, help="Seconds between claims when idle")
+    parser.add_argument("--exit-when-idle", action="store_true", help="Stop once the queue is empty")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Serve Prometheus /metrics and JSON /status on this port")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    from karaoke_gen import KaraokeGenerator
+
+    generator = KaraokeGenerator(render_profile=args.profile, model_size=args.model, cascade_model=args.cascade)
+    client = CoordinatorClient(args.coordinator, args.worker_id)
+    if args.metrics_port:
+        import metrics
+        metrics.serve(args.metrics_port)
+    done = run_worker(client, generator, args.poll, args.exit_when_idle)
+    print(f"Worker {args.worker_id} finished {done} task(s).")
+
+
+if __name__ == "__main__":
+    main()